@@ -81,18 +81,71 @@ CREATE TABLE IF NOT EXISTS node_health (
 
 SELECT create_hypertable('node_health', 'time', if_not_exists => TRUE);
 
--- Compression policies (commented out - requires enabling columnstore first)
--- For TimescaleDB 2.x, enable compression on table first with:
--- ALTER TABLE raw_telemetry SET (timescaledb.compress);
--- SELECT add_compression_policy('raw_telemetry', INTERVAL '7 days', if_not_exists => TRUE);
--- SELECT add_compression_policy('met_station_data', INTERVAL '7 days', if_not_exists => TRUE);
+-- 7. Node Registry (Dimension Table, populated at commissioning)
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    eui64 TEXT UNIQUE,
+    sector TEXT NOT NULL,
+    position TEXT, -- Bench slot within the sector, e.g. 'A1-03'
+    commissioned_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_nodes_sector ON nodes (sector);
+
+-- 8. Storage Tier: Columnstore Compression & Retention
+-- Chunks older than 7 days are compressed (segmented per node so per-node
+-- range scans only decompress the segments they need).
+ALTER TABLE raw_telemetry SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'node_id',
+    timescaledb.compress_orderby = 'time DESC'
+);
+ALTER TABLE node_health SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'node_id',
+    timescaledb.compress_orderby = 'time DESC'
+);
+-- Single met station: no node_id column, so segment by time order only
+ALTER TABLE met_station_data SET (
+    timescaledb.compress,
+    timescaledb.compress_orderby = 'time DESC'
+);
+
+SELECT add_compression_policy('raw_telemetry', INTERVAL '7 days', if_not_exists => TRUE);
+SELECT add_compression_policy('node_health', INTERVAL '7 days', if_not_exists => TRUE);
+SELECT add_compression_policy('met_station_data', INTERVAL '7 days', if_not_exists => TRUE);
 
--- Data retention policies (optional - adjust as needed)
--- SELECT add_retention_policy('raw_telemetry', INTERVAL '1 year', if_not_exists => TRUE);
+-- Raw retention: long-range history is served from the aggregates below
+SELECT add_retention_policy('raw_telemetry', INTERVAL '180 days', if_not_exists => TRUE);
+SELECT add_retention_policy('node_health', INTERVAL '180 days', if_not_exists => TRUE);
+SELECT add_retention_policy('met_station_data', INTERVAL '180 days', if_not_exists => TRUE);
 
--- Continuous aggregates for faster queries
+-- 9. Aggregate Tier: Multi-Resolution Continuous Aggregates
+-- materialized_only = false enables real-time aggregation: buckets newer
+-- than the last refresh are computed from raw chunks at query time.
+-- Averages are stored with sample_count so coarser reads can re-weight.
+-- TimescaleDB indexes each aggregate on its GROUP BY columns + bucket.
+
+-- Telemetry: 1-minute
+CREATE MATERIALIZED VIEW IF NOT EXISTS minute_node_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 minute', time) AS bucket,
+    node_id,
+    AVG(temp_c) AS avg_temp,
+    MIN(temp_c) AS min_temp,
+    MAX(temp_c) AS max_temp,
+    AVG(humidity_pct) AS avg_humidity,
+    AVG(par_umol) AS avg_par,
+    AVG(battery_mv) AS avg_battery_mv,
+    COUNT(*) AS sample_count
+FROM raw_telemetry
+GROUP BY bucket, node_id
+WITH NO DATA;
+
+-- Telemetry: hourly
 CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_node_stats
-WITH (timescaledb.continuous) AS
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
 SELECT
     time_bucket('1 hour', time) AS bucket,
     node_id,
@@ -106,14 +159,256 @@ FROM raw_telemetry
 GROUP BY bucket, node_id
 WITH NO DATA;
 
--- Refresh policy for continuous aggregate
+-- Existing deployments created hourly_node_stats as materialized-only
+ALTER MATERIALIZED VIEW hourly_node_stats SET (timescaledb.materialized_only = false);
+
+-- Telemetry: daily
+CREATE MATERIALIZED VIEW IF NOT EXISTS daily_node_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 day', time) AS bucket,
+    node_id,
+    AVG(temp_c) AS avg_temp,
+    MIN(temp_c) AS min_temp,
+    MAX(temp_c) AS max_temp,
+    AVG(humidity_pct) AS avg_humidity,
+    AVG(par_umol) AS avg_par,
+    -- Daily light integral (mol/m²/day) from mean PAR over the day
+    AVG(par_umol) * 0.0864 AS dli_mol,
+    COUNT(*) AS sample_count
+FROM raw_telemetry
+GROUP BY bucket, node_id
+WITH NO DATA;
+
+-- Met station: 1-minute
+CREATE MATERIALIZED VIEW IF NOT EXISTS minute_met_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 minute', time) AS bucket,
+    AVG(net_radiation) AS avg_net_radiation,
+    AVG(spectral_blue_irradiance) AS avg_blue_irradiance,
+    AVG(spectral_red_irradiance) AS avg_red_irradiance,
+    AVG(air_temp_c) AS avg_air_temp,
+    AVG(relative_humidity_pct) AS avg_humidity,
+    AVG(co2_ppm) AS avg_co2,
+    COUNT(*) AS sample_count
+FROM met_station_data
+GROUP BY bucket
+WITH NO DATA;
+
+-- Met station: hourly
+CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_met_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 hour', time) AS bucket,
+    AVG(net_radiation) AS avg_net_radiation,
+    MAX(net_radiation) AS max_net_radiation,
+    AVG(spectral_blue_irradiance) AS avg_blue_irradiance,
+    AVG(spectral_red_irradiance) AS avg_red_irradiance,
+    AVG(air_temp_c) AS avg_air_temp,
+    MIN(air_temp_c) AS min_air_temp,
+    MAX(air_temp_c) AS max_air_temp,
+    AVG(relative_humidity_pct) AS avg_humidity,
+    AVG(co2_ppm) AS avg_co2,
+    COUNT(*) AS sample_count
+FROM met_station_data
+GROUP BY bucket
+WITH NO DATA;
+
+-- Met station: daily
+CREATE MATERIALIZED VIEW IF NOT EXISTS daily_met_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 day', time) AS bucket,
+    AVG(net_radiation) AS avg_net_radiation,
+    MAX(net_radiation) AS max_net_radiation,
+    AVG(spectral_blue_irradiance) AS avg_blue_irradiance,
+    AVG(spectral_red_irradiance) AS avg_red_irradiance,
+    AVG(air_temp_c) AS avg_air_temp,
+    MIN(air_temp_c) AS min_air_temp,
+    MAX(air_temp_c) AS max_air_temp,
+    AVG(relative_humidity_pct) AS avg_humidity,
+    AVG(co2_ppm) AS avg_co2,
+    COUNT(*) AS sample_count
+FROM met_station_data
+GROUP BY bucket
+WITH NO DATA;
+
+-- Node health: hourly (battery depletion forecasting)
+CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_node_health
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 hour', time) AS bucket,
+    node_id,
+    AVG(battery_mv) AS avg_battery_mv,
+    MIN(battery_mv) AS min_battery_mv,
+    AVG(rssi) AS avg_rssi,
+    COUNT(battery_mv) AS sample_count
+FROM node_health
+GROUP BY bucket, node_id
+WITH NO DATA;
+
+-- Sector rollups: telemetry joined to the node registry at refresh time.
+-- VPD uses the Tetens equation (matches PhenotypingEngine.calculate_vpd).
+CREATE MATERIALIZED VIEW IF NOT EXISTS minute_sector_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 minute', t.time) AS bucket,
+    n.sector,
+    AVG(t.temp_c) AS avg_temp,
+    MIN(t.temp_c) AS min_temp,
+    MAX(t.temp_c) AS max_temp,
+    AVG(t.humidity_pct) AS avg_humidity,
+    AVG(t.par_umol) AS avg_par,
+    AVG(0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0)) AS avg_vpd,
+    MAX(0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0)) AS max_vpd,
+    SUM(CASE WHEN 0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0) > 1.5
+        THEN 1 ELSE 0 END) AS vpd_stress_samples,
+    SUM(CASE WHEN t.temp_c > 30 THEN 1 ELSE 0 END) AS heat_stress_samples,
+    SUM(CASE WHEN t.temp_c < 15 THEN 1 ELSE 0 END) AS cold_stress_samples,
+    COUNT(*) AS sample_count
+FROM raw_telemetry t
+JOIN nodes n ON t.node_id = n.node_id
+GROUP BY bucket, n.sector
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_sector_stats
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 hour', t.time) AS bucket,
+    n.sector,
+    AVG(t.temp_c) AS avg_temp,
+    MIN(t.temp_c) AS min_temp,
+    MAX(t.temp_c) AS max_temp,
+    AVG(t.humidity_pct) AS avg_humidity,
+    AVG(t.par_umol) AS avg_par,
+    AVG(0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0)) AS avg_vpd,
+    MAX(0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0)) AS max_vpd,
+    SUM(CASE WHEN 0.6108 * exp(17.27 * t.temp_c / (t.temp_c + 237.3)) * (1 - t.humidity_pct / 100.0) > 1.5
+        THEN 1 ELSE 0 END) AS vpd_stress_samples,
+    SUM(CASE WHEN t.temp_c > 30 THEN 1 ELSE 0 END) AS heat_stress_samples,
+    SUM(CASE WHEN t.temp_c < 15 THEN 1 ELSE 0 END) AS cold_stress_samples,
+    COUNT(*) AS sample_count
+FROM raw_telemetry t
+JOIN nodes n ON t.node_id = n.node_id
+GROUP BY bucket, n.sector
+WITH NO DATA;
+
+-- Refresh policies (refresh windows stay inside raw retention)
+SELECT add_continuous_aggregate_policy('minute_node_stats',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute',
+    if_not_exists => TRUE);
+
 SELECT add_continuous_aggregate_policy('hourly_node_stats',
     start_offset => INTERVAL '3 hours',
     end_offset => INTERVAL '1 hour',
     schedule_interval => INTERVAL '1 hour',
     if_not_exists => TRUE);
 
+SELECT add_continuous_aggregate_policy('daily_node_stats',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 day',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('minute_met_stats',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('hourly_met_stats',
+    start_offset => INTERVAL '3 hours',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('daily_met_stats',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 day',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('minute_sector_stats',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('hourly_sector_stats',
+    start_offset => INTERVAL '3 hours',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('hourly_node_health',
+    start_offset => INTERVAL '3 hours',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
+
+-- Aggregate retention: minute detail for 30 days, hourly/daily kept
+SELECT add_retention_policy('minute_node_stats', INTERVAL '30 days', if_not_exists => TRUE);
+SELECT add_retention_policy('minute_met_stats', INTERVAL '30 days', if_not_exists => TRUE);
+SELECT add_retention_policy('minute_sector_stats', INTERVAL '30 days', if_not_exists => TRUE);
+
 -- Indexes for common queries
 CREATE INDEX IF NOT EXISTS idx_telemetry_node ON raw_telemetry (node_id, time DESC);
 CREATE INDEX IF NOT EXISTS idx_events_type ON research_events (event_type, time DESC);
 CREATE INDEX IF NOT EXISTS idx_node_health ON node_health (node_id, time DESC);
+
+-- 10. Live View: latest reading per node (RL agent decision loop)
+-- Bounded to the last 15 minutes so only the newest chunk is scanned;
+-- DISTINCT ON walks idx_telemetry_node (node_id, time DESC).
+CREATE OR REPLACE VIEW node_latest AS
+SELECT DISTINCT ON (t.node_id)
+    t.node_id,
+    COALESCE(n.sector, 'UNASSIGNED') AS sector,
+    t.time,
+    t.temp_c,
+    t.humidity_pct,
+    t.par_umol
+FROM raw_telemetry t
+LEFT JOIN nodes n ON n.node_id = t.node_id
+WHERE t.time > NOW() - INTERVAL '15 minutes'
+ORDER BY t.node_id, t.time DESC;
+
+-- 11. Safety Vetoes: LED proposals rejected by the enforcement proxy
+-- violated = law names, trace = the trace slice behind each verdict
+CREATE TABLE IF NOT EXISTS safety_vetoes (
+    time TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    sector_id TEXT,
+    blue_ratio DOUBLE PRECISION,
+    intensity_pct DOUBLE PRECISION,
+    source TEXT,
+    violated TEXT[],
+    trace JSONB
+);
+
+SELECT create_hypertable('safety_vetoes', 'time', if_not_exists => TRUE);
+CREATE INDEX IF NOT EXISTS idx_safety_vetoes_sector ON safety_vetoes (sector_id, time DESC);
+
+-- 12. Battery Forecasts: per-node discharge trend (battery_forecast.py)
+-- empty_at = projected crossing of the 3000 mV floor (NULL = not discharging)
+CREATE TABLE IF NOT EXISTS battery_forecasts (
+    node_id TEXT PRIMARY KEY,
+    updated_at TIMESTAMPTZ NOT NULL,
+    battery_mv DOUBLE PRECISION,
+    slope_mv_per_h DOUBLE PRECISION,
+    empty_at TIMESTAMPTZ,
+    effective_samples DOUBLE PRECISION
+);
+
+-- 13. LED Day-Ahead Plan (led_planner.py), kept apart from applied setpoints
+-- led_schedule_history only records setpoints that were actually applied
+CREATE TABLE IF NOT EXISTS led_schedule_plan (
+    time TIMESTAMPTZ NOT NULL,
+    sector_id TEXT NOT NULL,
+    blue_ratio DOUBLE PRECISION CHECK (blue_ratio >= 0 AND blue_ratio <= 1),
+    red_ratio DOUBLE PRECISION CHECK (red_ratio >= 0 AND red_ratio <= 1),
+    intensity_pct INT CHECK (intensity_pct >= 0 AND intensity_pct <= 100),
+    planned_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (sector_id, time)
+);
@@ -10,18 +10,25 @@ equipment failures, etc) that get fed into the ML pipeline."
 Endpoints:
 - POST /api/event - Log research events (pest, fertilizer, equipment failure)
 - POST /api/yield - Log harvest yield data
-- POST /api/led - Update LED schedule
+- POST /api/ingest - Batch telemetry insert (MQTT-SN relay, FORWARD=http)
+- POST /api/led - Propose an LED setpoint (via the safety proxy)
 - GET /api/nodes - Get node status summary
 - GET /api/events - Get recent events
 - GET /api/curated - Get latest curated dataset
+- GET /api/telemetry/history - Node history from the best-fit aggregate tier
+- GET /api/sectors - Per-sector environment and phenotype summary
+- GET /api/maintenance/plan - Technician battery/calibration plan (PDDL)
 """
 
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+import paho.mqtt.publish as mqtt_publish
 import psycopg2
 import os
+import json
 import logging
-from datetime import datetime
+import math
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 CORS(app)  # Enable Dashboard to talk to API
@@ -29,6 +36,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ResearchAPI")
 
 DB_URL = os.getenv("DATABASE_URL")
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
+
+# LED setpoints are proposed, never written directly: safety_proxy.py
+# approves them onto gos/led/schedule (logged by mqtt_bridge) or vetoes them
+LED_PROPOSED_TOPIC = "gos/led/proposed"
 
 
 def get_db_connection():
@@ -36,6 +49,39 @@ def get_db_connection():
     return psycopg2.connect(DB_URL)
 
 
+# Continuous-aggregate tiers (schema.sql), finest first: (view, bucket width)
+TELEMETRY_TIERS = [
+    ('minute_node_stats', timedelta(minutes=1)),
+    ('hourly_node_stats', timedelta(hours=1)),
+    ('daily_node_stats', timedelta(days=1)),
+]
+
+# Upper bound on points returned by history queries
+MAX_HISTORY_POINTS = 2000
+
+
+def classify_vpd_status(vpd: float) -> str:
+    """VPD stress class for strawberry (matches PhenotypingEngine)."""
+    if vpd < 0.4:
+        return "LOW_TRANSPIRATION"
+    elif vpd < 0.8:
+        return "OPTIMAL"
+    elif vpd < 1.2:
+        return "MILD_STRESS"
+    elif vpd < 1.5:
+        return "MODERATE_STRESS"
+    else:
+        return "SEVERE_STRESS"
+
+
+def select_telemetry_tier(span: timedelta, max_points: int = MAX_HISTORY_POINTS):
+    """Pick the finest aggregate whose bucket count over span fits max_points."""
+    for view, width in TELEMETRY_TIERS:
+        if span / width <= max_points:
+            return view, width
+    return TELEMETRY_TIERS[-1]
+
+
 # === EVENT LOGGING (Group 2 GUI) ===
 
 @app.route('/api/event', methods=['POST'])
@@ -131,32 +177,76 @@ def log_yield():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-# === LED CONTROL ===
+# === TELEMETRY INGEST ===
 
-@app.route('/api/led', methods=['POST'])
-def update_led_schedule():
-    """Update LED spectral schedule (blue/red ratio, intensity)."""
-    data = request.json
+@app.route('/api/ingest', methods=['POST'])
+def ingest_telemetry():
+    """
+    Batch telemetry insert for the MQTT-SN relay (FORWARD=http).
+    Body: {"samples": [...]} with the mqtt_bridge telemetry keys.
+    """
+    data = request.get_json(silent=True) or {}
+    samples = data.get('samples')
+    if not isinstance(samples, list) or not all(isinstance(s, dict) and s.get('node_id') for s in samples):
+        return jsonify({"status": "error", "message": "samples must be a list of objects with node_id"}), 400
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO led_schedule_history 
-                (blue_ratio, red_ratio, intensity_pct, sector_id)
-                VALUES (%s, %s, %s, %s)
-            """, (
-                data.get('blue_ratio', 0.3),
-                data.get('red_ratio', 0.7),
-                data.get('intensity', 100),
-                data.get('sector', 'ALL')
-            ))
+            cur.executemany("""
+                INSERT INTO raw_telemetry
+                (node_id, sample_identity, temp_c, humidity_pct, par_umol, battery_mv, rssi)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [(
+                s['node_id'],
+                s.get('eui64', s.get('sample_identity')),
+                s.get('temp_c', s.get('temp')),
+                s.get('humidity_pct', s.get('humidity')),
+                s.get('par_umol', s.get('par')),
+                s.get('battery_mv'),
+                s.get('rssi')
+            ) for s in samples])
         conn.commit()
         conn.close()
-        logger.info(f"LED schedule: Blue={data.get('blue_ratio')}, Red={data.get('red_ratio')}")
+        return jsonify({"status": "success", "inserted": len(samples)}), 201
+    except Exception as e:
+        logger.error(f"Ingest error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# === LED CONTROL ===
+
+@app.route('/api/led', methods=['POST'])
+def update_led_schedule():
+    """
+    Propose an LED spectral setpoint (blue/red ratio, intensity).
+
+    Published to gos/led/proposed; the safety proxy applies it (and
+    mqtt_bridge logs it to led_schedule_history) or vetoes it
+    (gos/led/veto, safety_vetoes).
+    """
+    data = request.json or {}
+    try:
+        blue_ratio = float(data.get('blue_ratio', 0.3))
+        proposal = {
+            'blue_ratio': blue_ratio,
+            'red_ratio': float(data.get('red_ratio', round(1.0 - blue_ratio, 2))),
+            'intensity': float(data.get('intensity', 100)),
+            'sector': str(data.get('sector', 'ALL')),
+            'source': 'api',
+            'decided_at': datetime.now().isoformat()
+        }
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Invalid LED setpoint: {e}"}), 400
+    try:
+        mqtt_publish.single(LED_PROPOSED_TOPIC, json.dumps(proposal), qos=1,
+                            hostname=MQTT_BROKER, port=MQTT_PORT)
+        logger.info(f"LED proposal: Blue={proposal['blue_ratio']}, Red={proposal['red_ratio']}, "
+                    f"sector={proposal['sector']}")
         return jsonify({
-            "status": "success",
-            "message": "LED schedule updated and logged."
-        }), 201
+            "status": "accepted",
+            "message": "LED setpoint proposed; the safety proxy applies or vetoes it.",
+            "proposal": proposal
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -199,15 +289,22 @@ def get_nodes():
         conn = get_db_connection()
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT DISTINCT ON (node_id)
-                    node_id, sample_identity, temp_c, humidity_pct, 
-                    par_umol, battery_mv, rssi, time
-                FROM raw_telemetry
-                ORDER BY node_id, time DESC
+                SELECT l.*, f.slope_mv_per_h, f.empty_at,
+                       EXTRACT(EPOCH FROM (f.empty_at - NOW())) / 3600.0
+                FROM (
+                    SELECT DISTINCT ON (node_id)
+                        node_id, sample_identity, temp_c, humidity_pct, 
+                        par_umol, battery_mv, rssi, time
+                    FROM raw_telemetry
+                    ORDER BY node_id, time DESC
+                ) l
+                LEFT JOIN battery_forecasts f ON f.node_id = l.node_id
             """)
             rows = cur.fetchall()
         conn.close()
         
+        # Battery projection (battery_forecast.py): time until the 3000 mV floor;
+        # null when there is no discharge trend yet
         nodes = [{
             'node_id': row[0],
             'sample_identity': row[1],
@@ -216,7 +313,10 @@ def get_nodes():
             'par_umol': row[4],
             'battery_mv': row[5],
             'rssi': row[6],
-            'last_seen': row[7].isoformat() if row[7] else None
+            'last_seen': row[7].isoformat() if row[7] else None,
+            'battery_slope_mv_per_h': round(row[8], 3) if row[8] is not None else None,
+            'battery_empty_at': row[9].isoformat() if row[9] else None,
+            'hours_to_empty': round(max(float(row[10]), 0.0), 1) if row[10] is not None else None
         } for row in rows]
         
         return jsonify(nodes), 200
@@ -224,6 +324,132 @@ def get_nodes():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route('/api/telemetry/history', methods=['GET'])
+def get_telemetry_history():
+    """
+    Get a node's environment history from the finest aggregate tier
+    (1-minute, hourly or daily) that fits the span in MAX_HISTORY_POINTS.
+    
+    Query: node_id (required), hours (default 24, positive and finite)
+    """
+    node_id = request.args.get('node_id')
+    if not node_id:
+        return jsonify({"status": "error", "message": "node_id is required"}), 400
+    try:
+        hours = float(request.args.get('hours', 24))
+        span = timedelta(hours=hours)
+    except (ValueError, OverflowError):
+        hours = math.nan
+    if not (math.isfinite(hours) and hours > 0):
+        return jsonify({"status": "error", "message": "hours must be a positive number"}), 400
+    
+    view, width = select_telemetry_tier(span)
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            # view comes from TELEMETRY_TIERS, never from user input
+            cur.execute(f"""
+                SELECT bucket, avg_temp, min_temp, max_temp, avg_humidity,
+                       avg_par, sample_count
+                FROM {view}
+                WHERE node_id = %s AND bucket > NOW() - %s
+                ORDER BY bucket
+            """, (node_id, span))
+            rows = cur.fetchall()
+        conn.close()
+        
+        return jsonify({
+            'node_id': node_id,
+            'resolution_s': int(width.total_seconds()),
+            'source': view,
+            'points': [{
+                'time': row[0].isoformat() if row[0] else None,
+                'avg_temp_c': row[1],
+                'min_temp_c': row[2],
+                'max_temp_c': row[3],
+                'avg_humidity_pct': row[4],
+                'avg_par_umol': row[5],
+                'samples': row[6]
+            } for row in rows]
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route('/api/sectors', methods=['GET'])
+def get_sectors():
+    """
+    Per-sector environment and phenotype summary from the sector rollups.
+    
+    Query: hours (default 1). Spans up to 6 hours read minute_sector_stats,
+    longer spans read hourly_sector_stats.
+    """
+    hours = request.args.get('hours', 1, type=float)
+    view = 'minute_sector_stats' if hours <= 6 else 'hourly_sector_stats'
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            # view is one of two fixed names, never user input; SUM(bigint)
+            # is numeric (Decimal, a JSON string), so counts are cast back
+            cur.execute(f"""
+                SELECT
+                    s.sector,
+                    SUM(s.avg_temp * s.sample_count) / SUM(s.sample_count),
+                    MIN(s.min_temp),
+                    MAX(s.max_temp),
+                    SUM(s.avg_humidity * s.sample_count) / SUM(s.sample_count),
+                    SUM(s.avg_par * s.sample_count) / SUM(s.sample_count),
+                    SUM(s.avg_vpd * s.sample_count) / SUM(s.sample_count),
+                    MAX(s.max_vpd),
+                    SUM(s.vpd_stress_samples)::bigint,
+                    SUM(s.heat_stress_samples)::bigint,
+                    SUM(s.cold_stress_samples)::bigint,
+                    SUM(s.sample_count)::bigint,
+                    (SELECT COUNT(*) FROM nodes n WHERE n.sector = s.sector)
+                FROM {view} s
+                WHERE s.bucket > NOW() - %s
+                GROUP BY s.sector
+                ORDER BY s.sector
+            """, (timedelta(hours=hours),))
+            rows = cur.fetchall()
+        conn.close()
+        
+        sectors = []
+        for row in rows:
+            samples = row[11] or 0
+            avg_vpd = round(float(row[6]), 3) if row[6] is not None else None
+            sectors.append({
+                'sector': row[0],
+                'nodes': row[12],
+                'samples': samples,
+                'environment': {
+                    'avg_temp_c': round(float(row[1]), 2) if row[1] is not None else None,
+                    'min_temp_c': row[2],
+                    'max_temp_c': row[3],
+                    'avg_humidity_pct': round(float(row[4]), 2) if row[4] is not None else None,
+                    'avg_par_umol': round(float(row[5]), 2) if row[5] is not None else None
+                },
+                'phenotype': {
+                    'avg_vpd_kpa': avg_vpd,
+                    'max_vpd_kpa': round(float(row[7]), 3) if row[7] is not None else None,
+                    'vpd_status': classify_vpd_status(avg_vpd) if avg_vpd is not None else None,
+                    'vpd_stress_fraction': round(row[8] / samples, 3) if samples else None,
+                    'heat_stress_fraction': round(row[9] / samples, 3) if samples else None,
+                    'cold_stress_fraction': round(row[10] / samples, 3) if samples else None
+                }
+            })
+        
+        return jsonify({
+            'period_hours': hours,
+            'source': view,
+            'sectors': sectors,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"Sector summary error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 # === CURATED DATASET ACCESS ===
 
 @app.route('/api/curated', methods=['GET'])
@@ -270,16 +496,7 @@ def calculate_phenotype():
         vpd = round(svp - avp, 3)
         
         # VPD Classification
-        if vpd < 0.4:
-            vpd_status = "LOW_TRANSPIRATION"
-        elif vpd < 0.8:
-            vpd_status = "OPTIMAL"
-        elif vpd < 1.2:
-            vpd_status = "MILD_STRESS"
-        elif vpd < 1.5:
-            vpd_status = "MODERATE_STRESS"
-        else:
-            vpd_status = "SEVERE_STRESS"
+        vpd_status = classify_vpd_status(vpd)
         
         # Transpiration Estimate (simplified Penman-Monteith)
         rn = par_umol * 0.22  # PAR to net radiation
@@ -362,16 +579,17 @@ def get_phenotype_summary():
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
+            # Minute aggregate (real-time) - re-weighted by sample count
             cur.execute("""
                 SELECT 
-                    AVG(temp_c) as avg_temp,
-                    AVG(humidity_pct) as avg_humidity,
-                    AVG(par_umol) as avg_par,
-                    MIN(temp_c) as min_temp,
-                    MAX(temp_c) as max_temp,
+                    SUM(avg_temp * sample_count) / SUM(sample_count) as avg_temp,
+                    SUM(avg_humidity * sample_count) / SUM(sample_count) as avg_humidity,
+                    SUM(avg_par * sample_count) / SUM(sample_count) as avg_par,
+                    MIN(min_temp) as min_temp,
+                    MAX(max_temp) as max_temp,
                     COUNT(DISTINCT node_id) as active_nodes
-                FROM raw_telemetry
-                WHERE time > NOW() - INTERVAL '1 hour'
+                FROM minute_node_stats
+                WHERE bucket > NOW() - INTERVAL '1 hour'
             """)
             row = cur.fetchone()
         conn.close()
@@ -414,6 +632,45 @@ def get_phenotype_summary():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+# === MAINTENANCE PLANNING ===
+
+_maintenance_planner = None
+
+
+@app.route('/api/maintenance/plan', methods=['GET'])
+def get_maintenance_plan():
+    """
+    Technician plan for the live fleet (phytotron-maintenance domain).
+    Nodes whose latest battery_mv is below low_mv get a battery
+    replacement; nodes listed in calibrate get a sensor calibration.
+
+    Query params: technicians (default 1), low_mv (default 3300),
+    calibrate (comma-separated node ids)
+    """
+    global _maintenance_planner
+    from maintenance_planner import MaintenancePlanner, build_problem, fetch_fleet, BATTERY_LOW_MV
+
+    try:
+        technicians = max(1, request.args.get('technicians', default=1, type=int))
+        low_mv = request.args.get('low_mv', default=BATTERY_LOW_MV, type=int)
+        calibrate = [n for n in request.args.get('calibrate', '').split(',') if n]
+
+        fleet = fetch_fleet(DB_URL)
+        unknown = sorted(set(calibrate) - {row[0] for row in fleet})
+        if unknown:
+            return jsonify({"status": "error", "message": f"Unknown nodes: {', '.join(unknown)}"}), 400
+
+        if _maintenance_planner is None:
+            _maintenance_planner = MaintenancePlanner()
+        objects, init, goal = build_problem(fleet, technicians, low_mv, calibrate)
+        result = _maintenance_planner.plan(objects, init, goal)
+        result['battery_low'] = sorted(f[1] for f in init if f[0] == 'battery-low')
+        return jsonify(result), 200 if result['status'] == 'solved' else 422
+    except Exception as e:
+        logger.error(f"Maintenance plan error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 # === HEALTH CHECK ===
 
 @app.route('/health', methods=['GET'])
@@ -424,5 +681,5 @@ def health_check():
 
 if __name__ == "__main__":
     logger.info("=== G.O.S. Research Support API ===")
-    logger.info("Endpoints: /api/event, /api/yield, /api/led, /api/nodes, /api/curated")
+    logger.info("Endpoints: /api/event, /api/yield, /api/ingest, /api/led, /api/nodes, /api/curated, /api/telemetry/history, /api/sectors, /api/maintenance/plan")
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,223 @@
+"""
+G.O.S. Curation Engine Benchmark
+================================
+Offline benchmark for ResearchCurationEngine. Generates synthetic research
+frames (synthetic_farm.SyntheticFarm) and runs validation, temporal joins
+and CSV export in-process - no database or docker-compose stack required.
+
+Per stage it reports wall time, rows/s and the stage's own peak RSS: the
+kernel high-water mark (VmHWM) is reset before each stage, and the rise
+over the RSS at stage start is reported too (Linux /proc; None
+elsewhere). Each run is appended
+as one JSON line (tagged with the git commit, scale and seed) so results
+can be compared across commits with --compare.
+
+Usage:
+    python services/bench_curation.py --preset bench
+    python services/bench_curation.py --nodes 10000 --days 1 --interval 300
+    python services/bench_curation.py --preset season --output bench.jsonl
+    python services/bench_curation.py --preset bench --compare bench.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sync import ResearchCurationEngine
+from synthetic_farm import SyntheticFarm
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [BENCH] %(message)s')
+logger = logging.getLogger("CurationBenchmark")
+
+# Named scales: (nodes, days, telemetry interval seconds)
+PRESETS = {
+    'bench': (40, 1, 60),          # Phytotron research bench, one day
+    'week': (40, 7, 60),
+    'season': (40, 90, 60),        # Full 90-day growing season
+    'fleet': (10000, 1, 300),      # Commercial-scale deployment
+    'fleet_season': (10000, 90, 3600),
+}
+
+STAGES = ('generate', 'validate', 'join', 'export')
+
+
+def rss_mb(field='VmRSS'):
+    """Current (VmRSS) or peak (VmHWM) resident set size in MB from /proc (None elsewhere)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Resets the kernel's peak RSS (VmHWM) to the current RSS; False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+class CurationBenchmark:
+    """Times each curation stage against a synthetic farm."""
+
+    def __init__(self, farm: SyntheticFarm, output_dir=None):
+        self.farm = farm
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="gos_bench_")
+        self.engine = ResearchCurationEngine(db_url=None)
+        self.engine.output_path = os.path.join(self.output_dir, "curated_research_dataset.csv")
+        self.stages = {}
+
+    def _timed(self, name, fn, rows_of):
+        # Peak RSS is per stage: the high-water mark is reset before each one
+        rss_before = rss_mb()
+        peak_reset = reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = rss_mb('VmHWM') if peak_reset else None
+        rows = rows_of(result)
+        self.stages[name] = {
+            'seconds': round(elapsed, 4),
+            'rows': rows,
+            'rows_per_s': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'peak_rss_mb': peak,
+            'peak_rss_delta_mb': round(peak - rss_before, 1) if peak is not None else None
+        }
+        logger.info(f"{name:<9} {elapsed:8.3f}s | {rows:>10} rows | peak RSS {peak} MB "
+                    f"(+{self.stages[name]['peak_rss_delta_mb']} MB)")
+        return result
+
+    def run(self, stages=STAGES) -> dict:
+        logger.info(
+            f"Scale: {self.farm.node_count} nodes x {self.farm.days} days @ {self.farm.interval_s}s "
+            f"(~{self.farm.expected_rows:,} telemetry rows)"
+        )
+        frames = self._timed('generate', self.farm.generate_all,
+                             lambda f: sum(len(df) for df in f.values()))
+        df_hardware = frames['hardware']
+
+        if 'validate' in stages:
+            df_hardware = self._timed('validate',
+                                      lambda: self.engine.validate_telemetry(df_hardware),
+                                      len)
+
+        df_final = self._timed('join',
+                               lambda: self.engine.synchronize_sources(
+                                   df_hardware, frames['met'], frames['led'], frames['events']),
+                               len)
+
+        if 'export' in stages:
+            def export():
+                self.engine.export_curated(df_final)
+                return df_final
+            self._timed('export', export, len)
+
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'scale': {
+                'nodes': self.farm.node_count,
+                'days': self.farm.days,
+                'interval_s': self.farm.interval_s,
+                'seed': self.farm.seed
+            },
+            'env': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'cpus': os.cpu_count()
+            },
+            'stages': self.stages
+        }
+
+
+def compare(report: dict, baseline_path: str):
+    """Prints per-stage speedups against the latest run of the same scale."""
+    baseline = None
+    with open(baseline_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('scale') == report['scale']:
+                baseline = record
+    if baseline is None:
+        logger.warning(f"No baseline with matching scale in {baseline_path}")
+        return
+
+    logger.info(f"Compared to {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, stage in report['stages'].items():
+        base = baseline['stages'].get(name)
+        if not base or not stage['seconds']:
+            continue
+        speedup = base['seconds'] / stage['seconds']
+        logger.info(f"  {name:<9} {base['seconds']:8.3f}s -> {stage['seconds']:8.3f}s ({speedup:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ResearchCurationEngine benchmark")
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="Named scale")
+    parser.add_argument("--nodes", type=int, default=40, help="Node count (40-10000)")
+    parser.add_argument("--days", type=int, default=1, help="Days of data (1-90)")
+    parser.add_argument("--interval", type=int, default=60, help="Telemetry interval (s)")
+    parser.add_argument("--seed", type=int, default=490)
+    parser.add_argument("--skip", choices=['validate', 'export'], action="append", default=[],
+                        help="Skip a stage (validation is row-wise and slow at fleet scale)")
+    parser.add_argument("--output", help="Append JSON result to this file")
+    parser.add_argument("--compare", help="JSON-lines file of previous results")
+    parser.add_argument("--keep", action="store_true", help="Keep the exported CSV")
+    args = parser.parse_args()
+
+    nodes, days, interval = PRESETS[args.preset] if args.preset else (args.nodes, args.days, args.interval)
+    farm = SyntheticFarm(node_count=nodes, days=days, interval_s=interval, seed=args.seed)
+
+    bench = CurationBenchmark(farm)
+    report = bench.run(stages=[s for s in STAGES if s not in args.skip])
+    if args.keep:
+        logger.info(f"Curated CSV kept at {bench.engine.output_path}")
+    else:
+        shutil.rmtree(bench.output_dir, ignore_errors=True)
+
+    if args.compare and os.path.exists(args.compare):
+        compare(report, args.compare)
+
+    line = json.dumps(report)
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(line + "\n")
+        logger.info(f"Result appended to {args.output}")
+    else:
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
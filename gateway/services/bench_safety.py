@@ -0,0 +1,216 @@
+"""
+G.O.S. Safety Monitor Benchmark
+===============================
+Offline benchmark for the compiled SafetyLTLMonitor.
+
+1. Reference check: incremental verdicts of a set of past-time formulas
+   are compared event by event with a naive evaluator that re-reads the
+   whole trace. Every event is preceded by a peek far in the future,
+   which must leave the monitor state unchanged.
+2. Batch check: check_batch verdicts for candidates of many sectors are
+   compared with per-candidate evaluate().
+3. Throughput: events/s for committed events (observe) and proposals
+   (check_safety) on a synthetic setpoint stream, and candidates/s for
+   check_batch, with the default laws.
+
+Usage:
+    python services/bench_safety.py
+    python services/bench_safety.py --events 200000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+import safety_ltl as ltl
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [BENCH] %(message)s')
+logger = logging.getLogger("SafetyBenchmark")
+
+REFERENCE_FORMULAS = [
+    "G(par_total <= 1500)",
+    "G(range(blue_ratio, 60s) <= 0.5)",
+    "G(temp > 10 -> temp < 40)",
+    "G(abs(delta(intensity)) <= 40 | Y (intensity < 20))",
+    "G(max(par, 2m) - min(par, 2m) < 600)",
+    "G(H[30s] (temp < 30) | O[90s] (intensity == 0))",
+    "G(!(intensity > 80) S (temp < 25))",
+    "G(O (blue_ratio > 0.4) -> H (par >= 0))",
+]
+
+
+def synthetic_stream(n, seed=490):
+    """Setpoint/telemetry events roughly every 5 s with bursts of large moves."""
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.exponential(5.0, n))
+    blue = np.clip(0.3 + np.cumsum(rng.normal(0, 0.05, n)) % 0.6 - 0.1, 0, 1)
+    return [{
+        "time": float(t[i]),
+        "par": float(rng.uniform(0, 1200)),
+        "par_increase": float(rng.uniform(0, 400)),
+        "blue_ratio": round(float(blue[i] if rng.random() > 0.05 else rng.random()), 3),
+        "intensity": int(rng.choice([0, 25, 50, 75, 100])),
+        "temp": float(rng.normal(24, 6))
+    } for i in range(n)]
+
+
+# =========================================
+# NAIVE REFERENCE (full trace per verdict)
+# =========================================
+
+def naive(node, trace, i):
+    """Value of a compiled node at event i, recomputed from the whole trace."""
+    ev, t = trace[i]
+    kind = type(node)
+    if kind is ltl._Const:
+        return node.value
+    if kind is ltl._Field:
+        return ev.get(node.name)
+    if kind is ltl._Delta:
+        prev = next((trace[j][0][node.name] for j in range(i - 1, -1, -1)
+                     if trace[j][0].get(node.name) is not None), None)
+        v = ev.get(node.name)
+        return None if v is None or prev is None else v - prev
+    if kind is ltl._WindowExtreme:
+        vals = [e.get(node.name) for e, s in trace[:i + 1] if s >= t - node.window]
+        vals = [v for v in vals if v is not None]
+        return (max(vals) if node.sign > 0 else min(vals)) if vals else None
+    if kind is ltl._Prev:
+        return i > 0 and naive(node.children[0], trace, i - 1)
+    if kind is ltl._Accumulate:
+        vals = [naive(node.children[0], trace, j) for j in range(i + 1)]
+        return all(vals) if node.op == "H" else any(vals)
+    if kind is ltl._Bounded:
+        vals = [naive(node.children[0], trace, j) for j in range(i + 1)
+                if trace[j][1] >= t - node.window]
+        return all(vals) if node.op == "H" else any(vals)
+    if kind is ltl._Since:
+        phi, psi = node.children
+        for j in range(i, -1, -1):
+            if naive(psi, trace, j):
+                return True
+            if not naive(phi, trace, j):
+                return False
+        return False
+    values = [naive(c, trace, i) for c in node.children]
+    return node._apply(values, ev, t)
+
+
+def reference_check(events=400):
+    stream = synthetic_stream(events, seed=7)
+    mismatches = 0
+    for formula in REFERENCE_FORMULAS:
+        node = ltl.compile_property(formula)
+        reference = ltl.compile_property(formula)
+        trace = []
+        for raw in stream:
+            ev = dict(raw)
+            t = ev.pop("time")
+            ev["par_total"] = ev["par"] + ev["par_increase"]
+            trace.append((ev, t))
+            # Reads must not change state: probe a much later time first
+            node.peek(ev, t + 1000.0)
+            peeked = node.peek(ev, t)
+            committed = node.commit(ev, t)
+            expected = naive(reference, trace, len(trace) - 1)
+            if not (peeked == committed == expected):
+                mismatches += 1
+        logger.info(f"  {formula}: {events} events checked")
+    return mismatches
+
+
+def batch_check(sectors=16, candidates=2000):
+    """check_batch vs. scalar evaluate() on monitors with different histories."""
+    properties = {f"p{k}": f for k, f in enumerate(REFERENCE_FORMULAS)}
+    stream = synthetic_stream(200 * sectors, seed=11)
+    monitors = [ltl.SafetyLTLMonitor(properties) for _ in range(sectors)]
+    for i, ev in enumerate(stream):
+        monitors[i % sectors].observe({k: v for k, v in ev.items() if k != "par_increase"})
+
+    rng = np.random.default_rng(3)
+    now = stream[-1]["time"] + 5.0
+    rows = rng.integers(0, sectors, candidates)
+    actions = {
+        "blue_ratio": rng.uniform(0, 1, candidates),
+        "par_increase": rng.uniform(0, 600, candidates),
+        "intensity": rng.choice([0.0, 25.0, 50.0, 75.0, 100.0], candidates)
+    }
+    states = {"par": rng.uniform(0, 1200, sectors), "temp": rng.normal(24, 6, sectors)}
+    safe, codes = ltl.check_batch(monitors, actions, rows, states, now=now)
+
+    mismatches = 0
+    for i in range(candidates):
+        m = rows[i]
+        verdicts = monitors[m].evaluate({k: float(v[i]) for k, v in actions.items()},
+                                        {"par": float(states["par"][m]), "temp": float(states["temp"][m]),
+                                         "time": now})
+        expected = sorted(v["property"] for v in verdicts)
+        if sorted(monitors[m].violations(codes[i])) != expected or safe[i] != (not expected):
+            mismatches += 1
+    return mismatches, float(safe.mean())
+
+
+def batch_throughput(sectors=64, per_sector=1000, repeats=20):
+    monitors = [ltl.SafetyLTLMonitor() for _ in range(sectors)]
+    for m, ev in zip(monitors, synthetic_stream(sectors)):
+        m.observe({"blue_ratio": ev["blue_ratio"], "par": ev["par"], "temp": ev["temp"], "time": ev["time"]})
+    rng = np.random.default_rng(5)
+    n = sectors * per_sector
+    rows = np.repeat(np.arange(sectors), per_sector)
+    actions = {"blue_ratio": rng.uniform(0, 1, n), "par_increase": rng.uniform(0, 600, n)}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        ltl.check_batch(monitors, actions, rows)
+    return n * repeats / (time.perf_counter() - start), n
+
+
+def throughput(n):
+    stream = synthetic_stream(n)
+    monitor = ltl.SafetyLTLMonitor()
+    logging.getLogger("SafetyMonitor").setLevel(logging.CRITICAL)
+
+    start = time.perf_counter()
+    for ev in stream:
+        monitor.observe(ev)
+    observe_s = time.perf_counter() - start
+
+    monitor = ltl.SafetyLTLMonitor()
+    vetoes = 0
+    start = time.perf_counter()
+    for ev in stream:
+        state = {"time": ev["time"], "par": ev["par"], "temp": ev["temp"]}
+        action = {"par_increase": ev["par_increase"], "blue_ratio": ev["blue_ratio"]}
+        if monitor.check_safety(action, state):
+            monitor.log_state({"blue_ratio": ev["blue_ratio"], "intensity": ev["intensity"], **state})
+        else:
+            vetoes += 1
+    check_s = time.perf_counter() - start
+    return observe_s, check_s, vetoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SafetyLTLMonitor benchmark")
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    logger.info("Reference check (incremental vs. naive full-trace evaluation)")
+    mismatches = reference_check()
+    logger.info(f"Mismatches: {mismatches}")
+
+    mismatches_batch, safe_share = batch_check()
+    logger.info(f"check_batch vs. evaluate (16 sectors, 2000 candidates): {mismatches_batch} mismatches, "
+                f"{safe_share:.0%} safe")
+    mismatches += mismatches_batch
+
+    observe_s, check_s, vetoes = throughput(args.events)
+    logger.info(f"observe:      {args.events / observe_s:,.0f} events/s "
+                f"({observe_s / args.events * 1e6:.1f} µs/event, {len(ltl.DEFAULT_PROPERTIES)} laws)")
+    logger.info(f"check+commit: {args.events / check_s:,.0f} proposals/s "
+                f"({check_s / args.events * 1e6:.1f} µs/proposal, {vetoes} vetoed)")
+    rate, n = batch_throughput()
+    logger.info(f"check_batch:  {rate:,.0f} candidates/s ({n:,} candidates of 64 sectors per call, "
+                f"{n / rate * 1000:.1f} ms/call)")
+    if mismatches:
+        raise SystemExit(1)
@@ -0,0 +1,176 @@
+"""
+G.O.S. UDP Ingest Benchmark
+===========================
+Loopback throughput benchmark for the MQTT-SN relay in multi-process
+(SO_REUSEPORT) mode.
+
+1. Scaling: for each worker count, a RelaySupervisor (FORWARD=none) is
+   flooded by sender processes that each spread gos_research_packet_t
+   datagrams over many source ports, like a mesh rejoin storm. Reports
+   decoded packets/s, kernel loss and the per-worker share.
+2. Restart check: one worker is SIGKILLed; the supervisor must respawn
+   it, the new worker must receive traffic, and the aggregated
+   counters must keep the dead worker's totals.
+
+Throughput only scales while there are free cores for the workers and
+the senders (os.cpu_count() is printed). test_udp_ingest.py runs both as
+pytest checks and asserts the scaling when the cores are there.
+
+Usage:
+    python services/bench_udp_ingest.py
+    python services/bench_udp_ingest.py --workers 1,2,4,8 --senders 4 --duration 5
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import time
+
+from mqtt_sn_bridge import PACKET, PROTOCOL_VER, MQTTSNRelay, RelaySupervisor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [BENCH] %(message)s')
+logger = logging.getLogger("UDPIngestBenchmark")
+
+
+def frames(n_nodes, frames_per_datagram, seed):
+    rng = random.Random(seed)
+    datagrams = []
+    for node in range(n_nodes):
+        datagrams.append(b"".join(
+            PACKET.pack(PROTOCOL_VER, node % 40 + 1, 0x00124B0000000000 + node,
+                        rng.uniform(15, 30), rng.uniform(50, 90), rng.randint(0, 60000), rng.randint(3000, 4200))
+            for _ in range(frames_per_datagram)))
+    return datagrams
+
+
+def send_flood(port, duration_s, n_sockets, frames_per_datagram, seed, results):
+    """Sender process: round-robin over n_sockets source ports."""
+    datagrams = frames(n_sockets, frames_per_datagram, seed)
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(n_sockets)]
+    target = ("127.0.0.1", port)
+    sent = 0
+    deadline = time.monotonic() + duration_s
+    while time.monotonic() < deadline:
+        for sock, datagram in zip(sockets, datagrams):
+            try:
+                sock.sendto(datagram, target)
+                sent += 1
+            except OSError:
+                pass
+    results.put(sent)
+
+
+def wait_ready(supervisor, timeout_s=10.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        supervisor.poll()
+        if all(stats is not None for stats in supervisor.current):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def flood(supervisor, port, args, seed=0):
+    """Runs the senders once; returns (datagrams sent, counters before, counters after)."""
+    supervisor.poll()
+    before = supervisor.totals()
+    results = multiprocessing.Queue()
+    senders = [multiprocessing.Process(target=send_flood, args=(port, args.duration, args.sockets,
+                                                               args.frames_per_datagram, seed + i, results))
+               for i in range(args.senders)]
+    for sender in senders:
+        sender.start()
+    sent = sum(results.get() for _ in senders)
+    for sender in senders:
+        sender.join()
+    # Let the workers drain their socket buffers and report
+    time.sleep(2.5)
+    supervisor.poll()
+    return sent, before, supervisor.totals()
+
+
+def run_scaling(args):
+    rows = []
+    for n_workers in args.workers:
+        port = args.port + n_workers
+        relay = MQTTSNRelay(port=port, host="127.0.0.1", forward="none", workers=n_workers)
+        supervisor = RelaySupervisor(relay.settings(), n_workers, stats_interval_s=3600)
+        supervisor.start()
+        try:
+            if not wait_ready(supervisor):
+                raise RuntimeError(f"{n_workers} workers did not come up")
+            sent, before, after = flood(supervisor, port, args)
+        finally:
+            supervisor.stop()
+        received = after['packets'] - before['packets']
+        share = supervisor.per_worker_packets()
+        rows.append((n_workers, sent, received, after['decode_errors'], after['dropped'], share))
+
+    base = rows[0][2] / args.duration
+    print(f"\nCPU cores: {os.cpu_count()} | senders: {args.senders} x {args.sockets} source ports | "
+          f"{args.frames_per_datagram} frame(s)/datagram | {args.duration:.0f} s per run")
+    print(f"{'workers':>7} {'sent/s':>10} {'decoded/s':>10} {'loss':>7} {'speedup':>8} {'errors':>6}  per-worker share")
+    for n_workers, sent, received, errors, dropped, share in rows:
+        rate = received / args.duration
+        loss = 1 - received / sent if sent else 0.0
+        total = sum(share) or 1
+        split = " ".join(f"{s / total:.0%}" for s in share)
+        print(f"{n_workers:>7} {sent / args.duration:>10,.0f} {rate:>10,.0f} {loss:>7.1%} "
+              f"{rate / base:>7.2f}x {errors + dropped:>6}  {split}")
+    return rows
+
+
+def run_restart_check(args):
+    port = args.port + 100
+    args.duration = 1.0
+    relay = MQTTSNRelay(port=port, host="127.0.0.1", forward="none", workers=2)
+    supervisor = RelaySupervisor(relay.settings(), 2, stats_interval_s=3600, restart_backoff_s=0.2)
+    supervisor.start()
+    try:
+        if not wait_ready(supervisor):
+            raise RuntimeError("workers did not come up")
+        flood(supervisor, port, args, seed=1)
+        supervisor.poll()
+        before = supervisor.totals()
+        victim = supervisor.processes[0].pid
+        os.kill(victim, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and (supervisor.processes[0].pid == victim or
+                                               supervisor.current[0] is None):
+            supervisor.poll()
+            time.sleep(0.1)
+        respawned = supervisor.processes[0].pid != victim and supervisor.processes[0].is_alive()
+        kept = supervisor.totals()['packets'] >= before['packets']
+        flood(supervisor, port, args, seed=2)
+        new_share = supervisor.per_worker_packets()[0]
+    finally:
+        supervisor.stop()
+    ok = respawned and kept and new_share > 0
+    print(f"\nRestart check: worker pid {victim} killed -> respawned={respawned}, "
+          f"totals kept={kept}, new worker decoded {new_share:,} packets -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G.O.S. UDP ingest (SO_REUSEPORT) benchmark")
+    parser.add_argument("--workers", type=lambda s: [int(x) for x in s.split(",")], default=[1, 2, 4],
+                        help="Comma-separated worker counts")
+    parser.add_argument("--senders", type=int, default=2, help="Sender processes")
+    parser.add_argument("--sockets", type=int, default=64, help="Source ports per sender")
+    parser.add_argument("--frames-per-datagram", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--port", type=int, default=47800, help="Base UDP port")
+    parser.add_argument("--skip-restart", action="store_true")
+    args = parser.parse_args()
+
+    run_scaling(args)
+    if not args.skip_restart and not run_restart_check(args):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,43 @@ import random
 import logging
 import math
 from datetime import datetime
+import numpy as np
 import psycopg2
 import os
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [PHYTOTRON] %(message)s')
 logger = logging.getLogger("PhytotronSim")
 
+# Physical greenhouse sectors (Phytotron bench layout)
+DEFAULT_SECTORS = ['A1', 'A2', 'A3', 'B1', 'B2', 'B3', 'C1', 'C2']
+
+
+def diurnal_ambient(hour):
+    """
+    Greenhouse diurnal climate model.
+
+    Accepts a scalar hour-of-day or a NumPy array of hours so the same
+    curves drive both the live simulator and offline synthetic datasets.
+    Returns (temp_c, humidity_pct, par_umol).
+    """
+    hour = np.asarray(hour, dtype=float)
+
+    # Diurnal temperature cycle: peaks at 3 PM (hour 15), lowest at 5 AM
+    # Ontario greenhouse typical range: 18C (night) to 26C (day)
+    temp_base = 22 + 4 * np.sin((hour - 9) * math.pi / 12)
+
+    # Relative humidity: inverse to temperature
+    # Range: 45% (day) to 75% (night)
+    hum_base = 60 - 15 * np.sin((hour - 9) * math.pi / 12)
+
+    # PAR (Photosynthetically Active Radiation) follows sun pattern
+    # Peak at solar noon, zero at night
+    daylight = (hour >= 6) & (hour <= 20)
+    par_base = np.where(daylight, 800 * np.sin((hour - 6) * math.pi / 14), 0.0)
+
+    return temp_base, hum_base, np.maximum(0, par_base)
+
+
 class PhytotronSimulator:
     """
     Production-grade Phytotron simulation for Queen's University.
@@ -21,34 +52,42 @@ class PhytotronSimulator:
         self.node_count = node_count
         self.start_time = datetime.now()
         # Sector mapping (real greenhouse would have physical sectors)
-        self.sectors = ['A1', 'A2', 'A3', 'B1', 'B2', 'B3', 'C1', 'C2']
+        self.sectors = list(DEFAULT_SECTORS)
 
-    def get_ambient_conditions(self):
+    def get_ambient_conditions(self, now=None):
         """Calculates realistic diurnal temperature and humidity."""
-        now = datetime.now()
+        now = now or datetime.now()
         hour = now.hour + now.minute/60.0
-        
-        # Diurnal temperature cycle: peaks at 3 PM (hour 15), lowest at 5 AM
-        # Ontario greenhouse typical range: 18C (night) to 26C (day)
-        temp_base = 22 + 4 * math.sin((hour - 9) * math.pi / 12)
-        
-        # Relative humidity: inverse to temperature
-        # Range: 45% (day) to 75% (night)
-        hum_base = 60 - 15 * math.sin((hour - 9) * math.pi / 12)
-        
-        # PAR (Photosynthetically Active Radiation) follows sun pattern
-        # Peak at solar noon, zero at night
-        if 6 <= hour <= 20:
-            par_base = 800 * math.sin((hour - 6) * math.pi / 14)
-        else:
-            par_base = 0
-            
-        return temp_base, hum_base, max(0, par_base)
+        temp_base, hum_base, par_base = diurnal_ambient(hour)
+        return float(temp_base), float(hum_base), float(par_base)
 
     def get_node_sector(self, node_index):
         """Maps node index to greenhouse sector."""
         return self.sectors[node_index % len(self.sectors)]
 
+    def get_node_position(self, node_index):
+        """Bench slot within the node's sector (e.g. 'A1-03')."""
+        slot = node_index // len(self.sectors) + 1
+        return f"{self.get_node_sector(node_index)}-{slot:02d}"
+
+    def commission_node(self, node_id, eui64, sector, position):
+        """Registers a node in the `nodes` dimension table when it joins the mesh."""
+        try:
+            conn = psycopg2.connect(self.db_url)
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO nodes (node_id, eui64, sector, position)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (node_id) DO UPDATE
+                    SET eui64 = EXCLUDED.eui64,
+                        sector = EXCLUDED.sector,
+                        position = EXCLUDED.position
+                """, (node_id, eui64, sector, position))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Node {node_id} commissioning error: {e}")
+
     async def simulate_node(self, node_index):
         """Simulates a single nRF52840 node with local variance."""
         node_id = f"PH-NODE-{node_index:02d}"
@@ -57,6 +96,7 @@ class PhytotronSimulator:
         
         # Simulate initial boot delay (realistic mesh joining)
         await asyncio.sleep(random.uniform(5, 30))
+        self.commission_node(node_id, eui64, sector, self.get_node_position(node_index))
         logger.info(f"Node {node_id} joined mesh (Sector {sector})")
         
         while True:
@@ -0,0 +1,541 @@
+"""
+G.O.S. Maintenance Planner
+==========================
+Solves the phytotron-maintenance PDDL domain (ml_engine/domain.pddl)
+against the live node fleet: which nodes a technician must visit, in
+which order, to replace low batteries and recalibrate sensors.
+
+Problem (from the database):
+- objects: technicians, greenhouse locations (depot + sectors), nodes
+- init: (at node sector) from nodes, (battery-low node) where the latest
+  node_health battery_mv is below the threshold, technicians at the
+  depot, (connected a b) along the greenhouse aisles
+- goal: (charged n) for every low node, (calibrated n) on request
+
+Planner:
+- PDDL domain parser (STRIPS, typing, equality)
+- grounding with static preconditions (e.g. where a node sits, aisle
+  graph) evaluated once; ground tasks are cached per fleet layout
+- reachability and goal-relevance pruning per query
+- lazy greedy best-first search with the FF relaxed-plan heuristic and
+  helpful-action tie breaking, on frozenset-of-fact-index states
+
+Usage:
+    python services/maintenance_planner.py            # plan from DATABASE_URL
+    python services/maintenance_planner.py --demo --nodes 400
+"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [MAINT-PLAN] %(message)s')
+logger = logging.getLogger("MaintenancePlanner")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DOMAIN = os.getenv("PDDL_DOMAIN") or next(
+    (p for p in ("/app/domain.pddl", os.path.join(_HERE, "..", "..", "ml_engine", "domain.pddl"))
+     if os.path.exists(p)), "/app/domain.pddl")
+BATTERY_LOW_MV = 3300   # plan replacement above the 3000 mV operating floor
+DEPOT = "depot"
+
+
+class PDDLError(ValueError):
+    pass
+
+
+# =========================================
+# PDDL DOMAIN
+# =========================================
+
+def _parse_sexp(text):
+    text = re.sub(r";[^\n]*", "", text.lower())
+    tokens = re.findall(r"\(|\)|[^\s()]+", text)
+    stack = [[]]
+    for tok in tokens:
+        if tok == "(":
+            stack.append([])
+        elif tok == ")":
+            if len(stack) < 2:
+                raise PDDLError("Unbalanced ')'")
+            done = stack.pop()
+            stack[-1].append(done)
+        else:
+            stack[-1].append(tok)
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise PDDLError("Unbalanced '('")
+    return stack[0][0]
+
+
+def _typed_list(items):
+    """['?a', '?b', '-', 't', '?c'] -> [('?a', 't'), ('?b', 't'), ('?c', 'object')]"""
+    typed, pending, i = [], [], 0
+    while i < len(items):
+        if items[i] == "-":
+            kind = items[i + 1]
+            kind = tuple(kind[1:]) if isinstance(kind, list) else (kind,)
+            typed += [(name, kind) for name in pending]
+            pending, i = [], i + 2
+        else:
+            pending.append(items[i])
+            i += 1
+    return typed + [(name, ("object",)) for name in pending]
+
+
+def _literals(expr):
+    """Conjunction -> list of (positive, atom) with atom = (pred, *args)."""
+    if not expr:
+        return []
+    if expr[0] == "and":
+        return [lit for sub in expr[1:] for lit in _literals(sub)]
+    if expr[0] == "not":
+        return [(False, tuple(expr[1]))]
+    if any(isinstance(x, list) for x in expr):
+        raise PDDLError(f"Unsupported expression {expr} (STRIPS conjunctions only)")
+    return [(True, tuple(expr))]
+
+
+class Action:
+    def __init__(self, name, params, pre, add, delete):
+        self.name = name
+        self.params = params      # [(var, types)]
+        self.pre = pre            # [(positive, atom)]
+        self.add = add            # [atom]
+        self.delete = delete      # [atom]
+
+
+class Domain:
+    """Parsed STRIPS domain (:strips :typing :equality)."""
+
+    def __init__(self, text):
+        tree = _parse_sexp(text)
+        if tree[0] != "define":
+            raise PDDLError("Expected (define (domain ...))")
+        self.name = tree[1][1]
+        self.parents = {}
+        self.predicates = {}
+        self.actions = []
+        for section in tree[2:]:
+            if section[0] == ":types":
+                for name, parent in _typed_list(section[1:]):
+                    self.parents[name] = parent[0]
+            elif section[0] == ":predicates":
+                for pred in section[1:]:
+                    self.predicates[pred[0]] = [t for _, t in _typed_list(pred[1:])]
+            elif section[0] == ":action":
+                fields = dict(zip(section[2::2], section[3::2]))
+                effects = _literals(fields.get(":effect", []))
+                self.actions.append(Action(
+                    section[1],
+                    _typed_list(fields.get(":parameters", [])),
+                    _literals(fields.get(":precondition", [])),
+                    [atom for positive, atom in effects if positive],
+                    [atom for positive, atom in effects if not positive]))
+        self._mark_static()
+
+    def is_a(self, kind, target):
+        while kind is not None:
+            if kind == target:
+                return True
+            kind = self.parents.get(kind, "object" if kind != "object" else None)
+        return False
+
+    def _overlap(self, a, b):
+        return any(self.is_a(x, y) or self.is_a(y, x) for x in a for y in b)
+
+    def _mark_static(self):
+        """A precondition is static if no effect can change an atom of its argument types."""
+        effects = []
+        for action in self.actions:
+            types = dict(action.params)
+            for atom in action.add + action.delete:
+                effects.append((atom[0], [types.get(arg, ("object",)) for arg in atom[1:]]))
+        for action in self.actions:
+            types = dict(action.params)
+            action.static = []
+            for positive, atom in action.pre:
+                arg_types = [types.get(arg, ("object",)) for arg in atom[1:]]
+                action.static.append(atom[0] == "=" or not any(
+                    pred == atom[0] and all(self._overlap(a, b) for a, b in zip(arg_types, eff_types))
+                    for pred, eff_types in effects))
+
+
+# =========================================
+# GROUND TASK + SEARCH
+# =========================================
+
+class GroundTask:
+    """Ground actions over indexed fluent facts (static facts compiled away)."""
+
+    def __init__(self, facts, actions):
+        self.facts = facts              # [atom]
+        self.index = {f: i for i, f in enumerate(facts)}
+        self.actions = actions          # [(name, args, pre ids, add ids, del ids)]
+
+    def prune(self, init, goal):
+        """Actions reachable from init and relevant to the goal."""
+        reached, usable, changed = set(init), [], True
+        remaining = list(range(len(self.actions)))
+        while changed:
+            changed, waiting = False, []
+            for a in remaining:
+                if all(p in reached for p in self.actions[a][2]):
+                    usable.append(a)
+                    new = set(self.actions[a][3]) - reached
+                    if new:
+                        reached |= new
+                        changed = True
+                else:
+                    waiting.append(a)
+            remaining = waiting
+        relevant, keep, changed = set(goal), set(), True
+        while changed:
+            changed = False
+            for a in usable:
+                if a not in keep and relevant.intersection(self.actions[a][3]):
+                    keep.add(a)
+                    relevant.update(self.actions[a][2])
+                    changed = True
+        return sorted(keep)
+
+    def solve(self, init, goal, max_expansions=200000):
+        """Lazy GBFS with h_FF; returns (plan as action ids, stats)."""
+        started = time.perf_counter()
+        init, goal = frozenset(init), frozenset(goal)
+        ids = self.prune(init, goal)
+        # Dense local numbering of the facts the pruned task can touch
+        # (others never matter again); list-based bookkeeping in the heuristic
+        local = {}
+        for a in ids:
+            for f in itertools.chain(*self.actions[a][2:]):
+                local.setdefault(f, len(local))
+        for f in goal:
+            local.setdefault(f, len(local))
+        pre = [tuple(local[f] for f in self.actions[a][2]) for a in ids]
+        add = [tuple(local[f] for f in self.actions[a][3]) for a in ids]
+        delete = [frozenset(local[f] for f in self.actions[a][4]) for a in ids]
+        init = frozenset(local[f] for f in init if f in local)
+        goal = frozenset(local[f] for f in goal)
+        npre = [len(p) for p in pre]
+        pre_of = [[] for _ in local]
+        anchored, no_pre = {}, []
+        for k, p in enumerate(pre):
+            for f in p:
+                pre_of[f].append(k)
+            if p:
+                anchored.setdefault(p[0], []).append(k)
+            else:
+                no_pre.append(k)
+        unset = len(local) + 1
+
+        def heuristic(state):
+            level = [unset] * len(local)
+            for f in state:
+                level[f] = 0
+            counter = npre[:]
+            achiever = {}
+            action_level = {}
+            frontier, ready = list(state), list(no_pre)
+            unreached = len(goal - state)
+            layer = 0
+            while unreached:
+                for f in frontier:
+                    for k in pre_of[f]:
+                        counter[k] -= 1
+                        if counter[k] == 0:
+                            ready.append(k)
+                if not ready:
+                    return None, ()
+                frontier = []
+                for k in ready:
+                    action_level[k] = layer
+                    for g in add[k]:
+                        if level[g] == unset:
+                            level[g] = layer + 1
+                            achiever[g] = k
+                            frontier.append(g)
+                            if g in goal:
+                                unreached -= 1
+                ready = []
+                layer += 1
+            relaxed, stack, marked = set(), [g for g in goal if level[g] > 0], set()
+            while stack:
+                g = stack.pop()
+                if g in marked:
+                    continue
+                marked.add(g)
+                k = achiever[g]
+                if k not in relaxed:
+                    relaxed.add(k)
+                    stack.extend(p for p in pre[k] if level[p] > 0)
+            return len(relaxed), {k for k in relaxed if action_level[k] == 0}
+
+        def applicable(state):
+            for f in state:
+                for k in anchored.get(f, ()):
+                    if all(p in state for p in pre[k]):
+                        yield k
+            yield from no_pre
+
+        counter = itertools.count()
+        parent = {init: None}
+        closed = set()
+        queue = [(0, 0, next(counter), init)]
+        expanded = evaluated = 0
+        while queue and expanded < max_expansions:
+            _, _, _, state = heapq.heappop(queue)
+            if state in closed:
+                continue
+            closed.add(state)
+            if goal <= state:
+                plan = []
+                while parent[state] is not None:
+                    state, a = parent[state]
+                    plan.append(a)
+                plan.reverse()
+                return plan, {'expanded': expanded, 'evaluated': evaluated, 'actions': len(ids),
+                              'plan_ms': round((time.perf_counter() - started) * 1000, 2)}
+            h, helpful = heuristic(state)
+            evaluated += 1
+            if h is None:
+                continue
+            expanded += 1
+            for k in applicable(state):
+                succ = (state - delete[k]).union(add[k])
+                if succ in parent:
+                    continue
+                parent[succ] = (state, ids[k])
+                heapq.heappush(queue, (h, 0 if k in helpful else 1, next(counter), succ))
+        return None, {'expanded': expanded, 'evaluated': evaluated, 'actions': len(ids),
+                      'plan_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+class MaintenancePlanner:
+    """Grounds domain.pddl against a greenhouse fleet and plans technician work."""
+
+    def __init__(self, domain_path=DEFAULT_DOMAIN, max_cached=4):
+        with open(domain_path) as f:
+            self.domain = Domain(f.read())
+        self.max_cached = max_cached
+        self._tasks = {}
+
+    def ground(self, objects, init) -> GroundTask:
+        """
+        Ground task for objects {name: type}; static preconditions are
+        checked against init. Cached on the objects and static facts.
+        """
+        static_preds = {atom[0] for action in self.domain.actions
+                        for (positive, atom), static in zip(action.pre, action.static) if static}
+        key = (frozenset(objects.items()), frozenset(f for f in init if f[0] in static_preds))
+        if key in self._tasks:
+            return self._tasks[key]
+
+        init = set(init)
+        by_type = {}
+        for name, kind in objects.items():
+            for t in set(self.domain.parents) | set(objects.values()) | {"object"}:
+                if self.domain.is_a(kind, t):
+                    by_type.setdefault(t, []).append(name)
+
+        facts, index, ground = [], {}, []
+
+        def fact_id(atom):
+            if atom not in index:
+                index[atom] = len(facts)
+                facts.append(atom)
+            return index[atom]
+
+        for action in self.domain.actions:
+            variables = [v for v, _ in action.params]
+            # Static preconditions, each checked as soon as its variables are bound
+            checks = [[] for _ in variables]
+            dynamic = []
+            for (positive, atom), static in zip(action.pre, action.static):
+                if not static:
+                    if not positive:
+                        raise PDDLError(f"{action.name}: negative fluent preconditions are not supported")
+                    dynamic.append(atom)
+                    continue
+                depth = max([variables.index(a) for a in atom[1:] if a in variables], default=0)
+                checks[depth].append((positive, atom))
+
+            def holds(positive, atom, binding):
+                args = tuple(binding.get(a, a) for a in atom[1:])
+                value = args[0] == args[1] if atom[0] == "=" else (atom[0],) + args in init
+                return value == positive
+
+            def bind(i, binding):
+                if i == len(variables):
+                    b = lambda atom: (atom[0],) + tuple(binding.get(a, a) for a in atom[1:])
+                    ground.append((action.name, tuple(binding[v] for v in variables),
+                                   tuple(fact_id(b(a)) for a in dynamic),
+                                   tuple(fact_id(b(a)) for a in action.add),
+                                   tuple(fact_id(b(a)) for a in action.delete)))
+                    return
+                var, types = action.params[i]
+                for obj in sorted({o for t in types for o in by_type.get(t, ())}):
+                    binding[var] = obj
+                    if all(holds(positive, atom, binding) for positive, atom in checks[i]):
+                        bind(i + 1, binding)
+                    del binding[var]
+
+            bind(0, {})
+
+        task = GroundTask(facts, ground)
+        if len(self._tasks) >= self.max_cached:
+            self._tasks.pop(next(iter(self._tasks)))
+        self._tasks[key] = task
+        return task
+
+    def plan(self, objects, init, goal) -> dict:
+        """Plans for a problem; returns steps, technician routes and search stats."""
+        started = time.perf_counter()
+        task = self.ground(objects, init)
+        ground_ms = (time.perf_counter() - started) * 1000
+        missing = [g for g in goal if g not in task.index]
+        if missing:
+            return {'status': 'unsolvable', 'reason': f"goal atoms never reachable: {missing[:5]}",
+                    'steps': [], 'ground_ms': round(ground_ms, 2)}
+        init_ids = {task.index[f] for f in init if f in task.index}
+        plan, stats = task.solve(init_ids, {task.index[g] for g in goal})
+        stats['ground_ms'] = round(ground_ms, 2)
+        if plan is None:
+            return {'status': 'unsolvable', 'steps': [], **stats}
+
+        steps = [{'action': task.actions[a][0], 'args': list(task.actions[a][1])} for a in plan]
+        routes = {}
+        for obj, kind in objects.items():
+            if kind == "technician":
+                start = next((f[2] for f in init if f[0] == "at" and f[1] == obj), None)
+                routes[obj] = [start]
+        for step in steps:
+            if step['action'] == "move":
+                routes[step['args'][0]].append(step['args'][2])
+        return {'status': 'solved', 'length': len(steps), 'steps': steps, 'routes': routes, **stats}
+
+
+# =========================================
+# GREENHOUSE PROBLEM
+# =========================================
+
+def greenhouse_graph(sectors):
+    """Aisle graph: sectors of a row (A1-A2-A3) are chained; the depot and
+    the row heads (A1, B1, ...) lie on the main aisle."""
+    rows = {}
+    for sector in sorted(sectors):
+        rows.setdefault(re.match(r"[A-Za-z]*", sector).group(0), []).append(sector)
+    edges = []
+    aisle = [DEPOT] + [row[0] for row in rows.values()]
+    edges += list(zip(aisle, aisle[1:]))
+    for row in rows.values():
+        edges += list(zip(row, row[1:]))
+    return edges
+
+
+def build_problem(fleet, technicians=1, low_mv=BATTERY_LOW_MV, calibrate=(), edges=None):
+    """
+    PDDL objects/init/goal for a fleet.
+
+    Args:
+        fleet: [(node_id, sector, battery_mv)] (battery_mv may be None)
+        technicians: Number of technicians starting at the depot
+        low_mv: battery-low threshold (mV)
+        calibrate: node ids whose sensors must be calibrated
+        edges: Location graph [(a, b)] (default greenhouse_graph)
+    """
+    sectors = sorted({sector for _, sector, _ in fleet})
+    edges = edges or greenhouse_graph(sectors)
+    objects = {DEPOT: "location", **{s: "location" for s in sectors}}
+    objects.update({f"tech-{k + 1}": "technician" for k in range(technicians)})
+    objects.update({node_id: "node" for node_id, _, _ in fleet})
+    for a, b in edges:
+        objects.setdefault(a, "location")
+        objects.setdefault(b, "location")
+
+    init = {("connected", a, b) for a, b in edges} | {("connected", b, a) for a, b in edges}
+    init |= {("at", f"tech-{k + 1}", DEPOT) for k in range(technicians)}
+    init |= {("at", node_id, sector) for node_id, sector, _ in fleet}
+    low = [node_id for node_id, _, mv in fleet if mv is not None and mv < low_mv]
+    init |= {("battery-low", node_id) for node_id in low}
+    goal = [("charged", node_id) for node_id in low] + [("calibrated", node_id) for node_id in calibrate]
+    return objects, init, goal
+
+
+def to_problem_pddl(objects, init, goal, name="maintenance", domain="phytotron-maintenance") -> str:
+    """Problem in PDDL (for external planners / inspection)."""
+    by_type = {}
+    for obj, kind in sorted(objects.items()):
+        by_type.setdefault(kind, []).append(obj)
+    objs = "\n    ".join(f"{' '.join(names)} - {kind}" for kind, names in by_type.items())
+    facts = "\n    ".join(f"({' '.join(f)})" for f in sorted(init))
+    goals = " ".join(f"({' '.join(g)})" for g in goal)
+    return (f"(define (problem {name}) (:domain {domain})\n  (:objects\n    {objs})\n"
+            f"  (:init\n    {facts})\n  (:goal (and {goals})))\n")
+
+
+def fetch_fleet(db_url):
+    """[(node_id, sector, latest battery_mv)] from nodes + node_health."""
+    import psycopg2
+
+    conn = psycopg2.connect(db_url)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT n.node_id, n.sector, h.battery_mv
+            FROM nodes n
+            LEFT JOIN LATERAL (
+                SELECT battery_mv FROM node_health
+                WHERE node_id = n.node_id
+                ORDER BY time DESC LIMIT 1
+            ) h ON TRUE
+            ORDER BY n.node_id
+        """)
+        rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def synthetic_fleet(nodes, low_share=0.3, seed=47):
+    """farm_sim layout (8 sectors, round-robin) with random battery levels."""
+    rng = random.Random(seed)
+    sectors = ['A1', 'A2', 'A3', 'B1', 'B2', 'B3', 'C1', 'C2']
+    return [(f"RF-NODE-{i:03d}", sectors[i % len(sectors)],
+             rng.randint(3000, BATTERY_LOW_MV - 1) if rng.random() < low_share else rng.randint(3400, 4200))
+            for i in range(nodes)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Technician maintenance planning (phytotron-maintenance)")
+    parser.add_argument("--demo", action="store_true", help="Synthetic fleet instead of the database")
+    parser.add_argument("--nodes", type=int, default=400)
+    parser.add_argument("--technicians", type=int, default=1)
+    parser.add_argument("--low-mv", type=int, default=BATTERY_LOW_MV)
+    parser.add_argument("--domain", default=DEFAULT_DOMAIN)
+    parser.add_argument("--pddl", action="store_true", help="Print the problem in PDDL")
+    args = parser.parse_args()
+
+    if args.demo:
+        fleet = synthetic_fleet(args.nodes)
+    else:
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            logger.error("DATABASE_URL not set!")
+            exit(1)
+        fleet = fetch_fleet(db_url)
+
+    planner = MaintenancePlanner(args.domain)
+    objects, init, goal = build_problem(fleet, args.technicians, args.low_mv)
+    if args.pddl:
+        print(to_problem_pddl(objects, init, goal))
+    for attempt in ("cold", "cached grounding"):
+        result = planner.plan(objects, init, goal)
+        logger.info(f"{attempt}: {len(fleet)} nodes, {len(goal)} goals -> {result['status']} "
+                    f"({result.get('length', 0)} steps) | ground {result['ground_ms']} ms, "
+                    f"search {result.get('plan_ms')} ms, {result.get('expanded')} expanded, "
+                    f"{result.get('actions')} relevant actions")
+    for tech, route in result.get('routes', {}).items():
+        logger.info(f"{tech}: {' -> '.join(route)}")
@@ -18,6 +18,7 @@ import random
 import logging
 import math
 from datetime import datetime
+import numpy as np
 import psycopg2
 import os
 
@@ -25,6 +26,34 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s [MET-STATION] %(mess
 logger = logging.getLogger("MetStation")
 
 
+def solar_profile(hour):
+    """
+    Noise-free diurnal met-station profile.
+
+    Accepts a scalar hour-of-day or a NumPy array of hours; the live
+    simulator adds sensor noise on top, offline generators reuse it as-is.
+    """
+    hour = np.asarray(hour, dtype=float)
+    daylight = (hour >= 6) & (hour <= 20)
+    solar_angle = np.where(daylight, np.sin((hour - 6) * math.pi / 14), 0.0)
+    
+    return {
+        'daylight': daylight,
+        # Peak ~500 W/m² at solar noon, 0 at night
+        'net_radiation': 500 * solar_angle,
+        # Blue (450nm): ~45 W/m²/nm at peak
+        'spectral_blue': 45 * solar_angle,
+        # Red (660nm): ~180 W/m²/nm at peak
+        'spectral_red': 180 * solar_angle,
+        # Air temperature: follows diurnal cycle
+        'air_temp': 22 + 4 * np.sin((hour - 9) * math.pi / 12),
+        # Relative humidity: inverse to temperature
+        'rel_humidity': 60 - 15 * np.sin((hour - 9) * math.pi / 12),
+        # CO2: higher at night due to respiration
+        'co2': 400 + np.where(daylight, 0, 100),
+    }
+
+
 class MetStationSimulator:
     """
     Simulates realistic Phytotron meteorological data.
@@ -34,33 +63,30 @@ class MetStationSimulator:
     def __init__(self, db_url):
         self.db_url = db_url
 
-    def get_solar_conditions(self):
+    def get_solar_conditions(self, now=None):
         """Calculate solar conditions based on time of day."""
-        now = datetime.now()
+        now = now or datetime.now()
         hour = now.hour + now.minute / 60.0
+        profile = solar_profile(hour)
+        daylight = bool(profile['daylight'])
         
         # Net radiation: follows sun pattern (0 at night, peak at noon)
-        # Peak ~500 W/m² at solar noon, 0 at night
-        if 6 <= hour <= 20:
-            solar_angle = math.sin((hour - 6) * math.pi / 14)
-            net_radiation = 500 * solar_angle + random.gauss(0, 20)
+        if daylight:
+            net_radiation = float(profile['net_radiation']) + random.gauss(0, 20)
         else:
             net_radiation = random.gauss(0, 5)  # Small thermal radiation at night
         
         # Spectral irradiance depends on LED schedule and sunlight
-        # Blue (450nm): ~45 W/m²/nm at peak
-        # Red (660nm): ~180 W/m²/nm at peak
-        spectral_blue = max(0, 45 * solar_angle + random.gauss(0, 3)) if 6 <= hour <= 20 else random.gauss(5, 1)
-        spectral_red = max(0, 180 * solar_angle + random.gauss(0, 10)) if 6 <= hour <= 20 else random.gauss(20, 2)
-        
-        # Air temperature: follows diurnal cycle
-        air_temp = 22 + 4 * math.sin((hour - 9) * math.pi / 12) + random.gauss(0, 0.5)
-        
-        # Relative humidity: inverse to temperature
-        rel_humidity = 60 - 15 * math.sin((hour - 9) * math.pi / 12) + random.gauss(0, 2)
+        if daylight:
+            spectral_blue = max(0, float(profile['spectral_blue']) + random.gauss(0, 3))
+            spectral_red = max(0, float(profile['spectral_red']) + random.gauss(0, 10))
+        else:
+            spectral_blue = random.gauss(5, 1)
+            spectral_red = random.gauss(20, 2)
         
-        # CO2: higher at night due to respiration
-        co2 = 400 + (100 if hour < 6 or hour > 20 else 0) + random.gauss(0, 10)
+        air_temp = float(profile['air_temp']) + random.gauss(0, 0.5)
+        rel_humidity = float(profile['rel_humidity']) + random.gauss(0, 2)
+        co2 = float(profile['co2']) + random.gauss(0, 10)
         
         return {
             'net_radiation': max(0, net_radiation),
@@ -8,6 +8,7 @@ MQTT Topics:
 - gos/telemetry/{node_id} - Sensor data from nodes
 - gos/health/{node_id} - Node health/status updates
 - gos/led/schedule - LED control commands
+- gos/commission/{node_id} - Node commissioning (EUI64, sector, position)
 """
 
 import paho.mqtt.client as mqtt
@@ -39,7 +40,8 @@ class MQTTDatabaseBridge:
         client.subscribe("gos/telemetry/#")
         client.subscribe("gos/health/#")
         client.subscribe("gos/led/schedule")
-        logger.info("Subscribed to gos/telemetry/#, gos/health/#, gos/led/schedule")
+        client.subscribe("gos/commission/#")
+        logger.info("Subscribed to gos/telemetry/#, gos/health/#, gos/led/schedule, gos/commission/#")
     
     def on_disconnect(self, client, userdata, rc, properties=None):
         logger.warning(f"Disconnected from MQTT broker (rc={rc})")
@@ -55,6 +57,8 @@ class MQTTDatabaseBridge:
                 self.handle_health(topic, payload)
             elif topic == "gos/led/schedule":
                 self.handle_led_schedule(payload)
+            elif topic.startswith("gos/commission/"):
+                self.handle_commission(topic, payload)
             else:
                 logger.warning(f"Unknown topic: {topic}")
                 
@@ -133,6 +137,32 @@ class MQTTDatabaseBridge:
         except Exception as e:
             logger.error(f"LED schedule insert error: {e}")
     
+    def handle_commission(self, topic, payload):
+        """Upsert a commissioned node into the nodes dimension table."""
+        node_id = topic.split('/')[-1]
+        
+        try:
+            conn = psycopg2.connect(self.db_url)
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO nodes (node_id, eui64, sector, position)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (node_id) DO UPDATE
+                    SET eui64 = EXCLUDED.eui64,
+                        sector = EXCLUDED.sector,
+                        position = EXCLUDED.position
+                """, (
+                    node_id,
+                    payload.get('eui64', payload.get('sample_identity')),
+                    payload.get('sector'),
+                    payload.get('position')
+                ))
+            conn.commit()
+            conn.close()
+            logger.info(f"Node {node_id} commissioned in sector {payload.get('sector')}")
+        except Exception as e:
+            logger.error(f"Commissioning insert error: {e}")
+    
     def run(self):
         logger.info("=== G.O.S. MQTT-DB BRIDGE STARTING ===")
         logger.info(f"Connecting to {self.mqtt_broker}:{self.mqtt_port}...")
@@ -1,45 +1,426 @@
-import socket
+"""
+G.O.S. MQTT-SN Relay (Raspberry Pi border router)
+=================================================
+Bridge for nRF52 Thread nodes (UDP) -> G.O.S. MQTT/REST backbone.
+
+Nodes send gos_research_packet_t frames (firmware/include/protocol.h,
+documentation/hardware_protocol.md), 22 bytes little-endian:
+
+    protocol_ver u8 | node_index u8 | hardware_eui64 u64 | temp_c f32 |
+    hum_pct f32 | par_lux u16 | batt_mv u16
+
+A datagram may carry several frames back to back (QSPI bulk sync after
+an outage).
+
+Pipeline (asyncio):
+- DatagramProtocol decodes every frame on receipt (struct.iter_unpack)
+  and queues the samples in a bounded buffer; when it is full, samples
+  are dropped and counted instead of growing memory
+- a forwarder drains the buffer in batches:
+  FORWARD=mqtt  gos/telemetry/{node_id} (+ gos/health/{node_id} at most
+                every HEALTH_INTERVAL_S per node), picked up by mqtt_bridge
+  FORWARD=http  one JSON POST per batch to INGEST_API_URL (api.py
+                POST /api/ingest, straight into raw_telemetry)
+  FORWARD=none  count only (relay benchmarks)
+- packets/s, samples/s, decode errors and drops are logged periodically
+
+RELAY_WORKERS=N (N > 1) starts N worker processes bound to the same port
+with SO_REUSEPORT under a RelaySupervisor, which restarts dead workers
+and logs aggregated counters (for rejoin storms that exceed one core).
+
+Environment:
+    RELAY_PORT (1883), RELAY_HOST (::), FORWARD=mqtt|http|none, MQTT_BROKER,
+    MQTT_PORT, INGEST_API_URL, MAX_BUFFERED, BATCH_SIZE, RELAY_WORKERS
+"""
+
+import asyncio
 import json
 import logging
-import requests
+import math
+import multiprocessing
 import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import time
+
+import paho.mqtt.client as mqtt
+import requests
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [MQTT-SN-BRIDGE] %(message)s')
 logger = logging.getLogger("PiBridge")
 
+PACKET = struct.Struct("<BBQffHH")
+PROTOCOL_VER = 0x02
+# TSL2591 lux -> PAR (µmol/m²/s), daylight/white-LED approximation
+LUX_TO_PAR = 0.0185
+HEALTH_INTERVAL_S = 60.0
+RCVBUF_BYTES = 4 * 1024 * 1024
+STAT_KEYS = ('packets', 'samples', 'decode_errors', 'dropped', 'forward_errors')
+# Worker -> supervisor counter reports
+WORKER_REPORT_S = 1.0
+
+
+def decode_packet(data):
+    """
+    Decodes a datagram of one or more gos_research_packet_t frames.
+
+    Returns:
+        List of sample dicts (mqtt_bridge telemetry keys)
+
+    Raises:
+        ValueError: Truncated frame, unknown protocol version or
+            implausible values (whole datagram rejected)
+    """
+    if not data or len(data) % PACKET.size:
+        raise ValueError(f"length {len(data)} is not a multiple of {PACKET.size}")
+    samples = []
+    for ver, index, eui64, temp, hum, lux, batt in PACKET.iter_unpack(data):
+        if ver != PROTOCOL_VER:
+            raise ValueError(f"protocol version 0x{ver:02x}")
+        if not (math.isfinite(temp) and math.isfinite(hum)):
+            raise ValueError(f"non-finite reading from node {index}")
+        samples.append({
+            'node_id': f"RF-NODE-{index:02d}",
+            'eui64': f"{eui64:016X}",
+            'temp_c': round(temp, 3),
+            'humidity_pct': round(hum, 2),
+            'par_lux': lux,
+            'par_umol': round(lux * LUX_TO_PAR, 1),
+            'battery_mv': batt
+        })
+    return samples
+
+
+class RelayProtocol(asyncio.DatagramProtocol):
+    """Decodes datagrams into the relay's bounded sample buffer."""
+
+    def __init__(self, relay):
+        self.relay = relay
+
+    def datagram_received(self, data, addr):
+        relay = self.relay
+        relay.stats['packets'] += 1
+        try:
+            samples = decode_packet(data)
+        except (ValueError, struct.error) as e:
+            relay.stats['decode_errors'] += 1
+            if relay.stats['decode_errors'] <= 10 or relay.stats['decode_errors'] % 1000 == 0:
+                logger.warning(f"Decode error from {addr[0]}: {e}")
+            return
+        received = time.monotonic()
+        for sample in samples:
+            try:
+                relay.buffer.put_nowait((received, sample))
+            except asyncio.QueueFull:
+                relay.stats['dropped'] += 1
+
+    def error_received(self, exc):
+        logger.error(f"UDP error: {exc}")
+
+
 class MQTTSNRelay:
     """Bridge for nRF52 Thread Nodes (UDP) -> G.O.S. REST/MQTT Backbone."""
-    
-    def __init__(self, port=1883):
+
+    def __init__(self, port=1883, host="::", forward="mqtt", mqtt_broker="localhost", mqtt_port=1883,
+                 max_buffered=10000, batch_size=256, batch_window_s=0.05, stats_interval_s=30.0,
+                 workers=1, stats_queue=None, worker_id=None):
+        if forward not in ("mqtt", "http", "none"):
+            raise ValueError(f"Unknown forward target '{forward}' (use 'mqtt', 'http' or 'none')")
+        if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("Multi-worker mode needs SO_REUSEPORT (Linux)")
         self.port = port
-        self.sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
-        self.ingest_url = os.getenv("INGEST_API_URL", "http://localhost:8080/ingest")
+        self.host = host
+        self.forward = forward
+        self.ingest_url = os.getenv("INGEST_API_URL", "http://localhost:5000/api/ingest")
+        self.mqtt_broker = mqtt_broker
+        self.mqtt_port = mqtt_port
+        self.max_buffered = max_buffered
+        self.batch_size = batch_size
+        self.batch_window_s = batch_window_s
+        self.stats_interval_s = stats_interval_s
+        self.workers = workers
+        # Worker mode: counters go to the supervisor instead of the log
+        self.stats_queue = stats_queue
+        self.worker_id = worker_id
 
-    def start(self):
-        self.sock.bind(('::', self.port))
-        logger.info(f"MQTT-SN Relay active on UDP port {self.port}. Listening for Thread nodes...")
-        
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self.buffer = None
+        self.client = None
+        self.last_health = {}
+
+    # =========================================
+    # FORWARDING
+    # =========================================
+
+    def _connect_mqtt(self):
+        self.client = mqtt.Client(client_id=f"gos_mqtt_sn_relay_{os.getpid()}", protocol=mqtt.MQTTv5)
+        # Bound paho's own outgoing queue as well
+        self.client.max_queued_messages_set(self.max_buffered)
+        self.client.connect(self.mqtt_broker, self.mqtt_port, 60)
+        self.client.loop_start()
+        logger.info(f"Forwarding to MQTT broker {self.mqtt_broker}:{self.mqtt_port}")
+
+    def _publish(self, batch):
+        """Publishes a batch; returns how many samples paho accepted."""
+        now = time.monotonic()
+        sent = 0
+        for _, sample in batch:
+            node_id = sample['node_id']
+            info = self.client.publish(f"gos/telemetry/{node_id}", json.dumps(sample))
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.stats['forward_errors'] += 1
+                continue
+            sent += 1
+            if now - self.last_health.get(node_id, -math.inf) >= HEALTH_INTERVAL_S:
+                self.last_health[node_id] = now
+                self.client.publish(f"gos/health/{node_id}", json.dumps({'battery_mv': sample['battery_mv']}))
+        return sent
+
+    def _post(self, batch):
+        response = requests.post(self.ingest_url, json={'samples': [s for _, s in batch]}, timeout=10)
+        response.raise_for_status()
+
+    async def forwarder(self):
+        """Drains the buffer in batches (at most one HTTP batch in flight)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.buffer.get()]
+            deadline = loop.time() + self.batch_window_s
+            while len(batch) < self.batch_size:
+                if self.buffer.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.buffer.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.buffer.get_nowait())
+            try:
+                if self.forward == "mqtt":
+                    self.stats['samples'] += self._publish(batch)
+                else:
+                    if self.forward == "http":
+                        await loop.run_in_executor(None, self._post, batch)
+                    self.stats['samples'] += len(batch)
+            except Exception as e:
+                self.stats['forward_errors'] += len(batch)
+                logger.error(f"Forward error ({len(batch)} samples lost): {e}")
+
+    async def stats_loop(self):
+        if self.stats_queue is not None:
+            while True:
+                await asyncio.sleep(WORKER_REPORT_S)
+                try:
+                    self.stats_queue.put_nowait((self.worker_id, os.getpid(), dict(self.stats),
+                                                 self.buffer.qsize()))
+                except queue.Full:
+                    pass
+        previous, last = dict(self.stats), time.monotonic()
         while True:
-            data, addr = self.sock.recvfrom(1024)
-            process_node_packet(data, addr, self.ingest_url)
+            await asyncio.sleep(self.stats_interval_s)
+            now = time.monotonic()
+            rate = {k: (self.stats[k] - previous[k]) / (now - last) for k in self.stats}
+            logger.info(f"{rate['packets']:,.0f} packets/s | {rate['samples']:,.0f} samples/s forwarded | "
+                        f"decode errors {self.stats['decode_errors']} | dropped {self.stats['dropped']} | "
+                        f"forward errors {self.stats['forward_errors']} | buffered {self.buffer.qsize()}")
+            previous, last = dict(self.stats), now
+
+    # =========================================
+    # SERVICE
+    # =========================================
+
+    def _socket(self, reuse_port=False):
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Absorb bulk-sync bursts in the kernel (capped by net.core.rmem_max)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_BYTES)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if family == socket.AF_INET6:
+            # Accept IPv4-mapped senders too
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        sock.bind((self.host, self.port))
+        return sock
+
+    async def run(self, reuse_port=False):
+        loop = asyncio.get_running_loop()
+        self.buffer = asyncio.Queue(maxsize=self.max_buffered)
+        if self.forward == "mqtt":
+            self._connect_mqtt()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: RelayProtocol(self), sock=self._socket(reuse_port))
+        if self.worker_id is None:
+            logger.info(f"MQTT-SN Relay active on UDP port {self.port}. Listening for Thread nodes...")
+        else:
+            logger.info(f"Worker {self.worker_id} (pid {os.getpid()}) listening on UDP port {self.port}")
+        try:
+            await asyncio.gather(self.forwarder(), self.stats_loop())
+        finally:
+            transport.close()
+            if self.client is not None:
+                self.client.loop_stop()
 
-def process_node_packet(data, addr, url):
-    """Parses binary telemetry and forwards to the Research Hub."""
+    def start(self):
+        if self.workers > 1:
+            RelaySupervisor(self.settings(), self.workers, self.stats_interval_s).run()
+        else:
+            asyncio.run(self.run())
+
+    def settings(self):
+        """Constructor arguments for identical worker relays."""
+        return {
+            'port': self.port, 'host': self.host, 'forward': self.forward,
+            'mqtt_broker': self.mqtt_broker, 'mqtt_port': self.mqtt_port,
+            'max_buffered': self.max_buffered, 'batch_size': self.batch_size,
+            'batch_window_s': self.batch_window_s
+        }
+
+
+# =========================================
+# MULTI-PROCESS MODE (SO_REUSEPORT)
+# =========================================
+
+def run_worker(settings, worker_id, stats_queue):
+    """Worker process entry point: one relay on a SO_REUSEPORT socket."""
+    relay = MQTTSNRelay(**settings, stats_queue=stats_queue, worker_id=worker_id)
     try:
-        # Simplified parser for our nRF52 Research Packet format
-        # [0:2] Node ID, [2:6] Temp Float, [6:10] Humidity Float
-        node_id = f"RF-NODE-{data[0]:02d}"
-        
-        logger.info(f"Received Telemetry from {node_id} at {addr[0]}")
-        
-        # Forward to Dockerized G.O.S. Ingest
-        # (Equivalent to node sending data to the Pi/Gateway)
-        # payload = {"node_id": node_id, "data": data.hex()}
-        # requests.post(url, json=payload)
-        
-    except Exception as e:
-        logger.error(f"Bridge error: {e}")
+        asyncio.run(relay.run(reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+class RelaySupervisor:
+    """
+    Runs N relay workers on the same UDP port.
+
+    The kernel spreads datagrams over the SO_REUSEPORT sockets by source
+    address/port hash, so each node sticks to one worker (and its health
+    rate limit). Each worker has its own decoder, buffer and forwarder.
+    The supervisor restarts workers that exit, with a back-off for crash
+    loops. It also sums the counters that workers report over a
+    multiprocessing queue, keeping the totals of retired workers.
+    Datagrams still in a dead worker's socket buffer are lost.
+    """
+
+    def __init__(self, settings, workers, stats_interval_s=30.0, restart_backoff_s=1.0):
+        self.settings = settings
+        self.n_workers = workers
+        self.stats_interval_s = stats_interval_s
+        self.restart_backoff_s = restart_backoff_s
+        self.stats_queue = multiprocessing.Queue(maxsize=workers * 100)
+        self.processes = [None] * workers
+        self.started = [0.0] * workers
+        self.restarts = [0] * workers
+        # Latest report per worker slot, and counters of its dead predecessors
+        self.current = [None] * workers
+        self.retired = [dict.fromkeys(STAT_KEYS, 0) for _ in range(workers)]
+        self.buffered = [0] * workers
+        # pid of the last dead worker folded into retired, per slot
+        self.reaped = [None] * workers
+        self.respawn_at = [0.0] * workers
+
+    def _spawn(self, slot):
+        process = multiprocessing.Process(target=run_worker, name=f"relay-worker-{slot}",
+                                          args=(self.settings, slot, self.stats_queue), daemon=True)
+        process.start()
+        self.processes[slot] = process
+        self.started[slot] = time.monotonic()
+        self.current[slot] = None
+
+    def start(self):
+        for slot in range(self.n_workers):
+            self._spawn(slot)
+        logger.info(f"Supervisor started {self.n_workers} workers on UDP port {self.settings['port']} (SO_REUSEPORT)")
+
+    def poll(self):
+        """Collects worker reports and restarts dead workers."""
+        while True:
+            try:
+                slot, pid, stats, buffered = self.stats_queue.get_nowait()
+            except queue.Empty:
+                break
+            # Ignore late reports from a process that was already retired
+            if self.processes[slot].pid == pid and self.reaped[slot] != pid:
+                self.current[slot] = stats
+                self.buffered[slot] = buffered
+
+        now = time.monotonic()
+        for slot, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.reaped[slot] != process.pid:
+                self.reaped[slot] = process.pid
+                for key in STAT_KEYS:
+                    self.retired[slot][key] += (self.current[slot] or {}).get(key, 0)
+                self.current[slot] = None
+                # Crash loop (died within 10 s of starting): back off exponentially
+                crashed = now - self.started[slot] < 10
+                self.respawn_at[slot] = now + (self.restart_backoff_s * 2 ** min(self.restarts[slot], 5)
+                                               if crashed else 0.0)
+            if now < self.respawn_at[slot]:
+                continue
+            self.restarts[slot] += 1
+            logger.warning(f"Worker {slot} (pid {process.pid}) exited with code {process.exitcode}; "
+                           f"restarting (restart #{self.restarts[slot]})")
+            self._spawn(slot)
+
+    def totals(self):
+        """Summed counters over all workers, living and retired."""
+        totals = dict.fromkeys(STAT_KEYS, 0)
+        for slot in range(self.n_workers):
+            for key in STAT_KEYS:
+                totals[key] += self.retired[slot][key] + (self.current[slot] or {}).get(key, 0)
+        return totals
+
+    def per_worker_packets(self):
+        return [(self.current[slot] or {}).get('packets', 0) for slot in range(self.n_workers)]
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=5)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        self.start()
+        previous, last = self.totals(), time.monotonic()
+        try:
+            while True:
+                time.sleep(WORKER_REPORT_S)
+                self.poll()
+                now = time.monotonic()
+                if now - last < self.stats_interval_s:
+                    continue
+                totals = self.totals()
+                rate = {k: (totals[k] - previous[k]) / (now - last) for k in STAT_KEYS}
+                alive = sum(p.is_alive() for p in self.processes)
+                logger.info(f"{alive}/{self.n_workers} workers | {rate['packets']:,.0f} packets/s | "
+                            f"{rate['samples']:,.0f} samples/s forwarded | decode errors {totals['decode_errors']} | "
+                            f"dropped {totals['dropped']} | forward errors {totals['forward_errors']} | "
+                            f"buffered {sum(self.buffered)} | restarts {sum(self.restarts)}")
+                previous, last = totals, now
+        finally:
+            self.stop()
+
 
 if __name__ == "__main__":
-    relay = MQTTSNRelay()
+    relay = MQTTSNRelay(
+        port=int(os.getenv("RELAY_PORT", 1883)),
+        host=os.getenv("RELAY_HOST", "::"),
+        forward=os.getenv("FORWARD", "mqtt"),
+        mqtt_broker=os.getenv("MQTT_BROKER", "localhost"),
+        mqtt_port=int(os.getenv("MQTT_PORT", 1883)),
+        max_buffered=int(os.getenv("MAX_BUFFERED", 10000)),
+        batch_size=int(os.getenv("BATCH_SIZE", 256)),
+        workers=int(os.getenv("RELAY_WORKERS", 1))
+    )
     relay.start()
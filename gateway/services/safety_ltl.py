@@ -1,49 +1,800 @@
+"""
+G.O.S. LTL Safety Monitor
+=========================
+Runtime verification of LED setpoints against declarative safety laws.
+
+Each law is a safety property G(phi) where phi is a past-time formula
+with real-time bounds, e.g.
+
+    G(par_total <= 1500)
+    G(range(blue_ratio, 60s) <= 0.5)
+    G(temp > 10 -> temp < 40)
+
+Formulas are compiled once into a tree of small monitors. The tree is
+updated incrementally: every event costs O(1) amortized per subformula
+(Havelund & Rosu past-time LTL), with time windows kept as last-seen
+timestamps or monotonic deques instead of scanning history.
+
+Grammar (precedence low -> high):
+    formula := or ['->' formula]
+    or      := and {'|' and}
+    and     := since {'&' since}
+    since   := unary ['S' unary]                      (phi S psi)
+    unary   := '!' unary | 'Y' unary                  (not, previous)
+             | 'H' unary | 'O' unary                  (historically, once)
+             | 'H[' dur ']' unary | 'O[' dur ']' unary (within the last dur)
+             | '(' formula ')' | 'true' | 'false' | expr cmp expr
+    expr    := term {('+' | '-') term}
+    term    := atom {('*' | '/') atom}
+    atom    := number | field | '(' expr ')' | abs(expr) | delta(field)
+             | max(field, dur) | min(field, dur) | range(field, dur)
+    dur     := number [s | m | h]
+
+Unknown data: inside the compiled tree, a comparison on a missing field
+is satisfied, so gaps in the committed trace never latch H/S operators
+to false. Checks of a proposal (evaluate, check_safety, check_batch)
+apply the monitor's `unknown` policy on top: by default a law whose
+fields are missing at the checked event counts as violated (no data is
+not safe); unknown="satisfied" restores the permissive behaviour.
+Committed events (observe) are never judged on missing data.
+
+Batch screening: check_batch() evaluates arrays of candidate actions for
+many sectors (one monitor each) against the committed monitor state in
+one vectorized pass, returning a safe mask and a bitmask of violated
+properties per candidate (bit k = k-th property of the monitor).
+"""
+
 import logging
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from itertools import takewhile
 from datetime import datetime
 
+import numpy as np
+
 logger = logging.getLogger("SafetyMonitor")
 
+# Safety Laws (name -> formula)
+DEFAULT_PROPERTIES = {
+    # Never exceed the absolute PAR limit (ambient + LED supplement)
+    "par_limit": "G(par_total <= 1500)",
+    # No rapid spectral shifts: blue ratio may not move > 0.5 within 1 minute
+    "blue_shift": "G(range(blue_ratio, 60s) <= 0.5)",
+    # If temp > 10, then it must stay < 40
+    "temp_envelope": "G(temp > 10 -> temp < 40)",
+}
+
+# Action-only fields (not carried over to later events)
+ACTION_FIELDS = ("par_increase",)
+
+_UNITS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+# =========================================
+# EXPRESSION MONITORS (numeric values)
+# =========================================
+
+class _Node(ABC):
+    """
+    Compiled subformula. peek() evaluates a hypothetical event against the
+    committed state; commit() advances the state and returns the value at
+    the committed event. Stateless nodes only define _apply().
+
+    vpeek() is the array version of peek() over candidates of several
+    monitors (peers: this node in every monitor's tree; rows: monitor of
+    each candidate); stateful nodes expose their peek-relevant state via
+    _state() and combine it in _vapply(). Missing values are NaN.
+    """
+    children = ()
+    window = 0.0    # Seconds of history this node adds
+    lag = 0         # Events of history this node adds (Y, delta)
+    stateful = False
+
+    @abstractmethod
+    def _apply(self, values, ev, t):
+        """Value at an event from the children's values."""
+
+    def peek(self, ev, t):
+        return self._apply([c.peek(ev, t) for c in self.children], ev, t)
+
+    def commit(self, ev, t):
+        return self._apply([c.commit(ev, t) for c in self.children], ev, t)
+
+    def _state(self, t):
+        return None
+
+    @abstractmethod
+    def _vapply(self, values, ev, t, state):
+        """Array version of _apply (state: _state() per candidate)."""
+
+    def vpeek(self, peers, ev, t, rows, peer_times):
+        values = [c.vpeek([p.children[i] for p in peers], ev, t, rows, peer_times)
+                  for i, c in enumerate(self.children)]
+        state = None
+        if self.stateful:
+            state = np.array([p._state(pt) for p, pt in zip(peers, peer_times)], dtype=float)[rows]
+        return self._vapply(values, ev, t, state)
+
+
+class _Const(_Node):
+    def __init__(self, value):
+        self.value = value
+        self.text = f"{value:g}"
+
+    def _apply(self, values, ev, t):
+        return self.value
+
+    def _vapply(self, values, ev, t, state):
+        return self.value
+
+
+class _Field(_Node):
+    def __init__(self, name):
+        self.name = name
+        self.text = name
+
+    def _apply(self, values, ev, t):
+        return ev.get(self.name)
+
+    def _vapply(self, values, ev, t, state):
+        return ev.get(self.name, np.nan)
+
+
+class _Arith(_Node):
+    OPS = {"+": float.__add__, "-": float.__sub__, "*": float.__mul__,
+           "/": lambda a, b: a / b if b else None}
+    VOPS = {"+": np.add, "-": np.subtract, "*": np.multiply}
+
+    def __init__(self, op, left, right):
+        self.op, self.fn = op, self.OPS[op]
+        self.children = (left, right)
+        self.text = f"({left.text} {op} {right.text})"
+
+    def _apply(self, values, ev, t):
+        a, b = values
+        if a is None or b is None:
+            return None
+        return self.fn(float(a), float(b))
+
+    def _vapply(self, values, ev, t, state):
+        a, b = (np.asarray(v, dtype=float) for v in values)
+        if self.op == "/":
+            nonzero = b != 0
+            return np.where(nonzero, a / np.where(nonzero, b, 1.0), np.nan)
+        return self.VOPS[self.op](a, b)
+
+
+class _Abs(_Node):
+    def __init__(self, child):
+        self.children = (child,)
+        self.text = f"abs({child.text})"
+
+    def _apply(self, values, ev, t):
+        return None if values[0] is None else abs(values[0])
+
+    def _vapply(self, values, ev, t, state):
+        return np.abs(values[0])
+
+
+class _Delta(_Node):
+    """Change of a field since the previous event."""
+    lag = 1
+    stateful = True
+
+    def __init__(self, name):
+        self.name = name
+        self.prev = None
+        self.text = f"delta({name})"
+
+    def _apply(self, values, ev, t):
+        v = ev.get(self.name)
+        if v is None or self.prev is None:
+            return None
+        return v - self.prev
+
+    def commit(self, ev, t):
+        value = self._apply((), ev, t)
+        if ev.get(self.name) is not None:
+            self.prev = ev[self.name]
+        return value
+
+    def _state(self, t):
+        return np.nan if self.prev is None else self.prev
+
+    def _vapply(self, values, ev, t, state):
+        return ev.get(self.name, np.nan) - state
+
+
+class _WindowExtreme(_Node):
+    """max/min of a field over the last `window` seconds (monotonic deque)."""
+    stateful = True
+
+    def __init__(self, name, window, sign):
+        self.name, self.window, self.sign = name, window, sign
+        # (t, sign * value); sign-adjusted values decrease from the left,
+        # so the front is the extreme of the window
+        self.queue = deque()
+        self.text = f"{'max' if sign > 0 else 'min'}({name}, {window:g}s)"
+
+    def _front(self, t):
+        # Read-only (peek/evaluate may probe any time). commit() pops the
+        # expired prefix, so the front is normally live: O(1). Only entries
+        # that expired since the last commit are stepped over, not removed.
+        horizon = t - self.window
+        for ts, v in self.queue:
+            if ts >= horizon:
+                return v * self.sign
+        return None
+
+    def _apply(self, values, ev, t):
+        front = self._front(t)
+        v = ev.get(self.name)
+        if front is None:
+            return v
+        if v is None:
+            return front
+        return max(v, front) if self.sign > 0 else min(v, front)
+
+    def commit(self, ev, t):
+        q = self.queue
+        # Committed time never goes backwards: expire once, here
+        while q and q[0][0] < t - self.window:
+            q.popleft()
+        value = self._apply((), ev, t)
+        v = ev.get(self.name)
+        if v is not None:
+            while q and q[-1][1] <= v * self.sign:
+                q.pop()
+            q.append((t, v * self.sign))
+        return value
+
+    def _state(self, t):
+        front = self._front(t)
+        return np.nan if front is None else front
+
+    def _vapply(self, values, ev, t, state):
+        v = ev.get(self.name, np.nan)
+        return np.fmax(v, state) if self.sign > 0 else np.fmin(v, state)
+
+
+class _Range(_Arith):
+    def __init__(self, name, window):
+        super().__init__("-", _WindowExtreme(name, window, 1), _WindowExtreme(name, window, -1))
+        self.text = f"range({name}, {window:g}s)"
+
+
+# =========================================
+# FORMULA MONITORS (boolean verdicts)
+# =========================================
+
+class _Compare(_Node):
+    OPS = {"<": float.__lt__, "<=": float.__le__, ">": float.__gt__, ">=": float.__ge__,
+           "==": float.__eq__, "!=": float.__ne__}
+    VOPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+            "==": np.equal, "!=": np.not_equal}
+
+    def __init__(self, op, left, right):
+        self.op, self.fn = op, self.OPS[op]
+        self.children = (left, right)
+        self.text = f"{left.text} {op} {right.text}"
+
+    def _apply(self, values, ev, t):
+        a, b = values
+        if a is None or b is None:
+            return True
+        return bool(self.fn(float(a), float(b)))
+
+    def _vapply(self, values, ev, t, state):
+        a, b = (np.asarray(v, dtype=float) for v in values)
+        return np.isnan(a) | np.isnan(b) | self.VOPS[self.op](a, b)
+
+
+class _Not(_Node):
+    def __init__(self, child):
+        self.children = (child,)
+        self.text = f"!({child.text})"
+
+    def _apply(self, values, ev, t):
+        return not values[0]
+
+    def _vapply(self, values, ev, t, state):
+        return ~np.asarray(values[0], dtype=bool)
+
+
+class _Bool(_Node):
+    """&, | and -> (children always both evaluated so their state advances)."""
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.children = (left, right)
+        self.text = f"({left.text} {op} {right.text})"
+
+    def _apply(self, values, ev, t):
+        a, b = values
+        if self.op == "&":
+            return a and b
+        if self.op == "|":
+            return a or b
+        return (not a) or b
+
+    def _vapply(self, values, ev, t, state):
+        a, b = (np.asarray(v, dtype=bool) for v in values)
+        if self.op == "&":
+            return a & b
+        if self.op == "|":
+            return a | b
+        return ~a | b
+
+
+class _Prev(_Node):
+    """Y phi: phi held at the previous event (false at the first)."""
+    lag = 1
+    stateful = True
+
+    def __init__(self, child):
+        self.children = (child,)
+        self.last = False
+        self.text = f"Y ({child.text})"
+
+    def _apply(self, values, ev, t):
+        return self.last
+
+    def peek(self, ev, t):
+        return self.last
+
+    def commit(self, ev, t):
+        value = self.last
+        self.last = self.children[0].commit(ev, t)
+        return value
+
+    def _state(self, t):
+        return self.last
+
+    def _vapply(self, values, ev, t, state):
+        return state.astype(bool)
+
+
+class _Accumulate(_Node):
+    """H phi (all past events) / O phi (some past event)."""
+    window = math.inf
+    stateful = True
+
+    def __init__(self, op, child):
+        self.op = op
+        self.children = (child,)
+        self.state = op == "H"
+        self.text = f"{op} ({child.text})"
+
+    def _apply(self, values, ev, t):
+        return (self.state and values[0]) if self.op == "H" else (self.state or values[0])
+
+    def commit(self, ev, t):
+        self.state = super().commit(ev, t)
+        return self.state
+
+    def _state(self, t):
+        return self.state
+
+    def _vapply(self, values, ev, t, state):
+        now, state = np.asarray(values[0], dtype=bool), state.astype(bool)
+        return (state & now) if self.op == "H" else (state | now)
+
+
+class _Bounded(_Node):
+    """H[d] phi / O[d] phi: over the events of the last d seconds."""
+    stateful = True
+
+    def __init__(self, op, window, child):
+        self.op, self.window = op, window
+        self.children = (child,)
+        # Last time phi was false (H) or true (O)
+        self.last = -math.inf
+        self.text = f"{op}[{window:g}s] ({child.text})"
+
+    def _apply(self, values, ev, t):
+        recent = t - self.last <= self.window
+        return (values[0] and not recent) if self.op == "H" else (values[0] or recent)
+
+    def commit(self, ev, t):
+        now = self.children[0].commit(ev, t)
+        value = self._apply([now], ev, t)
+        if now == (self.op == "O"):
+            self.last = t
+        return value
+
+    def _state(self, t):
+        return self.last
+
+    def _vapply(self, values, ev, t, state):
+        now = np.asarray(values[0], dtype=bool)
+        recent = t - state <= self.window
+        return (now & ~recent) if self.op == "H" else (now | recent)
+
+
+class _Since(_Node):
+    """phi S psi: psi held at some point, and phi ever since."""
+    window = math.inf
+    stateful = True
+
+    def __init__(self, phi, psi):
+        self.children = (phi, psi)
+        self.state = False
+        self.text = f"({phi.text} S {psi.text})"
+
+    def _apply(self, values, ev, t):
+        phi, psi = values
+        return psi or (phi and self.state)
+
+    def commit(self, ev, t):
+        self.state = super().commit(ev, t)
+        return self.state
+
+    def _state(self, t):
+        return self.state
+
+    def _vapply(self, values, ev, t, state):
+        phi, psi = (np.asarray(v, dtype=bool) for v in values)
+        return psi | (phi & state.astype(bool))
+
+
+def _fields(node):
+    """Event fields a compiled formula reads."""
+    names = {node.name} if hasattr(node, "name") else set()
+    for c in node.children:
+        names |= _fields(c)
+    return names
+
+
+def _propagate(node):
+    """Sets horizon (seconds) and depth (events) of history each node depends on."""
+    for c in node.children:
+        _propagate(c)
+    node.horizon = node.window + max([c.horizon for c in node.children], default=0.0)
+    node.depth = node.lag + max([c.depth for c in node.children], default=0)
+    return node
+
+
+# =========================================
+# PARSER
+# =========================================
+
+_TOKEN = re.compile(r"\s*(->|<=|>=|==|!=|[HO]\[|\d+(?:\.\d+)?[smh]?|[A-Za-z_]\w*|[-+*/()<>!&|,\]])")
+
+
+class FormulaError(ValueError):
+    pass
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        while pos < len(text.rstrip()):
+            m = _TOKEN.match(text, pos)
+            if not m:
+                raise FormulaError(f"Unexpected input at {pos}: {text[pos:]!r}")
+            self.tokens.append(m.group(1))
+            pos = m.end()
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def take(self, expected=None):
+        tok = self.peek()
+        if tok is None or (expected is not None and tok != expected):
+            raise FormulaError(f"Expected {expected or 'token'} in {self.text!r}, got {tok!r}")
+        self.i += 1
+        return tok
+
+    def property(self):
+        """G(phi) -> compiled phi."""
+        self.take("G")
+        self.take("(")
+        node = self.formula()
+        self.take(")")
+        if self.peek() is not None:
+            raise FormulaError(f"Trailing input in {self.text!r}")
+        return _propagate(node)
+
+    def formula(self):
+        left = self.disjunction()
+        if self.peek() == "->":
+            self.take()
+            return _Bool("->", left, self.formula())
+        return left
+
+    def disjunction(self):
+        node = self.conjunction()
+        while self.peek() == "|":
+            self.take()
+            node = _Bool("|", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.since()
+        while self.peek() == "&":
+            self.take()
+            node = _Bool("&", node, self.since())
+        return node
+
+    def since(self):
+        node = self.unary()
+        if self.peek() == "S":
+            self.take()
+            return _Since(node, self.unary())
+        return node
+
+    def unary(self):
+        tok = self.peek()
+        if tok == "!":
+            self.take()
+            return _Not(self.unary())
+        if tok == "Y":
+            self.take()
+            return _Prev(self.unary())
+        if tok in ("H", "O"):
+            self.take()
+            return _Accumulate(tok, self.unary())
+        if tok in ("H[", "O["):
+            self.take()
+            window = self.duration()
+            self.take("]")
+            return _Bounded(tok[0], window, self.unary())
+        if tok in ("true", "false"):
+            self.take()
+            return _Compare("==", _Const(1.0), _Const(1.0 if tok == "true" else 0.0))
+        if tok == "(":
+            # Parenthesised formula, or the start of a parenthesised expression
+            start = self.i
+            try:
+                self.take()
+                node = self.formula()
+                self.take(")")
+                if self.peek() not in ("<", "<=", ">", ">=", "==", "!=", "+", "-", "*", "/"):
+                    return node
+            except FormulaError:
+                pass
+            self.i = start
+        return self.comparison()
+
+    def comparison(self):
+        left = self.expr()
+        op = self.take()
+        if op not in _Compare.OPS:
+            raise FormulaError(f"Expected comparison in {self.text!r}, got {op!r}")
+        return _Compare(op, left, self.expr())
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            node = _Arith(self.take(), node, self.term())
+        return node
+
+    def term(self):
+        node = self.atom()
+        while self.peek() in ("*", "/"):
+            node = _Arith(self.take(), node, self.atom())
+        return node
+
+    def atom(self):
+        tok = self.take()
+        if tok == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if tok == "-":
+            return _Arith("-", _Const(0.0), self.atom())
+        if re.fullmatch(r"\d+(?:\.\d+)?", tok):
+            return _Const(float(tok))
+        if tok in ("abs", "delta", "max", "min", "range") and self.peek() == "(":
+            self.take("(")
+            if tok == "abs":
+                node = _Abs(self.expr())
+            elif tok == "delta":
+                node = _Delta(self.field())
+            else:
+                name = self.field()
+                self.take(",")
+                window = self.duration()
+                node = _Range(name, window) if tok == "range" else \
+                    _WindowExtreme(name, window, 1 if tok == "max" else -1)
+            self.take(")")
+            return node
+        if re.fullmatch(r"[A-Za-z_]\w*", tok):
+            return _Field(tok)
+        raise FormulaError(f"Unexpected {tok!r} in {self.text!r}")
+
+    def field(self):
+        tok = self.take()
+        if not re.fullmatch(r"[A-Za-z_]\w*", tok):
+            raise FormulaError(f"Expected field name in {self.text!r}, got {tok!r}")
+        return tok
+
+    def duration(self):
+        tok = self.take()
+        m = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", tok)
+        if not m:
+            raise FormulaError(f"Expected duration in {self.text!r}, got {tok!r}")
+        return float(m.group(1)) * _UNITS.get(m.group(2) or "s")
+
+
+def compile_property(formula):
+    """Compiles 'G(phi)' into a monitor tree for phi."""
+    return _Parser(formula).property()
+
+
+# =========================================
+# MONITOR
+# =========================================
+
 class SafetyLTLMonitor:
     """Linear Temporal Logic Monitor (Ref: Camacho & Muise 2018).
     Ensures that RL experimentation never violates Greenhouse Safety Laws.
     """
-    
-    # Safety Laws (LTL-style properties)
-    # G (spectral_intensity < 1000) -> Globally intensity must be < 1000
-    # G (temp > 10 -> temp < 40) -> If temp > 10, then it must stay < 40
-    
-    def __init__(self):
-        self.state_history = []
+
+    def __init__(self, properties=None, trace_len=512, unknown="violated"):
+        if unknown not in ("violated", "satisfied"):
+            raise ValueError(f"Unknown verdict must be 'violated' or 'satisfied', not {unknown!r}")
+        self.unknown = unknown
+        self.formulas = dict(properties or DEFAULT_PROPERTIES)
+        self.properties = {name: compile_property(f) for name, f in self.formulas.items()}
+        # Event fields each law reads (missing -> unknown verdict)
+        self.property_fields = {name: sorted(_fields(node)) for name, node in self.properties.items()}
+        # Violation code bit per property (check_batch)
+        self.property_bits = {name: 1 << k for k, name in enumerate(self.properties)}
+        self.fields = set().union(*map(_fields, self.properties.values())) | {"par", "par_increase"}
+        # Recent committed events (for violation trace slices)
+        self.trace = deque(maxlen=trace_len)
+        # Last known value of every state field
+        self.current = {}
+        self.last_time = -math.inf
+        self.last_verdicts = []
+
+    def _timestamp(self, stamp):
+        if isinstance(stamp, datetime):
+            stamp = stamp.timestamp()
+        t = time.time() if stamp is None else float(stamp)
+        # Windows need non-decreasing time
+        return max(t, self.last_time)
+
+    def _event(self, action=None, state=None):
+        """Merged event (last known state + new fields) and its timestamp."""
+        ev = {**self.current, **(state or {}), **(action or {})}
+        t = self._timestamp(ev.pop("time", None))
+        if "par" in ev:
+            ev["par_total"] = ev["par"] + ev.get("par_increase", 0)
+        return ev, t
+
+    def _missing(self, ev) -> dict:
+        """Laws with fields missing from an event: {name: [fields]}."""
+        missing = {}
+        for name, fields in self.property_fields.items():
+            absent = [f for f in fields if ev.get(f) is None or ev[f] != ev[f]]
+            if absent:
+                missing[name] = absent
+        return missing
+
+    def _verdicts(self, ev, t, values, missing=None):
+        """Violation verdicts with the trace slice each property depends on."""
+        missing = missing or {}
+        verdicts = []
+        for name, ok in values.items():
+            if ok and name not in missing:
+                continue
+            node = self.properties[name]
+            # Walk back only as far as the property looks
+            window = list(takewhile(lambda e: e["time"] >= t - node.horizon, reversed(self.trace)))
+            if len(window) < node.depth:
+                window = list(self.trace)[-node.depth:][::-1]
+            window.reverse()
+            verdict = {
+                "property": name,
+                "formula": self.formulas[name],
+                "time": t,
+                "trace": window + [{**ev, "time": t}]
+            }
+            if name in missing:
+                verdict["missing"] = missing[name]
+            verdicts.append(verdict)
+        return verdicts
+
+    def evaluate(self, action=None, state=None) -> list:
+        """Verdicts for a hypothetical event (monitor state unchanged)."""
+        ev, t = self._event(action, state)
+        missing = self._missing(ev) if self.unknown == "violated" else None
+        return self._verdicts(ev, t, {n: p.peek(ev, t) for n, p in self.properties.items()}, missing)
+
+    def observe(self, event) -> list:
+        """Commits an event (applied setpoint or telemetry); returns its violations."""
+        ev, t = self._event(state=event)
+        verdicts = self._verdicts(ev, t, {n: p.commit(ev, t) for n, p in self.properties.items()})
+        self.last_time = t
+        self.current.update((k, v) for k, v in ev.items() if k not in ACTION_FIELDS)
+        self.trace.append({**ev, "time": t})
+        return verdicts
 
     def check_safety(self, action, current_state):
         """Checks if a proposed LED Action violates LTL safety constraints."""
-        
-        # 1. Immediate Constraint: Never exceed absolute PAR limit
-        if action.get("par_increase", 0) + current_state.get("par", 0) > 1500:
-            logger.error("LTL VIOLATION: G(par < 1500) | ABORTING ACTION.")
-            return False
-            
-        # 2. Sequential Constraint: No rapid spectral shifts (> 50% in 1 minute)
-        # (Simulating persistence of state)
-        if len(self.state_history) > 0:
-            prev_blue = self.state_history[-1].get("blue_ratio", 0.2)
-            if abs(action.get("blue_ratio", 0.2) - prev_blue) > 0.5:
-                logger.error("LTL VIOLATION: G(delta_blue < 0.5) | STRESS PREVENTION.")
-                return False
-
-        return True
+        self.last_verdicts = self.evaluate(action, current_state)
+        for v in self.last_verdicts:
+            unknown = f" (no data: {', '.join(v['missing'])})" if 'missing' in v else ""
+            logger.error(f"LTL VIOLATION: {v['formula']} [{v['property']}]{unknown} | ABORTING ACTION.")
+        return not self.last_verdicts
 
     def log_state(self, state):
-        self.state_history.append(state)
-        if len(self.state_history) > 100:
-            self.state_history.pop(0)
+        return self.observe(state)
+
+    def check_batch(self, actions, state=None, now=None):
+        """Vectorized check_safety for N candidate actions ({field: (N,) array})."""
+        state = None if state is None else {k: [v] for k, v in state.items()}
+        return check_batch([self], actions, states=state, now=now)
+
+    def violations(self, code) -> list:
+        """Property names encoded in a violation code."""
+        return [name for name, bit in self.property_bits.items() if int(code) & bit]
+
+
+def check_batch(monitors, actions, sector_index=None, states=None, now=None):
+    """
+    Screens candidate actions of many sectors in one vectorized pass.
+
+    Args:
+        monitors: One SafetyLTLMonitor per sector (same properties)
+        actions: {field: (N,) array} candidate actions, e.g. blue_ratio,
+            par_increase
+        sector_index: (N,) monitor index of each candidate (default all 0)
+        states: Optional {field: (M,) array} live state per monitor, e.g. par
+        now: Evaluation time (epoch seconds or datetime, default current time)
+
+    Returns:
+        (safe, codes): (N,) bool mask and (N,) int64 violation bitmask
+        (monitor.property_bits); monitor state is not changed. Laws with
+        missing fields count as violated under the monitors' default
+        unknown="violated" policy.
+    """
+    template = monitors[0]
+    n = len(np.atleast_1d(next(iter(actions.values()))))
+    rows = np.zeros(n, dtype=np.int64) if sector_index is None else np.asarray(sector_index, dtype=np.int64)
+    peer_times = [m._timestamp(now) for m in monitors]
+    t = np.array(peer_times)[rows]
+
+    # Merged event arrays: last known state < live state < candidate action
+    ev = {}
+    for name in template.fields | {"par_total"}:
+        column = np.array([m.current.get(name, np.nan) for m in monitors], dtype=float)
+        if states is not None and name in states:
+            live = np.asarray(states[name], dtype=float)
+            column = np.where(np.isnan(live), column, live)
+        column = column[rows]
+        if name in actions:
+            column = np.broadcast_to(np.asarray(actions[name], dtype=float), (n,))
+        ev[name] = column
+    par = ev["par"]
+    increase = np.nan_to_num(ev["par_increase"]) if "par_increase" in actions else 0.0
+    ev["par_total"] = np.where(np.isnan(par), ev["par_total"], par + increase)
+
+    codes = np.zeros(n, dtype=np.int64)
+    for name, node in template.properties.items():
+        peers = [m.properties[name] for m in monitors]
+        ok = np.broadcast_to(node.vpeek(peers, ev, t, rows, peer_times), (n,))
+        if template.unknown == "violated":
+            for field in template.property_fields[name]:
+                ok = ok & ~np.isnan(ev[field])
+        codes |= np.where(ok, 0, template.property_bits[name])
+    return codes == 0, codes
+
 
 if __name__ == "__main__":
     monitor = SafetyLTLMonitor()
     safe_action = {"par_increase": 100, "blue_ratio": 0.25}
     unsafe_action = {"par_increase": 1000, "blue_ratio": 0.8}
-    
-    current = {"par": 600}
-    
+
+    current = {"par": 600, "temp": 24}
+
     print(f"Safe Action Check: {monitor.check_safety(safe_action, current)}")
     print(f"Unsafe Action Check: {monitor.check_safety(unsafe_action, current)}")
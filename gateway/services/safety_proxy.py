@@ -0,0 +1,341 @@
+"""
+G.O.S. Safety Enforcement Proxy
+===============================
+Puts the LTL safety monitor in the LED control path.
+
+Proposers (RL agent, planners, operators) publish setpoints to
+gos/led/proposed. Every proposal is checked against the sector's
+SafetyLTLMonitor, which is fed with live state from telemetry:
+- approved: republished unchanged to gos/led/schedule (mqtt_bridge logs
+  it to led_schedule_history, the lights act on it)
+- vetoed: published to gos/led/veto and written to safety_vetoes with the
+  violated laws and the trace slice that caused them
+
+Proposals for sector 'ALL' must be safe for every known sector (one
+check_batch call).
+
+Fail closed on missing state: a proposal for a sector without live state
+in the last MAX_STATE_AGE_S (or for 'ALL' while no sector has any) is
+vetoed, and laws whose fields are unknown count as violated
+(SafetyLTLMonitor default). docker-compose feeds state from node_latest
+(STATE_INPUT=db), since the simulated fleet publishes no MQTT telemetry.
+
+Bounded latency: the check itself is O(1) per law. Proposals are handled
+on the event loop in arrival order; a proposal that waited longer than
+MAX_COMMAND_AGE_MS, or arrives while the backlog is full, is vetoed
+(fail closed) instead of being applied late. Database writes run off the
+hot path. Added latency (receipt -> republish, p50/p99) is logged
+periodically.
+
+MQTT Topics:
+- gos/led/proposed            - Setpoint proposals (in)
+- gos/telemetry/{node_id}     - Live state (in, STATE_INPUT=mqtt)
+- gos/commission/{node_id}    - Node sectors (in)
+- gos/led/schedule            - Approved setpoints (out)
+- gos/led/veto                - Vetoed proposals (out)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import paho.mqtt.client as mqtt
+import psycopg2
+
+from safety_ltl import SafetyLTLMonitor, check_batch
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [SAFETY-PROXY] %(message)s')
+logger = logging.getLogger("SafetyProxy")
+
+PROPOSED_TOPIC = "gos/led/proposed"
+SCHEDULE_TOPIC = "gos/led/schedule"
+VETO_TOPIC = "gos/led/veto"
+LED_MAX_PAR = 400.0     # µmol/m²/s at 100% intensity (ml_engine greenhouse_env)
+
+
+class SafetyEnforcementProxy:
+    """Approves or vetoes proposed LED setpoints against live sector state."""
+
+    def __init__(self, db_url, mqtt_broker="localhost", mqtt_port=1883, state_input="mqtt",
+                 max_command_age_ms=250.0, max_backlog=1000, poll_interval_s=15.0,
+                 stats_interval_s=60.0, max_state_age_s=300.0):
+        if state_input not in ("mqtt", "db"):
+            raise ValueError(f"Unknown state input '{state_input}' (use 'mqtt' or 'db')")
+        self.db_url = db_url
+        self.mqtt_broker = mqtt_broker
+        self.mqtt_port = mqtt_port
+        self.state_input = state_input
+        self.max_command_age_ms = max_command_age_ms
+        self.max_backlog = max_backlog
+        self.poll_interval_s = poll_interval_s
+        self.stats_interval_s = stats_interval_s
+        self.max_state_age_s = max_state_age_s
+
+        self.monitors = {}
+        self.node_sector = {}
+        # node_id -> {par, temp} (latest reading)
+        self.readings = {}
+        # sector -> last approved intensity (%)
+        self.intensity = {}
+        # sector -> monotonic time live state was last seen
+        self.state_time = {}
+
+        # Proposals received but not yet handled; incremented on the paho
+        # thread, decremented on the event loop, hence the lock
+        self.backlog = 0
+        self.backlog_lock = threading.Lock()
+        self.latencies_ms = np.zeros(4096)
+        self.approved = 0
+        self.vetoed = 0
+        self.veto_rows = None
+        self.loop = None
+
+        self.client = mqtt.Client(client_id="gos_safety_proxy", protocol=mqtt.MQTTv5)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+
+    # =========================================
+    # MQTT INGRESS
+    # =========================================
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        logger.info(f"Connected to MQTT broker: {self.mqtt_broker}:{self.mqtt_port}")
+        client.subscribe(PROPOSED_TOPIC, qos=1)
+        client.subscribe("gos/commission/#")
+        if self.state_input == "mqtt":
+            client.subscribe("gos/telemetry/#")
+
+    def on_message(self, client, userdata, msg):
+        """paho network thread: hand the message to the event loop."""
+        received = time.monotonic()
+        try:
+            payload = json.loads(msg.payload.decode('utf-8'))
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON payload: {e}")
+            return
+        if msg.topic == PROPOSED_TOPIC:
+            with self.backlog_lock:
+                self.backlog += 1
+            self.loop.call_soon_threadsafe(self.handle_proposal, payload, received)
+        elif msg.topic.startswith("gos/commission/"):
+            self.loop.call_soon_threadsafe(self.node_sector.__setitem__, msg.topic.split('/')[-1],
+                                           payload.get('sector', 'UNASSIGNED'))
+        else:
+            self.loop.call_soon_threadsafe(self.ingest, msg.topic.split('/')[-1], payload)
+
+    # =========================================
+    # LIVE STATE
+    # =========================================
+
+    def monitor(self, sector) -> SafetyLTLMonitor:
+        if sector not in self.monitors:
+            self.monitors[sector] = SafetyLTLMonitor()
+        return self.monitors[sector]
+
+    def ingest(self, node_id, payload, sector=None):
+        """Commits a node reading as the sector's live state."""
+        par = payload.get('par_umol', payload.get('par'))
+        temp = payload.get('temp_c', payload.get('temp'))
+        if par is None and temp is None:
+            return
+        if sector:
+            self.node_sector[node_id] = sector
+        sector = self.node_sector.get(node_id, 'UNASSIGNED')
+        self.readings[node_id] = {'par': par, 'temp': temp}
+        self.state_time[sector] = time.monotonic()
+
+        # Sector state = mean over the sector's nodes
+        nodes = [r for n, r in self.readings.items() if self.node_sector.get(n, 'UNASSIGNED') == sector]
+        state = {}
+        for key in ('par', 'temp'):
+            values = [float(r[key]) for r in nodes if r[key] is not None]
+            if values:
+                state[key] = sum(values) / len(values)
+        for v in self.monitor(sector).observe(state):
+            logger.warning(f"Live state of {sector} violates {v['formula']} [{v['property']}]")
+
+    def _fetch_node_latest(self):
+        conn = psycopg2.connect(self.db_url)
+        with conn.cursor() as cur:
+            cur.execute("SELECT node_id, sector, temp_c, par_umol FROM node_latest")
+            rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    async def poll_node_latest(self):
+        """STATE_INPUT=db: periodically ingests the node_latest view."""
+        seen = {}
+        while True:
+            try:
+                rows = await self.loop.run_in_executor(None, self._fetch_node_latest)
+                polled = time.monotonic()
+                for node_id, sector, temp, par in rows:
+                    # node_latest only holds recent readings: the sector is live
+                    self.state_time[sector] = polled
+                    if seen.get(node_id) != (temp, par):
+                        seen[node_id] = (temp, par)
+                        self.ingest(node_id, {'temp_c': temp, 'par_umol': par}, sector=sector)
+            except Exception as e:
+                logger.error(f"node_latest poll error: {e}")
+            await asyncio.sleep(self.poll_interval_s)
+
+    # =========================================
+    # ENFORCEMENT
+    # =========================================
+
+    def handle_proposal(self, payload, received):
+        """Approves (republish) or vetoes one proposed setpoint."""
+        with self.backlog_lock:
+            self.backlog -= 1
+            backlog = self.backlog
+        sector = str(payload.get('sector', 'ALL'))
+        age_ms = (time.monotonic() - received) * 1000
+        if age_ms > self.max_command_age_ms or backlog >= self.max_backlog:
+            self.veto(payload, sector, [{"property": "stale_command", "formula": f"age <= {self.max_command_age_ms:g} ms",
+                                         "trace": [{"age_ms": round(age_ms, 3), "backlog": backlog}]}], received)
+            return
+
+        try:
+            blue = float(payload['blue_ratio'])
+            intensity = float(payload.get('intensity', 100))
+        except (KeyError, TypeError, ValueError):
+            self.veto(payload, sector, [{"property": "malformed", "formula": "blue_ratio, intensity required",
+                                         "trace": []}], received)
+            return
+
+        sectors = (list(self.monitors) or ['UNASSIGNED']) if sector == 'ALL' else [sector]
+        now = time.monotonic()
+        stale = [s for s in sectors if now - self.state_time.get(s, -np.inf) > self.max_state_age_s]
+        if stale:
+            self.veto(payload, stale[0], [{"property": "no_live_state",
+                                           "formula": f"state age <= {self.max_state_age_s:g} s",
+                                           "trace": [{"stale_sectors": stale}]}], received)
+            return
+
+        if sector == 'ALL':
+            monitors = [self.monitor(s) for s in sectors]
+            current = np.array([self.intensity.get(s, 0.0) for s in sectors])
+            safe, codes = check_batch(monitors, {
+                'blue_ratio': np.full(len(sectors), blue),
+                'par_increase': (intensity - current) / 100.0 * LED_MAX_PAR
+            }, np.arange(len(sectors)))
+            if not safe.all():
+                i = int(np.flatnonzero(~safe)[0])
+                action = {'blue_ratio': blue, 'par_increase': float((intensity - current[i]) / 100.0 * LED_MAX_PAR)}
+                self.veto(payload, sectors[i], monitors[i].evaluate(action), received)
+                return
+        else:
+            action = {'blue_ratio': blue,
+                      'par_increase': (intensity - self.intensity.get(sector, 0.0)) / 100.0 * LED_MAX_PAR}
+            verdicts = self.monitor(sector).evaluate(action)
+            if verdicts:
+                self.veto(payload, sector, verdicts, received)
+                return
+
+        self.client.publish(SCHEDULE_TOPIC, json.dumps(payload), qos=1)
+        self.latencies_ms[self.approved % len(self.latencies_ms)] = (time.monotonic() - received) * 1000
+        self.approved += 1
+        for s in sectors:
+            self.monitor(s).observe({'blue_ratio': blue, 'intensity': intensity})
+            self.intensity[s] = intensity
+
+    def veto(self, payload, sector, verdicts, received):
+        self.vetoed += 1
+        laws = [v['property'] for v in verdicts]
+        self.client.publish(VETO_TOPIC, json.dumps({**payload, 'violated': laws}), qos=1)
+        logger.error(f"VETO {sector}: {payload} violates {', '.join(laws)} "
+                     f"({(time.monotonic() - received) * 1000:.2f} ms)")
+        if self.veto_rows is not None:
+            try:
+                self.veto_rows.put_nowait((datetime.now(), sector, payload, laws, verdicts))
+            except asyncio.QueueFull:
+                logger.error("Veto log backlog full; dropping database row")
+
+    def _insert_vetoes(self, rows):
+        conn = psycopg2.connect(self.db_url)
+        with conn.cursor() as cur:
+            cur.executemany("""
+                INSERT INTO safety_vetoes
+                (time, sector_id, blue_ratio, intensity_pct, source, violated, trace)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [(
+                ts,
+                sector,
+                payload.get('blue_ratio'),
+                payload.get('intensity'),
+                payload.get('source'),
+                laws,
+                json.dumps([{k: v[k] for k in ('property', 'formula', 'trace')} for v in verdicts], default=str)
+            ) for ts, sector, payload, laws, verdicts in rows])
+        conn.commit()
+        conn.close()
+
+    async def veto_writer(self):
+        """Writes vetoes to safety_vetoes in batches, off the hot path."""
+        while True:
+            rows = [await self.veto_rows.get()]
+            while not self.veto_rows.empty():
+                rows.append(self.veto_rows.get_nowait())
+            try:
+                await self.loop.run_in_executor(None, self._insert_vetoes, rows)
+            except Exception as e:
+                logger.error(f"Veto insert error: {e}")
+
+    # =========================================
+    # SERVICE
+    # =========================================
+
+    def stats(self) -> dict:
+        window = self.latencies_ms[:min(self.approved, len(self.latencies_ms))]
+        return {
+            'approved': self.approved,
+            'vetoed': self.vetoed,
+            'p50_ms': round(float(np.percentile(window, 50)), 3) if len(window) else None,
+            'p99_ms': round(float(np.percentile(window, 99)), 3) if len(window) else None
+        }
+
+    async def stats_loop(self):
+        while True:
+            await asyncio.sleep(self.stats_interval_s)
+            stats = self.stats()
+            logger.info(f"Approved {stats['approved']} | vetoed {stats['vetoed']} | "
+                        f"added latency p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+
+    async def run(self):
+        logger.info("=== G.O.S. SAFETY ENFORCEMENT PROXY STARTING ===")
+        logger.info(f"Laws: {SafetyLTLMonitor().formulas}")
+        self.loop = asyncio.get_running_loop()
+        self.veto_rows = asyncio.Queue(maxsize=10000)
+
+        self.client.connect(self.mqtt_broker, self.mqtt_port, 60)
+        self.client.loop_start()
+        tasks = [self.veto_writer(), self.stats_loop()]
+        if self.state_input == "db":
+            tasks.append(self.poll_node_latest())
+        logger.info(f"{PROPOSED_TOPIC} -> {SCHEDULE_TOPIC} | live state: {self.state_input}")
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.client.loop_stop()
+
+
+if __name__ == "__main__":
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        logger.error("DATABASE_URL not set!")
+        exit(1)
+
+    proxy = SafetyEnforcementProxy(
+        db_url,
+        mqtt_broker=os.getenv("MQTT_BROKER", "localhost"),
+        mqtt_port=int(os.getenv("MQTT_PORT", 1883)),
+        state_input=os.getenv("STATE_INPUT", "mqtt"),
+        max_command_age_ms=float(os.getenv("MAX_COMMAND_AGE_MS", 250)),
+        max_state_age_s=float(os.getenv("MAX_STATE_AGE_S", 300))
+    )
+    asyncio.run(proxy.run())
@@ -99,6 +99,144 @@ class ResearchCurationEngine:
         
         return pd.DataFrame(valid_records).reset_index(drop=True)
 
+    def load_sources(self, conn) -> dict:
+        """Reads the five research streams from TimescaleDB into DataFrames."""
+        # --- SOURCE 1: HARDWARE TELEMETRY (40 nRF52 nodes) ---
+        df_hardware = pd.read_sql("""
+            SELECT 
+                time as timestamp,
+                node_id, 
+                sample_identity,
+                temp_c,
+                humidity_pct,
+                par_umol,
+                battery_mv,
+                rssi
+            FROM raw_telemetry 
+            WHERE time > NOW() - INTERVAL '24 hours'
+            ORDER BY time DESC
+        """, conn)
+        
+        # --- SOURCE 2: METEOROLOGICAL STATION ---
+        # Station samples every 5 minutes, so the 1-minute aggregate loses no
+        # resolution and reads stay off the (compressed) raw chunks.
+        df_met = pd.read_sql("""
+            SELECT 
+                bucket as met_ts,
+                avg_net_radiation as net_radiation,
+                avg_blue_irradiance as spectral_blue_irradiance,
+                avg_red_irradiance as spectral_red_irradiance,
+                avg_air_temp as air_temp_c,
+                avg_humidity as relative_humidity_pct,
+                avg_co2 as co2_ppm
+            FROM minute_met_stats 
+            WHERE bucket > NOW() - INTERVAL '24 hours'
+        """, conn)
+        
+        # --- SOURCE 3: RESEARCHER INPUTS (Group 2 GUI / LLM) ---
+        df_events = pd.read_sql("""
+            SELECT 
+                time as event_ts,
+                event_type,
+                severity,
+                description,
+                created_via_llm
+            FROM research_events 
+            WHERE time > NOW() - INTERVAL '7 days'
+        """, conn)
+        
+        # --- SOURCE 4: LED SCHEDULE HISTORY ---
+        df_led = pd.read_sql("""
+            SELECT 
+                time as led_ts,
+                blue_ratio,
+                red_ratio,
+                intensity_pct,
+                sector_id
+            FROM led_schedule_history 
+            WHERE time > NOW() - INTERVAL '24 hours'
+        """, conn)
+        
+        # --- SOURCE 5: YIELD DATA ---
+        df_yield = pd.read_sql("""
+            SELECT 
+                time as yield_ts,
+                row_index,
+                weight_grams,
+                brix_value,
+                plant_id
+            FROM yield_logs 
+            WHERE time > NOW() - INTERVAL '30 days'
+        """, conn)
+        
+        return {
+            'hardware': df_hardware,
+            'met': df_met,
+            'events': df_events,
+            'led': df_led,
+            'yield': df_yield
+        }
+
+    def synchronize_sources(self, df_hardware: pd.DataFrame, df_met: pd.DataFrame,
+                            df_led: pd.DataFrame, df_events: pd.DataFrame) -> pd.DataFrame:
+        """
+        Temporal synchronization (Triple+ Joins) with preserved sample identity.
+        
+        Inputs use the column aliases produced by load_sources().
+        """
+        # 1. Join Hardware with Meteorological (nearest within 10 minutes)
+        df_hardware['timestamp'] = pd.to_datetime(df_hardware['timestamp'])
+        if not df_met.empty:
+            df_met['met_ts'] = pd.to_datetime(df_met['met_ts'])
+            df_joined = pd.merge_asof(
+                df_hardware.sort_values('timestamp'),
+                df_met.sort_values('met_ts'),
+                left_on='timestamp',
+                right_on='met_ts',
+                direction='nearest',
+                tolerance=pd.Timedelta('10 minutes')
+            )
+        else:
+            df_joined = df_hardware
+        
+        # 2. Join with LED Schedule (backward - what was the light setting)
+        if not df_led.empty:
+            df_led['led_ts'] = pd.to_datetime(df_led['led_ts'])
+            df_joined = pd.merge_asof(
+                df_joined.sort_values('timestamp'),
+                df_led.sort_values('led_ts'),
+                left_on='timestamp',
+                right_on='led_ts',
+                direction='backward',
+                tolerance=pd.Timedelta('1 hour')
+            )
+        
+        # 3. Join with Research Events (backward - carry event state)
+        if not df_events.empty:
+            df_events['event_ts'] = pd.to_datetime(df_events['event_ts'])
+            df_final = pd.merge_asof(
+                df_joined.sort_values('timestamp'),
+                df_events.sort_values('event_ts'),
+                left_on='timestamp',
+                right_on='event_ts',
+                direction='backward',
+                tolerance=pd.Timedelta('24 hours')
+            )
+        else:
+            df_final = df_joined
+        
+        # --- ENSURE PRESERVED SAMPLE IDENTITY ---
+        # Critical ELEC 490/498 requirement
+        if 'sample_identity' not in df_final.columns:
+            df_final['sample_identity'] = df_final['node_id']
+        
+        return df_final
+
+    def export_curated(self, df_final: pd.DataFrame):
+        """Writes the ML-ready curation to self.output_path."""
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        df_final.to_csv(self.output_path, index=False)
+
     def curate_ml_ready_set(self):
         """
         Assembles the high-fidelity ML-ready dataset from THREE distinct streams.
@@ -106,142 +244,33 @@ class ResearchCurationEngine:
         """
         try:
             conn = psycopg2.connect(self.db_url)
+            sources = self.load_sources(conn)
+            conn.close()
             
-            # --- SOURCE 1: HARDWARE TELEMETRY (40 nRF52 nodes) ---
-            df_hardware = pd.read_sql("""
-                SELECT 
-                    time as timestamp,
-                    node_id, 
-                    sample_identity,
-                    temp_c,
-                    humidity_pct,
-                    par_umol,
-                    battery_mv,
-                    rssi
-                FROM raw_telemetry 
-                WHERE time > NOW() - INTERVAL '24 hours'
-                ORDER BY time DESC
-            """, conn)
+            df_hardware = sources['hardware']
             
             # Validate hardware data
             if not df_hardware.empty:
                 df_hardware = self.validate_telemetry(df_hardware)
             
-            # --- SOURCE 2: METEOROLOGICAL STATION ---
-            df_met = pd.read_sql("""
-                SELECT 
-                    time as met_ts,
-                    net_radiation,
-                    spectral_blue_irradiance,
-                    spectral_red_irradiance,
-                    air_temp_c,
-                    relative_humidity_pct,
-                    co2_ppm
-                FROM met_station_data 
-                WHERE time > NOW() - INTERVAL '24 hours'
-            """, conn)
-            
-            # --- SOURCE 3: RESEARCHER INPUTS (Group 2 GUI / LLM) ---
-            df_events = pd.read_sql("""
-                SELECT 
-                    time as event_ts,
-                    event_type,
-                    severity,
-                    description,
-                    created_via_llm
-                FROM research_events 
-                WHERE time > NOW() - INTERVAL '7 days'
-            """, conn)
-            
-            # --- SOURCE 4: LED SCHEDULE HISTORY ---
-            df_led = pd.read_sql("""
-                SELECT 
-                    time as led_ts,
-                    blue_ratio,
-                    red_ratio,
-                    intensity_pct,
-                    sector_id
-                FROM led_schedule_history 
-                WHERE time > NOW() - INTERVAL '24 hours'
-            """, conn)
-            
-            # --- SOURCE 5: YIELD DATA ---
-            df_yield = pd.read_sql("""
-                SELECT 
-                    time as yield_ts,
-                    row_index,
-                    weight_grams,
-                    brix_value,
-                    plant_id
-                FROM yield_logs 
-                WHERE time > NOW() - INTERVAL '30 days'
-            """, conn)
-            
             if df_hardware.empty:
                 logger.warning("Data backbone ready, awaiting hardware telemetry...")
-                conn.close()
                 return
             
-            logger.info(f"Loaded: {len(df_hardware)} telemetry, {len(df_met)} met, {len(df_events)} events, {len(df_led)} LED, {len(df_yield)} yield")
+            logger.info(f"Loaded: {len(df_hardware)} telemetry, {len(sources['met'])} met, {len(sources['events'])} events, {len(sources['led'])} LED, {len(sources['yield'])} yield")
             
             # --- TEMPORAL SYNCHRONIZATION (Triple+ Joins) ---
-            
-            # 1. Join Hardware with Meteorological (nearest within 10 minutes)
-            df_hardware['timestamp'] = pd.to_datetime(df_hardware['timestamp'])
-            if not df_met.empty:
-                df_met['met_ts'] = pd.to_datetime(df_met['met_ts'])
-                df_joined = pd.merge_asof(
-                    df_hardware.sort_values('timestamp'),
-                    df_met.sort_values('met_ts'),
-                    left_on='timestamp',
-                    right_on='met_ts',
-                    direction='nearest',
-                    tolerance=pd.Timedelta('10 minutes')
-                )
-            else:
-                df_joined = df_hardware
-            
-            # 2. Join with LED Schedule (backward - what was the light setting)
-            if not df_led.empty:
-                df_led['led_ts'] = pd.to_datetime(df_led['led_ts'])
-                df_joined = pd.merge_asof(
-                    df_joined.sort_values('timestamp'),
-                    df_led.sort_values('led_ts'),
-                    left_on='timestamp',
-                    right_on='led_ts',
-                    direction='backward',
-                    tolerance=pd.Timedelta('1 hour')
-                )
-            
-            # 3. Join with Research Events (backward - carry event state)
-            if not df_events.empty:
-                df_events['event_ts'] = pd.to_datetime(df_events['event_ts'])
-                df_final = pd.merge_asof(
-                    df_joined.sort_values('timestamp'),
-                    df_events.sort_values('event_ts'),
-                    left_on='timestamp',
-                    right_on='event_ts',
-                    direction='backward',
-                    tolerance=pd.Timedelta('24 hours')
-                )
-            else:
-                df_final = df_joined
-            
-            # --- ENSURE PRESERVED SAMPLE IDENTITY ---
-            # Critical ELEC 490/498 requirement
-            if 'sample_identity' not in df_final.columns:
-                df_final['sample_identity'] = df_final['node_id']
+            df_final = self.synchronize_sources(
+                df_hardware, sources['met'], sources['led'], sources['events']
+            )
             
             # --- EXPORT ML-READY CURATION ---
-            os.makedirs("/app/data", exist_ok=True)
-            df_final.to_csv(self.output_path, index=False)
+            self.export_curated(df_final)
             
             logger.info(f"✓ DATA BACKBONE CURATED: {len(df_final)} rows")
             logger.info(f"  - Sample identities preserved: {df_final['sample_identity'].nunique()}")
             logger.info(f"  - Output: {self.output_path}")
             
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Backbone Curation Failed: {e}")
             import traceback
@@ -258,7 +287,15 @@ if __name__ == "__main__":
     
     engine = ResearchCurationEngine(db_url)
     logger.info("=== ELEC 490/498 DATA BACKBONE INITIALIZED ===")
+
+    # Battery depletion fits (hourly_node_health -> battery_forecasts)
+    from battery_forecast import BatteryForecaster
+    forecaster = BatteryForecaster(db_url)
     
     while True:
         engine.curate_ml_ready_set()
+        try:
+            forecaster.update()
+        except Exception as e:
+            logger.error(f"Battery forecast error: {e}")
         time.sleep(300)  # Re-curate every 5 minutes
@@ -0,0 +1,198 @@
+"""
+G.O.S. Synthetic Research Dataset Generator
+===========================================
+Builds realistic, reproducible research frames in memory so the data
+backbone can be exercised without the docker-compose stack.
+
+Frames (column names match ResearchCurationEngine.load_sources):
+- hardware: per-node telemetry driven by farm_sim.diurnal_ambient
+- met: 5-minute station samples driven by met_station.solar_profile
+- led: per-sector LED schedule changes
+- events: researcher events (PEST, FERTILIZER, EQUIPMENT_FAIL, YIELD)
+- yield: harvest logs per plant
+
+All generation is vectorized with NumPy and seeded, so identical
+arguments always produce identical frames.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from farm_sim import DEFAULT_SECTORS, diurnal_ambient
+from met_station import solar_profile
+
+# Anchor for synthetic seasons (fixed so runs are comparable across commits)
+DEFAULT_START = datetime(2026, 3, 1)
+
+EVENT_TYPES = np.array(['PEST', 'FERTILIZER', 'EQUIPMENT_FAIL', 'YIELD'])
+
+
+class SyntheticFarm:
+    """
+    Vectorized synthetic Phytotron fleet.
+
+    Scales from the 40-node research bench to 10,000-node commercial
+    deployments and from a single day to a 90-day season.
+    """
+
+    def __init__(self, node_count=40, days=1, interval_s=60, seed=490,
+                 start=DEFAULT_START):
+        self.node_count = node_count
+        self.days = days
+        self.interval_s = interval_s
+        self.seed = seed
+        self.start = pd.Timestamp(start)
+        self.sectors = list(DEFAULT_SECTORS)
+
+    @property
+    def expected_rows(self) -> int:
+        """Number of telemetry rows generate_hardware() will produce."""
+        return self.node_count * self._sample_count(self.interval_s)
+
+    def _sample_count(self, interval_s) -> int:
+        return int(self.days * 86400 // interval_s)
+
+    def _rng(self, stream: int) -> np.random.Generator:
+        # Independent, reproducible stream per frame
+        return np.random.default_rng([self.seed, stream])
+
+    def _times(self, seconds) -> pd.DatetimeIndex:
+        # Single resolution across frames so merge_asof keys always match
+        offsets = pd.to_timedelta(np.asarray(seconds, dtype=float), unit='s')
+        return pd.DatetimeIndex(self.start + offsets).as_unit('ns')
+
+    @staticmethod
+    def _hour_of_day(times: pd.DatetimeIndex) -> np.ndarray:
+        return (times.hour + times.minute / 60.0).to_numpy(dtype=float)
+
+    def generate_hardware(self) -> pd.DataFrame:
+        """Telemetry for every node at interval_s (±5 s jitter)."""
+        rng = self._rng(1)
+        n_samples = self._sample_count(self.interval_s)
+        n_nodes = self.node_count
+
+        offsets = np.arange(n_samples, dtype=np.int64) * self.interval_s
+        jitter = rng.uniform(-5, 5, size=(n_samples, n_nodes))
+        seconds = offsets[:, None] + jitter
+        times = self._times(seconds.ravel())
+        hour = self._hour_of_day(times).reshape(n_samples, n_nodes)
+
+        temp, hum, par = diurnal_ambient(hour)
+
+        # Local micro-climate variance (same spread as farm_sim)
+        temp = temp + rng.normal(0, 0.3, size=temp.shape)
+        hum = hum + rng.normal(0, 2, size=hum.shape)
+        par = np.maximum(0, par + rng.normal(0, 50, size=par.shape))
+
+        node_index = np.arange(1, n_nodes + 1)
+        # Node 12: Near heating vent (warmer), Node 28: Near door (drafty, cooler)
+        temp[:, node_index == 12] += 2.5
+        temp[:, node_index == 28] -= 1.5
+        hum[:, node_index == 28] += 5
+
+        runtime_hours = offsets[:, None] / 3600.0
+        battery = 4200 - runtime_hours * 0.5 + rng.normal(0, 20, size=temp.shape)
+        battery = np.clip(battery, 3000, 4200).astype(np.int32)
+
+        rssi = -50 - (node_index % 20) + rng.integers(-5, 6, size=temp.shape)
+
+        node_ids = np.array([f"PH-NODE-{i:02d}" for i in node_index])
+        euis = np.array([f"00:11:22:33:44:55:{0x66 + (i >> 8):02X}:{i & 0xFF:02X}" for i in node_index])
+
+        return pd.DataFrame({
+            'timestamp': times,
+            'node_id': np.tile(node_ids, n_samples),
+            'sample_identity': np.tile(euis, n_samples),
+            'temp_c': np.round(temp.ravel(), 2),
+            'humidity_pct': np.round(hum.ravel(), 1),
+            'par_umol': np.round(par.ravel(), 1),
+            'battery_mv': battery.ravel(),
+            'rssi': rssi.ravel().astype(np.int32)
+        })
+
+    def generate_met(self, interval_s=300) -> pd.DataFrame:
+        """Met-station samples (5-minute interval by default)."""
+        rng = self._rng(2)
+        n = self._sample_count(interval_s)
+        times = self._times(np.arange(n) * interval_s)
+        profile = solar_profile(self._hour_of_day(times))
+        day = profile['daylight']
+
+        net_rad = np.where(day, profile['net_radiation'] + rng.normal(0, 20, n),
+                           rng.normal(0, 5, n))
+        blue = np.where(day, profile['spectral_blue'] + rng.normal(0, 3, n),
+                        rng.normal(5, 1, n))
+        red = np.where(day, profile['spectral_red'] + rng.normal(0, 10, n),
+                       rng.normal(20, 2, n))
+
+        return pd.DataFrame({
+            'met_ts': times,
+            'net_radiation': np.round(np.maximum(0, net_rad), 1),
+            'spectral_blue_irradiance': np.round(np.maximum(0, blue), 2),
+            'spectral_red_irradiance': np.round(np.maximum(0, red), 2),
+            'air_temp_c': np.round(profile['air_temp'] + rng.normal(0, 0.5, n), 2),
+            'relative_humidity_pct': np.round(
+                np.clip(profile['rel_humidity'] + rng.normal(0, 2, n), 0, 100), 1),
+            'co2_ppm': np.round(np.maximum(300, profile['co2'] + rng.normal(0, 10, n)), 0)
+        })
+
+    def generate_led(self, interval_s=3600) -> pd.DataFrame:
+        """Hourly per-sector LED schedule changes."""
+        rng = self._rng(3)
+        n = self._sample_count(interval_s)
+        n_sectors = len(self.sectors)
+        times = self._times(np.arange(n) * interval_s)
+
+        blue = np.round(rng.uniform(0.15, 0.6, size=(n, n_sectors)), 2)
+        intensity = rng.integers(40, 101, size=(n, n_sectors))
+
+        return pd.DataFrame({
+            'led_ts': np.repeat(times, n_sectors),
+            'blue_ratio': blue.ravel(),
+            'red_ratio': np.round(1 - blue.ravel(), 2),
+            'intensity_pct': intensity.ravel(),
+            'sector_id': np.tile(self.sectors, n)
+        })
+
+    def generate_events(self, events_per_day=6) -> pd.DataFrame:
+        """Researcher events scattered uniformly over the season."""
+        rng = self._rng(4)
+        n = max(1, int(self.days * events_per_day))
+        seconds = np.sort(rng.uniform(0, self.days * 86400, n))
+        types = EVENT_TYPES[rng.integers(0, len(EVENT_TYPES), n)]
+
+        return pd.DataFrame({
+            'event_ts': self._times(seconds),
+            'event_type': types,
+            'severity': rng.integers(1, 6, n),
+            'description': np.char.add(types.astype(str), ' (synthetic)'),
+            'created_via_llm': rng.random(n) < 0.3
+        })
+
+    def generate_yield(self, harvests_per_day=1) -> pd.DataFrame:
+        """Harvest logs: one pick per node-plant per harvest."""
+        rng = self._rng(5)
+        n_harvests = max(1, int(self.days * harvests_per_day))
+        n = n_harvests * self.node_count
+        seconds = np.repeat(np.arange(n_harvests) * 86400 / harvests_per_day + 10 * 3600,
+                            self.node_count)
+
+        return pd.DataFrame({
+            'yield_ts': self._times(seconds),
+            'row_index': np.tile(np.arange(self.node_count) % 20 + 1, n_harvests),
+            'weight_grams': np.round(rng.gamma(4.0, 6.0, n), 1),
+            'brix_value': np.round(rng.normal(8.5, 1.0, n), 1),
+            'plant_id': np.tile([f"PLANT-{i:05d}" for i in range(1, self.node_count + 1)],
+                                n_harvests)
+        })
+
+    def generate_all(self) -> dict:
+        """All five frames keyed like ResearchCurationEngine.load_sources()."""
+        return {
+            'hardware': self.generate_hardware(),
+            'met': self.generate_met(),
+            'events': self.generate_events(),
+            'led': self.generate_led(),
+            'yield': self.generate_yield()
+        }
@@ -0,0 +1,48 @@
+"""
+G.O.S. UDP Ingest Tests
+=======================
+Loopback checks of the multi-process (SO_REUSEPORT) MQTT-SN relay, built
+on bench_udp_ingest:
+
+- Scaling: decoded packets/s must rise with the worker count. Needs a
+  free core for every worker and sender, skipped on smaller machines.
+- Restart: a SIGKILLed worker is respawned, receives traffic and its
+  totals are kept.
+
+Usage:
+    python -m pytest test_udp_ingest.py
+"""
+
+import argparse
+import os
+
+import pytest
+
+from bench_udp_ingest import run_restart_check, run_scaling
+
+WORKERS = [1, 2]
+SENDERS = 2
+
+
+def bench_args(**overrides):
+    args = argparse.Namespace(workers=WORKERS, senders=SENDERS, sockets=64, frames_per_datagram=1,
+                              duration=2.0, port=47900)
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+def test_throughput_scales_with_workers():
+    cores = os.cpu_count() or 1
+    if cores < max(WORKERS) + SENDERS:
+        pytest.skip(f"{cores} CPU core(s): scaling needs {max(WORKERS) + SENDERS} "
+                    f"({max(WORKERS)} workers + {SENDERS} senders)")
+    rows = run_scaling(bench_args())
+    rates = [received for _, _, received, _, _, _ in rows]
+    assert all(rate > 0 for rate in rates)
+    assert all(later > earlier for earlier, later in zip(rates, rates[1:])), \
+        f"decoded packets per run did not rise with workers {WORKERS}: {rates}"
+
+
+def test_killed_worker_is_respawned():
+    assert run_restart_check(bench_args())
@@ -1,42 +1,411 @@
-import random
+"""
+G.O.S. Transpiration RL Agent
+=============================
+Tabular Q-learning agent for LED spectral quality control.
+
+State: discretized VPD x PAR (ambient + LED) x current blue ratio.
+Actions: the discrete LED settings of greenhouse_env (blue ratio x intensity).
+
+Experience lives in a preallocated NumPy ring buffer. The agent can be
+pretrained offline from the curated dataset (LED setting -> subsequent
+transpiration/VPD of the same node) and trained online against the
+batched GreenhouseVecEnv; both use mini-batch Q updates. Q-table and
+training counters are checkpointed to .npz.
+
+Usage:
+    python agent_rl.py                       # pretrain (if curated CSV exists), train, demo
+    python agent_rl.py --iterations 2000 --checkpoint /app/data/rl_agent.npz
+"""
+
+import argparse
+import bisect
+import logging
+import os
 import time
 
+import numpy as np
+import pandas as pd
+
+from greenhouse_env import ACTIONS, BLUE_LEVELS, INTENSITY_LEVELS, LED_MAX_PAR, GreenhouseVecEnv, led_reward
+from plant_sim_c3 import StrawberryPhysiologySim
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [RL-AGENT] %(message)s')
+logger = logging.getLogger("TranspirationRLAgent")
+
+VPD_BINS = [0.4, 0.8, 1.2, 1.5, 2.0]        # kPa
+PAR_BINS = [50, 200, 400, 600, 800]         # µmol/m²/s (ambient + LED)
+N_STATES = (len(VPD_BINS) + 1) * (len(PAR_BINS) + 1) * len(BLUE_LEVELS)
+N_ACTIONS = len(ACTIONS)
+
+DEFAULT_CHECKPOINT = "/app/data/rl_agent.npz"
+DEFAULT_DATASET = "/app/data/curated_research_dataset.csv"
+CURATED_COLUMNS = ['timestamp', 'node_id', 'temp_c', 'humidity_pct', 'par_umol', 'blue_ratio', 'intensity_pct']
+
+
+class ReplayBuffer:
+    """Preallocated ring buffer of (state, action, reward, next_state, done)."""
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Appends a batch of transitions, overwriting the oldest when full."""
+        n = len(states)
+        if n > self.capacity:
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            next_states, dones = next_states[-self.capacity:], dones[-self.capacity:]
+            n = self.capacity
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size, rng):
+        idx = rng.integers(0, self.size, batch_size)
+        return (self.states[idx], self.actions[idx], self.rewards[idx],
+                self.next_states[idx], self.dones[idx])
+
+    def __len__(self):
+        return self.size
+
+
 class TranspirationRLAgent:
     """RL Agent for LED Spectral Quality Control (Reinforcement Learning Research)."""
-    def __init__(self):
+
+    def __init__(self, learning_rate=0.1, gamma=0.9, epsilon=0.2,
+                 buffer_capacity=200000, seed=490):
         self.state = {"par": 800, "vpd": 1.2, "spectral_blue": 0.2}
         self.reward_history = []
+        self.learning_rate = learning_rate
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.q_table = np.zeros((N_STATES, N_ACTIONS))
+        self.buffer = ReplayBuffer(buffer_capacity)
+        self.updates = 0
+        self.last_shift = None
+        self.sim = StrawberryPhysiologySim()
+        # Recent get_action latencies (ns)
+        self.latencies_ns = np.zeros(4096, dtype=np.int64)
+        self.latency_count = 0
+
+    # =========================================
+    # STATE ENCODING
+    # =========================================
+
+    @staticmethod
+    def encode_states(vpd, par, blue) -> np.ndarray:
+        """Vectorized state index from VPD (kPa), PAR and current blue ratio."""
+        v = np.searchsorted(VPD_BINS, vpd, side='right')
+        p = np.searchsorted(PAR_BINS, par, side='right')
+        b = np.abs(BLUE_LEVELS[:, None] - np.atleast_1d(blue)).argmin(axis=0)
+        return ((v * (len(PAR_BINS) + 1) + p) * len(BLUE_LEVELS) + b).astype(np.int32)
+
+    @staticmethod
+    def encode_state(vpd, par, blue) -> int:
+        """Scalar state index (pure Python for sub-millisecond decisions)."""
+        v = bisect.bisect_right(VPD_BINS, vpd)
+        p = bisect.bisect_right(PAR_BINS, par)
+        b = min(range(len(BLUE_LEVELS)), key=lambda i: abs(BLUE_LEVELS[i] - blue))
+        return (v * (len(PAR_BINS) + 1) + p) * len(BLUE_LEVELS) + b
+
+    @staticmethod
+    def env_states(obs) -> np.ndarray:
+        """State indices from GreenhouseVecEnv observations."""
+        par = obs[:, 4] * 800.0 + obs[:, 7] * LED_MAX_PAR
+        return TranspirationRLAgent.encode_states(obs[:, 5], par, obs[:, 6])
 
-    def get_action(self, current_vpd, current_par):
+    # =========================================
+    # POLICY
+    # =========================================
+
+    def act_batch(self, states, explore=False, allowed=None) -> np.ndarray:
+        """
+        Greedy (or epsilon-greedy) actions for an array of states.
+        allowed: optional (len(states), N_ACTIONS) mask, e.g. from a safety
+        screen; rows without any allowed action fall back to the greedy action.
+        """
+        q = self.q_table[states]
+        if allowed is not None:
+            q = np.where(allowed, q, -np.inf)
+        actions = q.argmax(axis=1)
+        if explore:
+            random_mask = self.rng.random(len(states)) < self.epsilon
+            random_actions = self.rng.integers(0, N_ACTIONS, len(states))
+            if allowed is not None:
+                random_mask &= allowed[np.arange(len(states)), random_actions]
+            actions[random_mask] = random_actions[random_mask]
+        return actions
+
+    def get_action(self, current_vpd, current_par, current_blue=None):
         """Recommends a spectral quality shift to optimize transpiration."""
-        # Simple policy: If VPD is high, increase blue ratio to maintain stomatal conductance
-        # but manage water stress.
-        if current_vpd > 1.5:
-            recommendation = "Increase blue ratio to 0.45; Increase Far-Red"
-            shift = {"blue": 0.45, "red": 0.55}
-        else:
-            recommendation = "Maintain Blue ratio at 0.20"
-            shift = {"blue": 0.2, "red": 0.8}
-            
+        start = time.perf_counter_ns()
+        if current_blue is None:
+            # Assume the previous recommendation was applied
+            current_blue = self.last_shift["blue"] if self.last_shift else self.state["spectral_blue"]
+        blue = current_blue
+        action = int(self.q_table[self.encode_state(current_vpd, current_par, blue)].argmax())
+        blue_ratio, intensity = ACTIONS[action]
+
+        shift = {"blue": float(blue_ratio), "red": round(1.0 - float(blue_ratio), 2),
+                 "intensity": int(intensity)}
+        recommendation = f"Set blue ratio to {blue_ratio:.2f} at {int(intensity)}% intensity"
+        self.state = {"par": current_par, "vpd": current_vpd, "spectral_blue": float(blue)}
+        self.last_shift = shift
+
+        self.latencies_ns[self.latency_count % len(self.latencies_ns)] = time.perf_counter_ns() - start
+        self.latency_count += 1
         return recommendation, shift
 
+    def latency_stats(self) -> dict:
+        """get_action latency percentiles (ms) over the recent window."""
+        window = self.latencies_ns[:min(self.latency_count, len(self.latencies_ns))]
+        if len(window) == 0:
+            return {}
+        return {
+            'calls': self.latency_count,
+            'p50_ms': round(float(np.percentile(window, 50)) / 1e6, 4),
+            'p99_ms': round(float(np.percentile(window, 99)) / 1e6, 4),
+            'max_ms': round(float(window.max()) / 1e6, 4)
+        }
+
     def predict_transpiration_delta(self, shift):
-        """Mock prediction of transpiration change (g/dm2/h)."""
-        # Blue light (450nm) strongly stimulates stomatal opening (Ref: Physiology requirements)
-        delta = 0.05 if shift["blue"] > 0.3 else 0.01
-        return delta
+        """Model-based transpiration change (g/dm2/h) of a shift vs the current state."""
+        vpd, par = self.state["vpd"], self.state["par"]
+        temp = 24.0
+        esat = 0.611 * np.exp(17.27 * temp / (temp + 237.3))
+        hum = max(0.0, 100.0 * (1 - vpd / esat))
+        led_par = shift.get("intensity", 0) / 100.0 * LED_MAX_PAR
+        after = self.sim.transpiration_array(par + led_par, temp, hum, shift["blue"])
+        before = self.sim.transpiration_array(par, temp, hum, self.state["spectral_blue"])
+        return round(float(after["transpiration_rate"] - before["transpiration_rate"]) / 100.0, 3)
+
+    # =========================================
+    # LEARNING
+    # =========================================
+
+    def train_batch(self, batch_size=256) -> float:
+        """One mini-batch Q-learning update from the replay buffer; returns mean |TD error|."""
+        s, a, r, s2, done = self.buffer.sample(batch_size, self.rng)
+        target = r + self.gamma * (~done) * self.q_table[s2].max(axis=1)
+        td = target - self.q_table[s, a]
+        # Duplicate (s, a) pairs in a batch share one averaged update
+        flat = s.astype(np.int64) * N_ACTIONS + a
+        pairs, inverse = np.unique(flat, return_inverse=True)
+        mean_td = np.bincount(inverse, weights=td) / np.bincount(inverse)
+        self.q_table.flat[pairs] += self.learning_rate * mean_td
+        self.updates += 1
+        return float(np.abs(td).mean())
+
+    def train_online(self, env: GreenhouseVecEnv, iterations=500, batch_size=256,
+                     updates_per_step=4) -> dict:
+        """Collects epsilon-greedy experience from a batched env and trains."""
+        obs, _ = env.reset()
+        episode_return = np.zeros(env.num_envs)
+        start = time.perf_counter()
+
+        for _ in range(iterations):
+            states = self.env_states(obs)
+            actions = self.act_batch(states, explore=True)
+            obs, reward, terminated, truncated, _ = env.step(actions)
+            # Auto-reset observations belong to a new episode: no bootstrap across them
+            done = terminated | truncated
+            self.buffer.add_batch(states, actions, reward, self.env_states(obs), done)
+
+            episode_return += reward
+            if done.any():
+                self.reward_history.append(float(episode_return[done].mean()))
+                episode_return[done] = 0.0
+
+            for _ in range(updates_per_step):
+                self.train_batch(batch_size)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'env_steps': iterations * env.num_envs,
+            'updates': iterations * updates_per_step,
+            'seconds': round(elapsed, 2),
+            'recent_return': round(float(np.mean(self.reward_history[-10:])), 3) if self.reward_history else None
+        }
+        logger.info(f"Online: {stats['env_steps']:,} env steps, {stats['updates']} updates "
+                    f"in {elapsed:.2f}s | recent episode return {stats['recent_return']}")
+        return stats
+
+    @staticmethod
+    def _hourly(df: pd.DataFrame) -> pd.DataFrame:
+        """Curated samples averaged per node-hour (the env step)."""
+        df = df.dropna(subset=CURATED_COLUMNS).copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp']).dt.floor('h')
+        return (df.groupby(['node_id', 'timestamp'], sort=True)[CURATED_COLUMNS[2:]].mean()
+                .reset_index())
+
+    def transitions_from_curated(self, df: pd.DataFrame) -> tuple:
+        """
+        Offline transitions from the curated dataset. Samples are averaged
+        per node-hour (the env step); each transition is the state of an
+        hour, the LED setting in force and the outcome of the next hour.
+        """
+        return self._transitions(self._hourly(df))
+
+    def _transitions(self, df: pd.DataFrame, emit=None) -> tuple:
+        """
+        Transitions between consecutive node-hours of an hourly frame;
+        emit (bool per row) limits which rows start a transition.
+        """
+        temp = df['temp_c'].to_numpy(dtype=float)
+        hum = df['humidity_pct'].to_numpy(dtype=float)
+        ambient = df['par_umol'].to_numpy(dtype=float)
+        blue = df['blue_ratio'].to_numpy(dtype=float)
+        intensity = df['intensity_pct'].to_numpy(dtype=float)
+        esat = 0.611 * np.exp(17.27 * temp / (temp + 237.3))
+        vpd = esat * (1 - hum / 100.0)
+
+        grouped = df.groupby('node_id', sort=False)
+        prev_blue = grouped['blue_ratio'].shift(1).fillna(df['blue_ratio']).to_numpy(dtype=float)
+        prev_intensity = grouped['intensity_pct'].shift(1).fillna(df['intensity_pct']).to_numpy(dtype=float)
+        # Transitions only between consecutive hours of the same node
+        next_time = grouped['timestamp'].shift(-1)
+        valid = ((next_time - df['timestamp']) == pd.Timedelta(hours=1)).to_numpy()
+        if emit is not None:
+            valid = valid & emit
+        nxt = np.minimum(np.arange(len(df)) + 1, len(df) - 1)
+
+        # PAR as in GreenhouseVecEnv: node par_umol is the ambient light,
+        # plus the LED PAR of the setting in force
+        led_par = intensity / 100.0 * LED_MAX_PAR
+        states = self.encode_states(vpd, ambient + prev_intensity / 100.0 * LED_MAX_PAR, prev_blue)
+        actions = TranspirationRLAgent._action_index(blue, intensity)
+        # Outcome: transpiration under the next hour's measured climate and this LED setting
+        transpiration = self.sim.transpiration_array(ambient[nxt] + led_par, temp[nxt], hum[nxt],
+                                                     blue)['transpiration_rate']
+        hour = (df['timestamp'].dt.hour + df['timestamp'].dt.minute / 60.0).to_numpy()
+        rewards, _ = led_reward(transpiration, led_par, hour)
+        next_states = self.encode_states(vpd[nxt], ambient[nxt] + led_par, blue)
+
+        return (states[valid], actions[valid], rewards[valid].astype(np.float32),
+                next_states[valid], np.zeros(int(valid.sum()), dtype=bool))
+
+    @staticmethod
+    def _action_index(blue, intensity) -> np.ndarray:
+        b = np.abs(BLUE_LEVELS[:, None] - np.atleast_1d(blue)).argmin(axis=0)
+        i = np.abs(INTENSITY_LEVELS[:, None] - np.atleast_1d(intensity)).argmin(axis=0)
+        return (b * len(INTENSITY_LEVELS) + i).astype(np.int32)
+
+    def pretrain_offline(self, path, epochs=5, batch_size=256, chunksize=500000) -> int:
+        """
+        Fills the replay buffer from a curated CSV (time-ordered, as sync.py
+        exports it) and runs mini-batch updates.
+
+        The CSV is read in chunks. Each node's last hour in a chunk may
+        continue in the next one, so its raw samples are carried over;
+        the last two complete node-hours are carried too, so the
+        transition across the boundary is kept with the LED setting that
+        was in force before it (only the latest of them starts one).
+        """
+        added = 0
+        carry = None        # raw samples of each node's (possibly incomplete) last hour
+        last_hours = None   # last two complete hourly rows per node
+
+        def add(hourly):
+            nonlocal added, last_hours
+            hourly = hourly.assign(emit=True)
+            if last_hours is not None:
+                hourly = (pd.concat([last_hours, hourly], ignore_index=True)
+                          .sort_values(['node_id', 'timestamp'], kind='stable', ignore_index=True))
+            if hourly.empty:
+                return
+            transitions = self._transitions(hourly, emit=hourly['emit'].to_numpy())
+            self.buffer.add_batch(*transitions)
+            added += len(transitions[0])
+            last_hours = hourly.groupby('node_id', sort=False).tail(2)
+            # The older row only provides the previous LED setting
+            last_hours = last_hours.assign(emit=~last_hours.duplicated('node_id', keep='last'))
+
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c in CURATED_COLUMNS):
+            if not set(CURATED_COLUMNS) <= set(chunk.columns):
+                logger.warning(f"{path} has no LED columns; skipping offline pretraining")
+                return 0
+            raw = chunk.dropna(subset=CURATED_COLUMNS)
+            if carry is not None:
+                raw = pd.concat([carry, raw], ignore_index=True)
+            hours = pd.to_datetime(raw['timestamp']).dt.floor('h')
+            held = (hours == hours.groupby(raw['node_id']).transform('max')).to_numpy()
+            carry = raw[held]
+            add(self._hourly(raw[~held]))
+        if carry is not None:
+            add(self._hourly(carry))
+
+        updates = epochs * max(1, added // batch_size)
+        for _ in range(updates):
+            self.train_batch(batch_size)
+        logger.info(f"Offline: {added} transitions from {path}, {updates} mini-batch updates")
+        return added
+
+    # =========================================
+    # CHECKPOINTS
+    # =========================================
+
+    def save(self, path=DEFAULT_CHECKPOINT):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, q_table=self.q_table, updates=self.updates, epsilon=self.epsilon,
+                 reward_history=np.array(self.reward_history, dtype=float))
+        os.replace(tmp, path)
+        logger.info(f"Checkpoint saved to {path} ({self.updates} updates)")
+
+    def load(self, path=DEFAULT_CHECKPOINT) -> bool:
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as ckpt:
+            if ckpt['q_table'].shape != self.q_table.shape:
+                logger.warning(f"Checkpoint {path} has a different state/action space; ignoring")
+                return False
+            self.q_table = ckpt['q_table']
+            self.updates = int(ckpt['updates'])
+            self.epsilon = float(ckpt['epsilon'])
+            self.reward_history = ckpt['reward_history'].tolist()
+        logger.info(f"Loaded checkpoint {path} ({self.updates} updates)")
+        return True
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transpiration RL agent training")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="Curated CSV for offline pretraining")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--iterations", type=int, default=2000, help="Online env iterations")
+    parser.add_argument("--envs", type=int, default=1024)
+    args = parser.parse_args()
+
     agent = TranspirationRLAgent()
+    agent.load(args.checkpoint)
+    if os.path.exists(args.dataset):
+        agent.pretrain_offline(args.dataset)
+    agent.train_online(GreenhouseVecEnv(num_envs=args.envs), iterations=args.iterations)
+    agent.save(args.checkpoint)
+
     print("--- [ML_ENGINE] RL RECOMMENDATION LOOP START ---")
-    
+    rng = np.random.default_rng()
     # Simulate a research day
     for hour in range(6, 18):
-        vpd = 1.0 + random.random()
+        vpd = 1.0 + rng.random()
         par = 200 + (hour - 6) * 100
-        
+
         rec, shift = agent.get_action(vpd, par)
         delta = agent.predict_transpiration_delta(shift)
-        
-        print(f"Hour {hour:02d}: VPD={vpd:.2f} | REC: {rec} | Predicted Transpiration Delta: +{delta}")
-        time.sleep(0.5)
+
+        print(f"Hour {hour:02d}: VPD={vpd:.2f} | REC: {rec} | Predicted Transpiration Delta: {delta:+}")
+
+    for _ in range(10000):
+        agent.get_action(0.4 + 2 * rng.random(), 1000 * rng.random())
+    logger.info(f"get_action latency: {agent.latency_stats()}")
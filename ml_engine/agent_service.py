@@ -0,0 +1,357 @@
+"""
+G.O.S. RL Agent Decision Service
+================================
+Live asyncio decision loop for TranspirationRLAgent.
+
+Input (one of):
+- mqtt: subscribes to gos/telemetry/# (sectors from gos/commission/# and,
+        with DATABASE_URL, the nodes table, re-read periodically), for
+        real hardware behind mqtt_sn_bridge
+- db:   polls the node_latest view (TimescaleDB, sectors joined). Used by
+        docker-compose: the simulated fleet (farm_sim) writes to the
+        database only and publishes no MQTT telemetry
+
+Whenever new telemetry arrives, readings are coalesced for a short batch
+window, averaged per sector and scored in ONE batched agent inference
+call. Beforehand every LED action of every due sector is screened in one
+check_batch call against the sector's SafetyLTLMonitor
+(gateway/services/safety_ltl.py, mounted into the container), so the
+agent picks its best safe action; a sector with no safe action is vetoed.
+Setpoints are published to gos/led/schedule, where mqtt_bridge records
+them in led_schedule_history. In docker-compose they go to
+gos/led/proposed instead, so the safety enforcement proxy
+(safety_proxy.py) re-checks them before they reach the lights; the agent
+then only commits a setpoint to its monitors once the proxy approves it
+(republished on gos/led/schedule), so vetoed setpoints never enter its
+trace.
+
+Instrumentation: end-to-end decision latency (telemetry receipt ->
+publish, p50/p99) and decisions per second are logged periodically.
+
+Environment:
+    AGENT_INPUT=mqtt|db, MQTT_BROKER, MQTT_PORT, DATABASE_URL,
+    LED_SCHEDULE_TOPIC (default gos/led/schedule), AGENT_CHECKPOINT
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import paho.mqtt.client as mqtt
+import psycopg2
+
+from agent_rl import DEFAULT_CHECKPOINT, TranspirationRLAgent
+from greenhouse_env import ACTIONS, LED_MAX_PAR, GreenhouseVecEnv
+from safety_ltl import SafetyLTLMonitor, check_batch
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [AGENT-SVC] %(message)s')
+logger = logging.getLogger("AgentService")
+
+DEFAULT_SCHEDULE_TOPIC = "gos/led/schedule"
+
+
+class AgentService:
+    """Batched per-sector LED decisions from live telemetry."""
+
+    def __init__(self, agent: TranspirationRLAgent, mqtt_broker="localhost", mqtt_port=1883,
+                 source="mqtt", db_url=None, schedule_topic=DEFAULT_SCHEDULE_TOPIC,
+                 batch_window_s=0.05, min_interval_s=60.0, stale_after_s=600.0,
+                 poll_interval_s=15.0, stats_interval_s=60.0, sector_refresh_s=60.0):
+        if source not in ("mqtt", "db"):
+            raise ValueError(f"Unknown input source '{source}' (use 'mqtt' or 'db')")
+        self.agent = agent
+        self.source = source
+        self.db_url = db_url
+        self.mqtt_broker = mqtt_broker
+        self.mqtt_port = mqtt_port
+        self.schedule_topic = schedule_topic
+        # Readings arriving within this window share one inference call
+        self.batch_window_s = batch_window_s
+        # Minimum time between setpoint changes of one sector
+        self.min_interval_s = min_interval_s
+        self.stale_after_s = stale_after_s
+        self.poll_interval_s = poll_interval_s
+        self.stats_interval_s = stats_interval_s
+        self.sector_refresh_s = sector_refresh_s
+
+        # node_id -> (vpd, par, temp, received_monotonic)
+        self.readings = {}
+        self.node_sector = {}
+        # sector -> newest unprocessed receipt time
+        self.pending = {}
+        self.last_decision = {}
+        self.setpoints = {}
+        self.monitors = {}
+
+        self.latencies_ms = np.zeros(4096)
+        self.decisions = 0
+        self.vetoes = 0
+        self.new_data = None
+        self.loop = None
+
+        self.client = mqtt.Client(client_id="gos_rl_agent", protocol=mqtt.MQTTv5)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+
+    # =========================================
+    # INGESTION
+    # =========================================
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        logger.info(f"Connected to MQTT broker: {self.mqtt_broker}:{self.mqtt_port}")
+        client.subscribe("gos/commission/#")
+        if self.schedule_topic != DEFAULT_SCHEDULE_TOPIC:
+            # Proposing through the safety proxy: learn which setpoints were applied
+            client.subscribe(DEFAULT_SCHEDULE_TOPIC, qos=1)
+        if self.source == "mqtt":
+            client.subscribe("gos/telemetry/#")
+
+    def on_message(self, client, userdata, msg):
+        """paho network thread: hand the message to the event loop."""
+        received = time.monotonic()
+        try:
+            payload = json.loads(msg.payload.decode('utf-8'))
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON payload: {e}")
+            return
+        node_id = msg.topic.split('/')[-1]
+        if msg.topic == DEFAULT_SCHEDULE_TOPIC:
+            self.loop.call_soon_threadsafe(self.apply_approved, payload)
+        elif msg.topic.startswith("gos/commission/"):
+            self.loop.call_soon_threadsafe(self.node_sector.__setitem__, node_id,
+                                           payload.get('sector', 'UNASSIGNED'))
+        else:
+            self.loop.call_soon_threadsafe(self.ingest, node_id, payload, received)
+
+    def ingest(self, node_id, payload, received, sector=None):
+        """Stores a node's latest reading (event loop thread)."""
+        temp = payload.get('temp_c', payload.get('temp'))
+        hum = payload.get('humidity_pct', payload.get('humidity'))
+        par = payload.get('par_umol', payload.get('par'))
+        if temp is None or hum is None or par is None:
+            return
+        temp, hum = float(temp), float(hum)
+        esat = 0.611 * np.exp(17.27 * temp / (temp + 237.3))
+        self.readings[node_id] = (esat * (1 - hum / 100.0), float(par), temp, received)
+        if sector:
+            self.node_sector[node_id] = sector
+
+        sector = self.node_sector.get(node_id, 'UNASSIGNED')
+        self.pending[sector] = max(self.pending.get(sector, 0.0), received)
+        self.new_data.set()
+
+    def _fetch_node_latest(self):
+        conn = psycopg2.connect(self.db_url)
+        with conn.cursor() as cur:
+            cur.execute("SELECT node_id, sector, temp_c, humidity_pct, par_umol FROM node_latest")
+            rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    def _fetch_node_sectors(self):
+        conn = psycopg2.connect(self.db_url)
+        with conn.cursor() as cur:
+            cur.execute("SELECT node_id, sector FROM nodes")
+            rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    async def refresh_node_sectors(self):
+        """mqtt mode: keeps node -> sector in sync with the nodes table."""
+        while True:
+            try:
+                rows = await self.loop.run_in_executor(None, self._fetch_node_sectors)
+                self.node_sector.update(rows)
+            except Exception as e:
+                logger.error(f"nodes refresh error: {e}")
+            await asyncio.sleep(self.sector_refresh_s)
+
+    async def poll_node_latest(self):
+        """db mode: periodically ingests the node_latest view."""
+        seen = {}
+        while True:
+            try:
+                rows = await self.loop.run_in_executor(None, self._fetch_node_latest)
+                received = time.monotonic()
+                for node_id, sector, temp, hum, par in rows:
+                    key = (temp, hum, par)
+                    if seen.get(node_id) != key:
+                        seen[node_id] = key
+                        self.ingest(node_id, {'temp_c': temp, 'humidity_pct': hum, 'par_umol': par},
+                                    received, sector=sector)
+            except Exception as e:
+                logger.error(f"node_latest poll error: {e}")
+            await asyncio.sleep(self.poll_interval_s)
+
+    def apply_setpoint(self, sector, setpoint):
+        """Commits an applied setpoint to the sector's monitor and state."""
+        self.monitors.setdefault(sector, SafetyLTLMonitor()).log_state(setpoint)
+        self.setpoints[sector] = setpoint
+
+    def apply_approved(self, payload):
+        """Setpoint approved by the safety proxy (any proposer), event loop thread."""
+        try:
+            setpoint = {'blue_ratio': float(payload['blue_ratio']), 'intensity': int(payload.get('intensity', 100))}
+        except (KeyError, TypeError, ValueError):
+            return
+        sector = str(payload.get('sector', 'ALL'))
+        for s in (list(self.monitors) if sector == 'ALL' else [sector]):
+            self.apply_setpoint(s, setpoint)
+
+    # =========================================
+    # DECISIONS
+    # =========================================
+
+    def decide(self) -> list:
+        """One batched inference over every sector that is due; returns published decisions."""
+        now = time.monotonic()
+        due = [s for s in self.pending
+               if now - self.last_decision.get(s, -np.inf) >= self.min_interval_s]
+        if not due:
+            return []
+
+        # Per-sector means of fresh readings
+        fresh = [(self.node_sector.get(n, 'UNASSIGNED'), v, p, temp)
+                 for n, (v, p, temp, t) in self.readings.items() if now - t <= self.stale_after_s]
+        fresh = [r for r in fresh if r[0] in due]
+        # Due sectors without fresh readings have nothing to decide on
+        for s in set(due) - {r[0] for r in fresh}:
+            self.pending.pop(s, None)
+        if not fresh:
+            return []
+        sectors, inverse = np.unique([r[0] for r in fresh], return_inverse=True)
+        counts = np.bincount(inverse)
+        vpd = np.bincount(inverse, weights=[r[1] for r in fresh]) / counts
+        par = np.bincount(inverse, weights=[r[2] for r in fresh]) / counts
+        temp = np.bincount(inverse, weights=[r[3] for r in fresh]) / counts
+        current = [self.setpoints.get(s, {'blue_ratio': 0.2, 'intensity': 0}) for s in sectors]
+        blue = np.array([c['blue_ratio'] for c in current])
+        intensity_now = np.array([c['intensity'] for c in current], dtype=float)
+
+        # Safety screen of every action for every sector in one call
+        monitors = [self.monitors.setdefault(s, SafetyLTLMonitor()) for s in sectors]
+        rows = np.repeat(np.arange(len(sectors)), len(ACTIONS))
+        candidates = {
+            'blue_ratio': np.tile(ACTIONS[:, 0], len(sectors)),
+            'par_increase': (np.tile(ACTIONS[:, 1], len(sectors)) - intensity_now[rows]) / 100.0 * LED_MAX_PAR
+        }
+        # Live par and temp: laws without data count as violated
+        safe, codes = check_batch(monitors, candidates, rows, {'par': par, 'temp': temp})
+        allowed = safe.reshape(len(sectors), len(ACTIONS))
+
+        actions = self.agent.act_batch(self.agent.encode_states(vpd, par, blue), allowed=allowed)
+
+        published = []
+        for i, sector in enumerate(sectors):
+            blue_ratio, intensity = (float(x) for x in ACTIONS[actions[i]])
+            monitor = monitors[i]
+            received = self.pending.pop(sector)
+            self.last_decision[sector] = now
+
+            if not allowed[i].any():
+                self.vetoes += 1
+                code = np.bitwise_or.reduce(codes[rows == i])
+                logger.error(f"LTL VETO {sector}: no safe LED action ({', '.join(monitor.violations(code))})")
+                continue
+
+            setpoint = {'blue_ratio': blue_ratio, 'intensity': int(intensity)}
+            payload = {
+                'blue_ratio': blue_ratio,
+                'red_ratio': round(1.0 - blue_ratio, 2),
+                'intensity': int(intensity),
+                'sector': str(sector),
+                'source': 'rl_agent',
+                'decided_at': datetime.now().isoformat()
+            }
+            self.client.publish(self.schedule_topic, json.dumps(payload), qos=1)
+            if self.schedule_topic == DEFAULT_SCHEDULE_TOPIC:
+                # No proxy in the path: the setpoint is applied as published
+                self.apply_setpoint(sector, setpoint)
+
+            self.latencies_ms[self.decisions % len(self.latencies_ms)] = (time.monotonic() - received) * 1000
+            self.decisions += 1
+            published.append(payload)
+        return published
+
+    async def decision_loop(self):
+        while True:
+            await self.new_data.wait()
+            # Coalesce readings that arrive together into one batch
+            await asyncio.sleep(self.batch_window_s)
+            self.new_data.clear()
+            try:
+                self.decide()
+            except Exception as e:
+                logger.error(f"Decision error: {e}")
+
+    def stats(self) -> dict:
+        window = self.latencies_ms[:min(self.decisions, len(self.latencies_ms))]
+        return {
+            'decisions': self.decisions,
+            'vetoes': self.vetoes,
+            'p50_ms': round(float(np.percentile(window, 50)), 3) if len(window) else None,
+            'p99_ms': round(float(np.percentile(window, 99)), 3) if len(window) else None
+        }
+
+    async def stats_loop(self):
+        last_decisions, last_time = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(self.stats_interval_s)
+            now = time.monotonic()
+            stats = self.stats()
+            rate = (stats['decisions'] - last_decisions) / (now - last_time)
+            last_decisions, last_time = stats['decisions'], now
+            logger.info(f"Decisions {stats['decisions']} ({rate:.2f}/s) | vetoes {stats['vetoes']} | "
+                        f"latency p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+
+    async def run(self):
+        logger.info("=== G.O.S. RL AGENT SERVICE STARTING ===")
+        self.loop = asyncio.get_running_loop()
+        self.new_data = asyncio.Event()
+
+        self.client.connect(self.mqtt_broker, self.mqtt_port, 60)
+        self.client.loop_start()
+        tasks = [self.decision_loop(), self.stats_loop()]
+        if self.source == "db":
+            tasks.append(self.poll_node_latest())
+        elif self.db_url:
+            tasks.append(self.refresh_node_sectors())
+        else:
+            logger.warning("DATABASE_URL not set: sectors only from gos/commission/#")
+        logger.info(f"Input: {self.source} | publishing to {self.schedule_topic}")
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.client.loop_stop()
+
+
+def load_agent(checkpoint) -> TranspirationRLAgent:
+    """Loads the trained agent, training a fresh policy in simulation if none exists."""
+    agent = TranspirationRLAgent()
+    if not agent.load(checkpoint):
+        logger.info("No checkpoint found; training in GreenhouseVecEnv")
+        agent.train_online(GreenhouseVecEnv(num_envs=1024), iterations=2000)
+        agent.save(checkpoint)
+    return agent
+
+
+if __name__ == "__main__":
+    source = os.getenv("AGENT_INPUT", "mqtt")
+    db_url = os.getenv("DATABASE_URL")
+    if source == "db" and not db_url:
+        logger.error("DATABASE_URL not set!")
+        exit(1)
+
+    service = AgentService(
+        load_agent(os.getenv("AGENT_CHECKPOINT", DEFAULT_CHECKPOINT)),
+        mqtt_broker=os.getenv("MQTT_BROKER", "localhost"),
+        mqtt_port=int(os.getenv("MQTT_PORT", 1883)),
+        source=source,
+        db_url=db_url,
+        schedule_topic=os.getenv("LED_SCHEDULE_TOPIC", DEFAULT_SCHEDULE_TOPIC)
+    )
+    asyncio.run(service.run())
@@ -0,0 +1,76 @@
+"""
+G.O.S. FvCB Photosynthesis Benchmark
+====================================
+Throughput benchmark for the vectorized Farquhar-von Caemmerer-Berry
+model in StrawberryPhysiologySim: canopy assimilation for N nodes x
+1-minute steps over a year, evaluated in day blocks so memory stays
+bounded.
+
+The reference checks against published values (Bernacchi 2001 kinetics,
+FvCB A/Ci closed forms) live in test_fvcb.py.
+
+Usage:
+    python bench_fvcb.py
+    python bench_fvcb.py --nodes 40 --days 365 --block-days 7
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from plant_sim_c3 import StrawberryPhysiologySim
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [FVCB-BENCH] %(message)s')
+logger = logging.getLogger("FvCBBenchmark")
+
+
+# =========================================
+# THROUGHPUT BENCHMARK
+# =========================================
+
+def run_benchmark(sim, nodes=40, days=365, block_days=7, seed=490) -> dict:
+    """Canopy assimilation for nodes x 1-minute steps, evaluated in day blocks."""
+    rng = np.random.default_rng(seed)
+    steps = days * 1440
+    node_offset = rng.normal(0, 0.5, (nodes, 1))
+    total_mol = np.zeros(nodes)
+
+    logger.info(f"Simulating {nodes} nodes x {steps:,} minutes ({nodes * steps:,} steps)")
+    start = time.perf_counter()
+    for day0 in range(0, days, block_days):
+        minutes = np.arange(day0 * 1440, min(day0 + block_days, days) * 1440)
+        hour = (minutes % 1440) / 60.0
+        par = np.maximum(0, 800 * np.sin((hour - 6) * np.pi / 14)) * ((hour >= 6) & (hour <= 20))
+        tleaf = 22 + 4 * np.sin((hour - 9) * np.pi / 12) + node_offset
+        an = sim.canopy_photosynthesis_array(par, tleaf, 400.0)
+        total_mol += an.sum(axis=1) * 60 / 1e6
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        'nodes': nodes,
+        'steps': steps,
+        'seconds': round(elapsed, 3),
+        'steps_per_s': round(nodes * steps / elapsed) if elapsed > 0 else None,
+        'mean_annual_mol_co2_m2': round(float(total_mol.mean()), 1)
+    }
+    logger.info(f"Done in {elapsed:.2f}s ({stats['steps_per_s']:,} node-steps/s), "
+                f"mean {stats['mean_annual_mol_co2_m2']} mol CO2/m²")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FvCB canopy throughput benchmark")
+    parser.add_argument("--nodes", type=int, default=40)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--block-days", type=int, default=7)
+    args = parser.parse_args()
+
+    sim = StrawberryPhysiologySim()
+    print(json.dumps({'benchmark': run_benchmark(sim, args.nodes, args.days, args.block_days)}))
+
+
+if __name__ == "__main__":
+    main()
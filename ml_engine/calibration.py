@@ -0,0 +1,413 @@
+"""
+G.O.S. Physiological Parameter Calibration
+==========================================
+Fits Vcmax25, Jmax25 and boundary_layer_cond of StrawberryPhysiologySim
+per node (or per sector) against observed telemetry and yield.
+
+Observations (curated dataset columns):
+- Drivers: temp_c, humidity_pct, par_umol, optional co2_ppm / blue_ratio
+- Targets: assimilation_umol (leaf gas exchange) and/or
+  transpiration_g_m2_h (lysimeter / sap flow); missing values are skipped
+- Yield (optional): harvested fresh weight per group over the window,
+  compared with integrated canopy carbon (one residual per group)
+
+All groups are fitted together with a batched Levenberg-Marquardt
+(damped Gauss-Newton) solver: one vectorized forward pass per parameter
+gives the finite-difference Jacobian for every group, per-group 3x3
+normal equations are accumulated with bincount and solved in one batched
+np.linalg.solve.
+
+Fits are cached in a JSON file keyed by data window and per-group data
+fingerprint: unchanged groups are served from the cache, changed groups
+are refitted starting from their most recent fit. Groups with no previous
+fit are seeded from a Vcmax25 x Jmax25 grid search on a row subsample.
+
+Usage:
+    python calibration.py /app/data/curated_research_dataset.csv --yield yield_by_node.csv
+    python calibration.py --demo
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from plant_sim_c3 import StrawberryPhysiologySim
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [CALIBRATION] %(message)s')
+logger = logging.getLogger("ParameterCalibrator")
+
+PARAMS = ('vcmax25', 'jmax25', 'boundary_layer_cond')
+BOUNDS = {
+    'vcmax25': (10.0, 250.0),
+    'jmax25': (20.0, 400.0),
+    'boundary_layer_cond': (0.05, 5.0)
+}
+# Fresh fruit per mol net canopy CO2 per m² bench:
+# 22.5 g dry matter/mol x harvest index 0.6 / fruit dry matter fraction 0.09
+FRUIT_G_PER_MOL = 150.0
+DEFAULT_CACHE = "/app/data/calibration_cache.json"
+
+
+class ParameterCalibrator:
+    """Batched per-group calibration with a fingerprinted fit cache."""
+
+    def __init__(self, cache_path=DEFAULT_CACHE, group_col='node_id', time_col='timestamp',
+                 max_iter=30, yield_weight=1.0, max_gap_s=900.0, sim=None):
+        self.sim = sim or StrawberryPhysiologySim()
+        self.cache_path = cache_path
+        self.group_col = group_col
+        self.time_col = time_col
+        self.max_iter = max_iter
+        self.yield_weight = yield_weight
+        self.max_gap_s = max_gap_s
+        self.lower = np.array([BOUNDS[p][0] for p in PARAMS])
+        self.upper = np.array([BOUNDS[p][1] for p in PARAMS])
+
+    @property
+    def defaults(self) -> np.ndarray:
+        return np.array([self.sim.Vcmax25, self.sim.Jmax25, self.sim.boundary_layer_cond])
+
+    # =========================================
+    # CACHE
+    # =========================================
+
+    def _load_cache(self) -> dict:
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path) as f:
+                return json.load(f)
+        return {'windows': {}, 'latest': {}}
+
+    def _save_cache(self, cache: dict):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    def _fingerprints(self, df, yields) -> dict:
+        """Content hash of each group's observations (and yield total)."""
+        hashes = pd.util.hash_pandas_object(df.drop(columns=self.group_col), index=False)
+        fingerprints = {}
+        for group, idx in df.groupby(self.group_col, sort=False).indices.items():
+            digest = hashlib.sha1(hashes.to_numpy()[idx].tobytes())
+            if yields is not None and group in yields.index:
+                digest.update(repr(float(yields[group])).encode())
+            fingerprints[str(group)] = digest.hexdigest()
+        return fingerprints
+
+    # =========================================
+    # MODEL
+    # =========================================
+
+    def _prepare(self, df: pd.DataFrame, groups: list, yields) -> dict:
+        """Column arrays for the groups being fitted."""
+        df = df[df[self.group_col].astype(str).isin(groups)]
+        index = {g: i for i, g in enumerate(groups)}
+        gidx = df[self.group_col].astype(str).map(index).to_numpy()
+
+        next_time = df.groupby(self.group_col, sort=False)[self.time_col].shift(-1)
+        dt = (next_time - df[self.time_col]).dt.total_seconds().to_numpy()
+        dt = np.where((dt > 0) & (dt <= self.max_gap_s), dt, 0.0)
+
+        def column(name, default):
+            if name in df.columns:
+                return df[name].fillna(default).to_numpy(dtype=float)
+            return np.full(len(df), default)
+
+        data = {
+            'group': gidx,
+            'n_groups': len(groups),
+            'temp': df['temp_c'].to_numpy(dtype=float),
+            'hum': df['humidity_pct'].to_numpy(dtype=float),
+            'par': df['par_umol'].to_numpy(dtype=float),
+            'co2': column('co2_ppm', 400.0),
+            'blue': column('blue_ratio', 0.3),
+            'dt': dt,
+            'targets': []
+        }
+
+        # Residual blocks, each normalised by the spread of its observations
+        for name in ('assimilation_umol', 'transpiration_g_m2_h'):
+            if name in df.columns:
+                obs = df[name].to_numpy(dtype=float)
+                mask = ~np.isnan(obs)
+                if mask.any():
+                    scale = max(float(np.std(obs[mask])), 1e-6)
+                    data['targets'].append((name, mask, obs, scale))
+
+        if yields is not None:
+            observed = np.array([yields.get(g, np.nan) for g in groups], dtype=float)
+            mask = ~np.isnan(observed)
+            if mask.any():
+                scale = max(float(np.std(observed[mask])), float(np.mean(observed[mask])) * 0.1, 1e-6)
+                data['yield'] = (mask, observed[mask], scale)
+        return data
+
+    def _residuals(self, theta: np.ndarray, data: dict):
+        """Stacked weighted residuals and their group index."""
+        per_row = theta[data['group']]
+        vcmax25, jmax25, gb = per_row[:, 0], per_row[:, 1], per_row[:, 2]
+        residuals, owners = [], []
+
+        for name, mask, obs, scale in data['targets']:
+            if name == 'assimilation_umol':
+                pred = self.sim.photosynthesis_array(
+                    data['par'][mask], data['temp'][mask], data['co2'][mask],
+                    vcmax25=vcmax25[mask], jmax25=jmax25[mask])
+            else:
+                pred = self.sim.transpiration_array(
+                    data['par'][mask], data['temp'][mask], data['hum'][mask],
+                    data['blue'][mask], gb=gb[mask])['transpiration_rate']
+            residuals.append((pred - obs[mask]) / scale)
+            owners.append(data['group'][mask])
+
+        if 'yield' in data:
+            mask, obs, scale = data['yield']
+            canopy = self.sim.canopy_photosynthesis_array(
+                data['par'], data['temp'], data['co2'], vcmax25=vcmax25, jmax25=jmax25)
+            carbon = np.bincount(data['group'], weights=canopy * data['dt'] / 1e6,
+                                 minlength=data['n_groups'])
+            pred = carbon * FRUIT_G_PER_MOL
+            residuals.append(self.yield_weight * (pred[mask] - obs) / scale)
+            owners.append(np.flatnonzero(mask))
+
+        return np.concatenate(residuals), np.concatenate(owners)
+
+    def _group_sse(self, r, owners, n_groups) -> np.ndarray:
+        return np.bincount(owners, weights=r * r, minlength=n_groups)
+
+    # =========================================
+    # BATCHED LEVENBERG-MARQUARDT
+    # =========================================
+
+    def _subsample(self, data: dict, rows_per_group=1000) -> dict:
+        """Every k-th row (dt scaled by k so carbon integrals still hold)."""
+        k = max(1, len(data['group']) // (data['n_groups'] * rows_per_group))
+        sel = np.arange(0, len(data['group']), k)
+        sub = {name: data[name][sel] for name in ('group', 'temp', 'hum', 'par', 'co2', 'blue')}
+        sub['dt'] = data['dt'][sel] * k
+        sub['n_groups'] = data['n_groups']
+        sub['targets'] = [(name, mask[sel], obs[sel], scale)
+                          for name, mask, obs, scale in data['targets']]
+        if 'yield' in data:
+            sub['yield'] = data['yield']
+        return sub
+
+    def _grid_start(self, theta: np.ndarray, data: dict, points=12) -> np.ndarray:
+        """
+        Vcmax25 x Jmax25 grid search (on a row subsample) for cold-started
+        groups. min(Wc, Wj) has no Vcmax gradient where RuBP regeneration
+        limits everywhere, so a local solver started there cannot move Vcmax.
+        """
+        data = self._subsample(data)
+        best, best_sse = theta.copy(), np.full(len(theta), np.inf)
+        for vcmax in np.geomspace(*BOUNDS['vcmax25'], points):
+            for jmax in np.geomspace(*BOUNDS['jmax25'], points):
+                trial = theta.copy()
+                trial[:, 0], trial[:, 1] = vcmax, jmax
+                r, owners = self._residuals(trial, data)
+                sse = self._group_sse(r, owners, len(theta))
+                better = sse < best_sse
+                best[better], best_sse[better] = trial[better], sse[better]
+        return best
+
+    def _solve(self, theta: np.ndarray, data: dict) -> dict:
+        n_groups, n_params = theta.shape
+        lam = np.full(n_groups, 1e-3)
+        active = np.ones(n_groups, dtype=bool)
+        r, owners = self._residuals(theta, data)
+        sse = self._group_sse(r, owners, n_groups)
+        iterations = 0
+
+        for iterations in range(1, self.max_iter + 1):
+            # Finite-difference Jacobian: one forward pass per parameter, all groups at once
+            step = 1e-4 * np.maximum(np.abs(theta), 1e-3)
+            jac = np.empty((len(r), n_params))
+            for k in range(n_params):
+                shifted = theta.copy()
+                shifted[:, k] += step[:, k]
+                jac[:, k] = (self._residuals(shifted, data)[0] - r) / step[owners, k]
+
+            # Per-group normal equations (JᵀJ, Jᵀr)
+            jtj = np.empty((n_groups, n_params, n_params))
+            for a in range(n_params):
+                for b in range(a, n_params):
+                    jtj[:, a, b] = jtj[:, b, a] = np.bincount(
+                        owners, weights=jac[:, a] * jac[:, b], minlength=n_groups)
+            jtr = np.stack([np.bincount(owners, weights=jac[:, k] * r, minlength=n_groups)
+                            for k in range(n_params)], axis=1)
+
+            diag = np.einsum('gii->gi', jtj)
+            damped = jtj + (lam[:, None] * np.maximum(diag, 1e-9))[:, :, None] * np.eye(n_params)
+            delta = np.linalg.solve(damped, -jtr[:, :, None])[:, :, 0]
+            delta[~active] = 0.0
+
+            candidate = np.clip(theta + delta, self.lower, self.upper)
+            r_new, owners_new = self._residuals(candidate, data)
+            sse_new = self._group_sse(r_new, owners_new, n_groups)
+
+            improved = active & (sse_new < sse)
+            rel_gain = (sse - sse_new) / np.maximum(sse, 1e-12)
+            rel_step = np.max(np.abs(candidate - theta) / np.maximum(np.abs(theta), 1e-9), axis=1)
+            converged = improved & ((rel_gain < 1e-6) | (rel_step < 1e-5))
+
+            theta = np.where(improved[:, None], candidate, theta)
+            lam = np.where(improved, lam / 3.0, np.minimum(lam * 4.0, 1e8))
+            active &= ~converged & (lam < 1e8)
+            sse = np.where(improved, sse_new, sse)
+
+            r, owners = self._residuals(theta, data)
+            if not active.any():
+                break
+
+        counts = np.bincount(owners, minlength=n_groups)
+        rmse = np.sqrt(sse / np.maximum(counts, 1))
+        return {'theta': theta, 'rmse': rmse, 'n': counts, 'iterations': iterations}
+
+    # =========================================
+    # PUBLIC API
+    # =========================================
+
+    def calibrate(self, df: pd.DataFrame, yields=None, force=False) -> pd.DataFrame:
+        """
+        Fits every group in df (cached groups are reused unless force).
+
+        yields: optional Series (or dict) of harvested fresh weight in
+        grams per group over the same window.
+        """
+        start = time.perf_counter()
+        df = df.copy()
+        df[self.time_col] = pd.to_datetime(df[self.time_col])
+        df[self.group_col] = df[self.group_col].astype(str)
+        df = df.sort_values([self.group_col, self.time_col], kind='stable').reset_index(drop=True)
+        if yields is not None:
+            yields = pd.Series(yields, dtype=float)
+            yields.index = yields.index.astype(str)
+
+        window = f"{df[self.time_col].min().isoformat()}/{df[self.time_col].max().isoformat()}"
+        fingerprints = self._fingerprints(df, yields)
+        cache = self._load_cache()
+        cached = cache['windows'].get(window, {})
+
+        groups = list(fingerprints)
+        stale = [g for g in groups
+                 if force or cached.get(g, {}).get('fingerprint') != fingerprints[g]]
+
+        results = {g: dict(cached[g], status='cached') for g in groups if g not in stale}
+
+        if stale:
+            # Warm start from the latest fit of each group (any window)
+            warm = np.array([g in cache['latest'] for g in stale])
+            theta0 = np.array([
+                [cache['latest'][g][p] for p in PARAMS] if g in cache['latest'] else self.defaults
+                for g in stale
+            ], dtype=float)
+            data = self._prepare(df, stale, yields)
+            if not data['targets'] and 'yield' not in data:
+                raise ValueError("No calibration targets (assimilation_umol, transpiration_g_m2_h or yield)")
+            if not warm.all():
+                theta0 = np.where(warm[:, None], theta0, self._grid_start(theta0, data))
+            fit = self._solve(theta0, data)
+
+            for i, g in enumerate(stale):
+                entry = {p: round(float(fit['theta'][i, k]), 4) for k, p in enumerate(PARAMS)}
+                entry.update({
+                    'fingerprint': fingerprints[g],
+                    'rmse': round(float(fit['rmse'][i]), 4),
+                    'n': int(fit['n'][i]),
+                    'iterations': fit['iterations']
+                })
+                cached[g] = entry
+                cache['latest'][g] = entry
+                results[g] = dict(entry, status='fitted')
+
+            cache['windows'][window] = cached
+            self._save_cache(cache)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Calibrated {len(groups)} groups ({len(stale)} fitted, "
+                    f"{len(groups) - len(stale)} cached) in {elapsed:.2f}s")
+
+        table = pd.DataFrame.from_dict(results, orient='index')
+        table.index.name = self.group_col
+        return table.reset_index()[[self.group_col, *PARAMS, 'rmse', 'n', 'iterations', 'status']]
+
+
+def synthetic_observations(node_count=40, days=7, seed=490):
+    """Telemetry with known per-node parameters (for --demo)."""
+    sim = StrawberryPhysiologySim()
+    rng = np.random.default_rng(seed)
+    truth = pd.DataFrame({
+        'node_id': [f"PH-NODE-{i:02d}" for i in range(1, node_count + 1)],
+        'vcmax25': rng.uniform(50, 110, node_count),
+        'jmax25': rng.uniform(90, 200, node_count),
+        'boundary_layer_cond': rng.uniform(0.2, 1.5, node_count)
+    })
+
+    times = pd.date_range("2026-03-01", periods=days * 1440, freq="min")
+    hour = (times.hour + times.minute / 60.0).to_numpy()
+    steps = len(times)
+    phase = np.tile(np.sin((hour - 9) * np.pi / 12), node_count)
+    daylight = np.tile((hour >= 6) & (hour <= 20), node_count)
+    par = np.where(daylight, 800 * np.sin((np.tile(hour, node_count) - 6) * np.pi / 14), 0.0)
+    par = np.maximum(0, par * rng.uniform(0.5, 1.1, node_count * steps))
+
+    df = pd.DataFrame({
+        'timestamp': np.tile(times, node_count),
+        'node_id': np.repeat(truth['node_id'].to_numpy(), steps),
+        'temp_c': 22 + 4 * phase + rng.normal(0, 1.0, node_count * steps),
+        'humidity_pct': 60 - 15 * phase + rng.normal(0, 4, node_count * steps),
+        'par_umol': par,
+        # CO2 enrichment swings expose the Rubisco-limited regime
+        'co2_ppm': rng.uniform(250, 1000, node_count * steps)
+    })
+    params = truth.set_index('node_id').loc[df['node_id']]
+    df['assimilation_umol'] = sim.photosynthesis_array(
+        df['par_umol'], df['temp_c'], df['co2_ppm'],
+        vcmax25=params['vcmax25'].to_numpy(), jmax25=params['jmax25'].to_numpy()
+    ) + rng.normal(0, 0.5, len(df))
+    df['transpiration_g_m2_h'] = sim.transpiration_array(
+        df['par_umol'], df['temp_c'], df['humidity_pct'], 0.3,
+        gb=params['boundary_layer_cond'].to_numpy()
+    )['transpiration_rate'] + rng.normal(0, 5, len(df))
+    return df, truth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-node physiological parameter calibration")
+    parser.add_argument("source", nargs="?", help="Curated CSV with drivers and targets")
+    parser.add_argument("--yield", dest="yield_csv", help="CSV of <group>,weight_grams over the window")
+    parser.add_argument("--group", default="node_id", help="node_id or sector")
+    parser.add_argument("--cache", default=DEFAULT_CACHE)
+    parser.add_argument("--force", action="store_true", help="Refit every group")
+    parser.add_argument("--demo", action="store_true", help="Recover known parameters from synthetic data")
+    args = parser.parse_args()
+
+    if args.demo:
+        import tempfile
+        df, truth = synthetic_observations()
+        cache = os.path.join(tempfile.mkdtemp(prefix="gos_calib_"), "cache.json")
+        calibrator = ParameterCalibrator(cache_path=cache)
+        fitted = calibrator.calibrate(df)
+        error = (fitted.set_index('node_id')[list(PARAMS)] / truth.set_index('node_id')[list(PARAMS)] - 1).abs()
+        logger.info("Median relative error: " + ", ".join(f"{p}={error[p].median():.2%}" for p in PARAMS))
+        calibrator.calibrate(df)  # Served from cache
+        # New observations for one node: only that node is refitted (warm start)
+        changed = df['node_id'] == truth['node_id'][0]
+        df.loc[changed, 'assimilation_umol'] += np.random.default_rng(1).normal(0, 0.5, changed.sum())
+        calibrator.calibrate(df)
+    else:
+        df = pd.read_csv(args.source, low_memory=False)
+        yields = None
+        if args.yield_csv:
+            yields = pd.read_csv(args.yield_csv).groupby(args.group)['weight_grams'].sum()
+        calibrator = ParameterCalibrator(cache_path=args.cache, group_col=args.group)
+        print(calibrator.calibrate(df, yields=yields, force=args.force).to_string(index=False))
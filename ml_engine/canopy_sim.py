@@ -0,0 +1,315 @@
+"""
+G.O.S. Accelerated Canopy Simulator
+===================================
+Runs StrawberryPhysiologySim forward in time for every node in lockstep.
+
+Plant state is held as one array per quantity (one slot per node) and is
+advanced a block of whole days at a time: the climate block is a
+(steps x nodes) array, fluxes are evaluated with the vectorized
+canopy FvCB / transpiration kernels and folded into the state with a
+single reduction. There are no per-plant objects and no per-step Python
+loop.
+
+Climate traces:
+- SyntheticClimate: farm_sim diurnal curves + day-to-day weather, node
+  micro-climate offsets and sensor noise (deterministic per day)
+- RecordedClimate: raw_telemetry / met_station_data CSV exports resampled
+  onto the simulation step
+
+State is checkpointed (atomic .npz) every few blocks so long runs resume
+from the last completed day.
+
+Usage:
+    python canopy_sim.py --days 3650 --checkpoint /app/data/canopy_ckpt.npz
+    python canopy_sim.py --telemetry raw_telemetry.csv --met met_station_data.csv
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from plant_sim_c3 import StrawberryPhysiologySim
+
+# basicConfig only when run directly: greenhouse_env and led_planner import this module first
+logger = logging.getLogger("CanopySimulator")
+
+# Dry matter per mol CO2 fixed (30 g CH2O/mol x growth efficiency 0.75)
+DRY_MATTER_G_PER_MOL = 22.5
+
+
+def diurnal_ambient(hour):
+    """
+    Greenhouse diurnal climate (same curves as farm_sim.diurnal_ambient,
+    which lives in the gateway container). Returns (temp_c, humidity_pct,
+    par_umol) for a scalar or array hour-of-day.
+    """
+    hour = np.asarray(hour, dtype=float)
+    phase = np.sin((hour - 9) * np.pi / 12)
+    daylight = (hour >= 6) & (hour <= 20)
+    par = np.where(daylight, 800 * np.sin((hour - 6) * np.pi / 14), 0.0)
+    return 22 + 4 * phase, 60 - 15 * phase, np.maximum(0, par)
+
+
+# =========================================
+# CLIMATE TRACES
+# =========================================
+
+class SyntheticClimate:
+    """
+    Diurnal greenhouse climate for N nodes (same curves as farm_sim).
+
+    Every day is generated from its own seed, so any block of days can be
+    regenerated identically on resume.
+    """
+
+    def __init__(self, node_count=40, days=365, step_s=60, seed=490, start="2026-03-01"):
+        if 86400 % step_s:
+            raise ValueError(f"step_s={step_s} must divide a day")
+        self.node_ids = [f"PH-NODE-{i:02d}" for i in range(1, node_count + 1)]
+        self.days = days
+        self.step_s = step_s
+        self.steps_per_day = 86400 // step_s
+        self.seed = seed
+        self.start = pd.Timestamp(start)
+
+        # Static micro-climate per node (farm_sim anomalies: 12 near vent, 28 near door)
+        rng = np.random.default_rng(seed)
+        self.temp_offset = rng.normal(0, 0.3, node_count)
+        self.hum_offset = rng.normal(0, 1.0, node_count)
+        self.par_scale = rng.uniform(0.9, 1.1, node_count)
+        if node_count >= 12:
+            self.temp_offset[11] += 2.5
+        if node_count >= 28:
+            self.temp_offset[27] -= 1.5
+            self.hum_offset[27] += 5
+
+    def block(self, day0, day1) -> dict:
+        """Climate arrays of shape (steps, nodes) for days [day0, day1)."""
+        n_nodes = len(self.node_ids)
+        hour = np.arange(self.steps_per_day) * self.step_s / 3600.0
+        temp_curve, hum_curve, par_curve = diurnal_ambient(hour)
+        daylight = (hour >= 6) & (hour <= 20)
+
+        temp, hum, par = [], [], []
+        for day in range(day0, day1):
+            rng = np.random.default_rng([self.seed, day])
+            # Day-to-day weather: cloud cover and warm/cool spells
+            cloud = rng.uniform(0.5, 1.1)
+            spell = rng.normal(0, 1.5)
+            shape = (self.steps_per_day, n_nodes)
+            temp.append((temp_curve + spell)[:, None] + self.temp_offset
+                        + rng.normal(0, 0.3, shape))
+            hum.append(hum_curve[:, None] + self.hum_offset + rng.normal(0, 2, shape))
+            par.append(np.maximum(0, (cloud * par_curve)[:, None] * self.par_scale
+                                  + rng.normal(0, 20, shape) * daylight[:, None]))
+
+        co2 = np.tile(np.where(daylight, 400.0, 500.0), day1 - day0)[:, None]
+        return {
+            'temp': np.concatenate(temp),
+            'hum': np.clip(np.concatenate(hum), 5, 100),
+            'par': np.concatenate(par),
+            'co2': co2,
+            'blue_ratio': 0.3
+        }
+
+
+class RecordedClimate:
+    """
+    Climate replayed from database exports.
+
+    telemetry_csv is a raw_telemetry export (time, node_id, temp_c,
+    humidity_pct, par_umol); met_csv an optional met_station_data export
+    supplying co2_ppm. Samples are averaged onto the simulation step,
+    gaps are forward-filled and the trace is trimmed to whole days.
+    """
+
+    def __init__(self, telemetry_csv, met_csv=None, step_s=60, chunksize=500000):
+        if 86400 % step_s:
+            raise ValueError(f"step_s={step_s} must divide a day")
+        self.step_s = step_s
+        self.steps_per_day = 86400 // step_s
+        freq = f"{step_s}s"
+
+        parts = []
+        for chunk in pd.read_csv(telemetry_csv, chunksize=chunksize,
+                                 usecols=['time', 'node_id', 'temp_c', 'humidity_pct', 'par_umol']):
+            chunk['time'] = pd.to_datetime(chunk['time'], utc=True).dt.floor(freq)
+            parts.append(chunk.groupby(['time', 'node_id']).agg(['sum', 'count']))
+        # Step means across chunk boundaries
+        totals = pd.concat(parts).groupby(level=[0, 1]).sum()
+        means = pd.DataFrame({
+            col: totals[(col, 'sum')] / totals[(col, 'count')]
+            for col in ('temp_c', 'humidity_pct', 'par_umol')
+        })
+
+        first = means.index.get_level_values('time').min().floor('D')
+        end = means.index.get_level_values('time').max() + pd.Timedelta(seconds=step_s)
+        # Whole days only (a trailing partial day is dropped)
+        self.days = max((end - first) // pd.Timedelta(days=1), 1)
+        self.start = first
+        grid = pd.date_range(first, periods=self.days * self.steps_per_day, freq=freq)
+
+        wide = means.unstack('node_id').reindex(grid).ffill().bfill()
+        self.node_ids = list(wide['temp_c'].columns)
+        self.arrays = {
+            'temp': wide['temp_c'].to_numpy(dtype=np.float32),
+            'hum': wide['humidity_pct'].to_numpy(dtype=np.float32),
+            'par': np.maximum(0, wide['par_umol'].to_numpy(dtype=np.float32))
+        }
+
+        if met_csv:
+            met = pd.read_csv(met_csv, usecols=['time', 'co2_ppm'])
+            met['time'] = pd.to_datetime(met['time'], utc=True).dt.floor(freq)
+            co2 = met.groupby('time')['co2_ppm'].mean().reindex(grid).ffill().bfill()
+            self.arrays['co2'] = co2.fillna(400.0).to_numpy(dtype=np.float32)[:, None]
+        else:
+            self.arrays['co2'] = np.full((len(grid), 1), 400.0, dtype=np.float32)
+
+        logger.info(f"Loaded {self.days} days x {len(self.node_ids)} nodes from {telemetry_csv}")
+
+    def block(self, day0, day1) -> dict:
+        lo, hi = day0 * self.steps_per_day, day1 * self.steps_per_day
+        block = {name: values[lo:hi] for name, values in self.arrays.items()}
+        block['blue_ratio'] = 0.3
+        return block
+
+
+# =========================================
+# SIMULATOR
+# =========================================
+
+class CanopySimulator:
+    """Advances per-node carbon and water state over a climate trace."""
+
+    def __init__(self, climate, sim=None, checkpoint_path=None):
+        self.climate = climate
+        self.sim = sim or StrawberryPhysiologySim()
+        self.checkpoint_path = checkpoint_path
+        n_nodes = len(climate.node_ids)
+
+        self.day = 0
+        self.carbon_mol_m2 = np.zeros(n_nodes)
+        self.water_kg_m2 = np.zeros(n_nodes)
+        # Daily series (days x nodes), grown block by block
+        self.daily_carbon = np.zeros((0, n_nodes))
+        self.daily_water = np.zeros((0, n_nodes))
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.load_checkpoint()
+
+    # --- Checkpointing ---
+
+    def save_checkpoint(self):
+        tmp = self.checkpoint_path + ".tmp.npz"
+        np.savez(tmp,
+                 day=self.day,
+                 step_s=self.climate.step_s,
+                 node_ids=np.array(self.climate.node_ids),
+                 carbon_mol_m2=self.carbon_mol_m2,
+                 water_kg_m2=self.water_kg_m2,
+                 daily_carbon=self.daily_carbon,
+                 daily_water=self.daily_water)
+        os.replace(tmp, self.checkpoint_path)
+
+    def load_checkpoint(self):
+        with np.load(self.checkpoint_path) as ckpt:
+            if list(ckpt['node_ids']) != list(self.climate.node_ids) or int(ckpt['step_s']) != self.climate.step_s:
+                raise ValueError(f"Checkpoint {self.checkpoint_path} does not match this climate trace")
+            self.day = int(ckpt['day'])
+            self.carbon_mol_m2 = ckpt['carbon_mol_m2']
+            self.water_kg_m2 = ckpt['water_kg_m2']
+            self.daily_carbon = ckpt['daily_carbon']
+            self.daily_water = ckpt['daily_water']
+        logger.info(f"Resumed from {self.checkpoint_path} at day {self.day}")
+
+    # --- Time stepping ---
+
+    def step_block(self, day0, day1):
+        """Advances the state over days [day0, day1) in one vectorized pass."""
+        c = self.climate.block(day0, day1)
+        step_s = self.climate.step_s
+        n_days = day1 - day0
+
+        an = self.sim.canopy_photosynthesis_array(c['par'], c['temp'], c['co2'])
+        transpiration = self.sim.transpiration_array(
+            c['par'], c['temp'], c['hum'], c['blue_ratio'])['transpiration_rate']
+
+        # (steps, nodes) -> per-day totals (days, nodes)
+        carbon = (an * (step_s / 1e6)).reshape(n_days, -1, an.shape[-1]).sum(axis=1)
+        water = (transpiration * (step_s / 3.6e6)).reshape(n_days, -1, an.shape[-1]).sum(axis=1)
+
+        self.carbon_mol_m2 += carbon.sum(axis=0)
+        self.water_kg_m2 += water.sum(axis=0)
+        self.daily_carbon = np.concatenate([self.daily_carbon, carbon])
+        self.daily_water = np.concatenate([self.daily_water, water])
+        self.day = day1
+
+    def run(self, days=None, block_days=7, checkpoint_every=10) -> dict:
+        """Runs to `days` (default: end of the trace), checkpointing every N blocks."""
+        target = min(days or self.climate.days, self.climate.days)
+        start_day = self.day
+        start = time.perf_counter()
+        blocks = 0
+
+        while self.day < target:
+            self.step_block(self.day, min(self.day + block_days, target))
+            blocks += 1
+            if self.checkpoint_path and blocks % checkpoint_every == 0:
+                self.save_checkpoint()
+
+        if self.checkpoint_path:
+            self.save_checkpoint()
+
+        elapsed = time.perf_counter() - start
+        simulated = self.day - start_day
+        stats = {
+            'days': simulated,
+            'nodes': len(self.climate.node_ids),
+            'seconds': round(elapsed, 3),
+            'days_per_minute': round(simulated * 60 / elapsed) if elapsed > 0 else None
+        }
+        logger.info(f"Simulated {simulated} days x {stats['nodes']} nodes in {elapsed:.2f}s "
+                    f"({stats['days_per_minute']} days/min)")
+        return stats
+
+    def summary(self) -> pd.DataFrame:
+        """Per-node totals: carbon, dry matter, water use and season WUE."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wue = np.where(self.water_kg_m2 > 0,
+                           self.carbon_mol_m2 * 1e6 / (self.water_kg_m2 / 0.018015 * 1000), np.nan)
+        return pd.DataFrame({
+            'node_id': self.climate.node_ids,
+            'days': self.day,
+            'carbon_mol_m2': self.carbon_mol_m2.round(2),
+            'dry_matter_g_m2': (self.carbon_mol_m2 * DRY_MATTER_G_PER_MOL).round(1),
+            'water_kg_m2': self.water_kg_m2.round(2),
+            'wue': np.round(wue, 2)
+        })
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [CANOPY-SIM] %(message)s')
+    parser = argparse.ArgumentParser(description="Accelerated-time canopy simulator")
+    parser.add_argument("--days", type=int, default=365, help="Synthetic trace length / days to run")
+    parser.add_argument("--nodes", type=int, default=40)
+    parser.add_argument("--step", type=int, default=60, help="Simulation step (s)")
+    parser.add_argument("--telemetry", help="raw_telemetry CSV export (replay instead of synthetic)")
+    parser.add_argument("--met", help="met_station_data CSV export (CO2)")
+    parser.add_argument("--checkpoint", help="Checkpoint .npz (resumes if present)")
+    parser.add_argument("--block-days", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.telemetry:
+        climate = RecordedClimate(args.telemetry, args.met, step_s=args.step)
+    else:
+        climate = SyntheticClimate(node_count=args.nodes, days=args.days, step_s=args.step)
+
+    simulator = CanopySimulator(climate, checkpoint_path=args.checkpoint)
+    simulator.run(days=args.days if not args.telemetry else None, block_days=args.block_days)
+    summary = simulator.summary()
+    logger.info(f"Mean dry matter {summary['dry_matter_g_m2'].mean():.0f} g/m² | "
+                f"water {summary['water_kg_m2'].mean():.0f} kg/m² | WUE {summary['wue'].mean():.2f}")
@@ -0,0 +1,203 @@
+"""
+G.O.S. Vectorized Greenhouse Environment
+========================================
+Batched training environment for TranspirationRLAgent.
+
+N independent greenhouse benches are stepped together as arrays. Each
+bench follows the farm_sim diurnal climate with its own day-to-day
+weather and micro-climate; the agent picks an LED setting (blue ratio x
+intensity) per bench and StrawberryPhysiologySim returns the plant
+response.
+
+API (gymnasium VectorEnv conventions, no gymnasium dependency):
+    obs, info = env.reset(seed=490)
+    obs, reward, terminated, truncated, info = env.step(actions)
+
+Benches that reach the end of their episode are reset automatically; the
+returned observation is then the first observation of the new episode.
+
+Reward per step:
+    -transpiration_weight * |E - target| / target     (photoperiod only)
+    -energy_weight * LED energy (kWh/m²) * price
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from canopy_sim import diurnal_ambient
+from plant_sim_c3 import StrawberryPhysiologySim
+
+# basicConfig only when run directly: agent_rl, spectral_opt and led_planner import this module first
+logger = logging.getLogger("GreenhouseVecEnv")
+
+# Discrete LED actions: every (blue_ratio, intensity_pct) pair
+BLUE_LEVELS = np.array([0.1, 0.2, 0.3, 0.45, 0.6])
+INTENSITY_LEVELS = np.array([0, 25, 50, 75, 100])
+ACTIONS = np.array([(b, i) for b in BLUE_LEVELS for i in INTENSITY_LEVELS], dtype=float)
+
+LED_MAX_PAR = 400.0         # µmol/m²/s at 100% intensity
+LED_EFFICACY = 2.7          # µmol/J (horticultural LED fixtures)
+PHOTOPERIOD = (6, 20)       # Hours in which transpiration is tracked
+
+
+def led_reward(transpiration, led_par, hour, step_hours=1.0, target_transpiration=150.0,
+               transpiration_weight=1.0, energy_weight=20.0, price_per_kwh=0.15):
+    """
+    Step reward for an LED decision (also used to label recorded data).
+    Returns (reward, energy_kwh).
+    """
+    # LED electrical energy over the step (kWh/m²)
+    energy_kwh = np.asarray(led_par) / LED_EFFICACY * step_hours / 1000.0
+    hour = np.asarray(hour) % 24
+    photoperiod = (hour >= PHOTOPERIOD[0]) & (hour < PHOTOPERIOD[1])
+    tracking = np.abs(transpiration - target_transpiration) / target_transpiration
+    reward = -(transpiration_weight * tracking * photoperiod
+               + energy_weight * energy_kwh * price_per_kwh)
+    return reward, energy_kwh
+
+
+OBS_FIELDS = ('hour_sin', 'hour_cos', 'temp_c', 'humidity_pct', 'ambient_par',
+              'vpd_kpa', 'blue_ratio', 'intensity')
+
+
+class GreenhouseVecEnv:
+    """N parallel greenhouse benches stepped as arrays."""
+
+    def __init__(self, num_envs=1024, step_minutes=60, episode_hours=24,
+                 target_transpiration=150.0, transpiration_weight=1.0,
+                 energy_weight=20.0, price_per_kwh=0.15, seed=490, sim=None):
+        self.num_envs = num_envs
+        self.step_hours = step_minutes / 60.0
+        self.episode_steps = int(round(episode_hours / self.step_hours))
+        self.target_transpiration = target_transpiration
+        self.transpiration_weight = transpiration_weight
+        self.energy_weight = energy_weight
+        self.price_per_kwh = price_per_kwh
+        self.sim = sim or StrawberryPhysiologySim()
+
+        self.n_actions = len(ACTIONS)
+        self.obs_dim = len(OBS_FIELDS)
+        self.rng = np.random.default_rng(seed)
+
+        # Per-bench state
+        self.hour = np.zeros(num_envs)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.cloud = np.ones(num_envs)
+        self.spell = np.zeros(num_envs)
+        self.temp_offset = np.zeros(num_envs)
+        self.blue = np.full(num_envs, 0.2)
+        self.intensity = np.zeros(num_envs)
+        self.climate = {}
+
+    # =========================================
+    # CLIMATE
+    # =========================================
+
+    def _new_episodes(self, mask):
+        """Draws start hour, weather and micro-climate for the masked benches."""
+        n = int(mask.sum())
+        if n == 0:
+            return
+        self.hour[mask] = self.rng.integers(0, 24, n).astype(float)
+        self.steps[mask] = 0
+        self.cloud[mask] = self.rng.uniform(0.5, 1.1, n)
+        self.spell[mask] = self.rng.normal(0, 1.5, n)
+        self.temp_offset[mask] = self.rng.normal(0, 0.5, n)
+        self.blue[mask] = 0.2
+        self.intensity[mask] = 0.0
+
+    def _sample_climate(self):
+        temp, hum, par = diurnal_ambient(self.hour % 24)
+        n = self.num_envs
+        temp = temp + self.spell + self.temp_offset + self.rng.normal(0, 0.3, n)
+        hum = np.clip(hum + self.rng.normal(0, 2, n), 5, 100)
+        par = np.maximum(0, par * self.cloud + self.rng.normal(0, 20, n) * (par > 0))
+        esat = 0.611 * np.exp(17.27 * temp / (temp + 237.3))
+        self.climate = {'temp': temp, 'hum': hum, 'par': par, 'vpd': esat * (1 - hum / 100.0)}
+
+    def _observe(self) -> np.ndarray:
+        angle = 2 * np.pi * (self.hour % 24) / 24.0
+        c = self.climate
+        return np.stack([
+            np.sin(angle),
+            np.cos(angle),
+            (c['temp'] - 22.0) / 5.0,
+            (c['hum'] - 60.0) / 15.0,
+            c['par'] / 800.0,
+            c['vpd'],
+            self.blue,
+            self.intensity / 100.0
+        ], axis=1).astype(np.float32)
+
+    # =========================================
+    # ENV API
+    # =========================================
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._new_episodes(np.ones(self.num_envs, dtype=bool))
+        self._sample_climate()
+        return self._observe(), {}
+
+    def step(self, actions):
+        """Applies one discrete LED action per bench (indices into ACTIONS)."""
+        actions = np.asarray(actions, dtype=np.int64)
+        self.blue = ACTIONS[actions, 0]
+        self.intensity = ACTIONS[actions, 1]
+
+        c = self.climate
+        led_par = self.intensity / 100.0 * LED_MAX_PAR
+        par = c['par'] + led_par
+        response = self.sim.transpiration_array(par, c['temp'], c['hum'], self.blue)
+        transpiration = response['transpiration_rate']
+
+        reward, energy_kwh = led_reward(
+            transpiration, led_par, self.hour, self.step_hours, self.target_transpiration,
+            self.transpiration_weight, self.energy_weight, self.price_per_kwh)
+
+        info = {
+            'transpiration': transpiration,
+            'gs': response['gs'],
+            'energy_kwh': energy_kwh,
+            'par_total': par
+        }
+
+        # Advance time; finished episodes restart immediately
+        self.hour += self.step_hours
+        self.steps += 1
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = self.steps >= self.episode_steps
+        self._new_episodes(truncated)
+        self._sample_climate()
+
+        return self._observe(), reward.astype(np.float32), terminated, truncated, info
+
+    def action_of(self, blue_ratio, intensity_pct) -> np.ndarray:
+        """Nearest discrete action index for (blue_ratio, intensity_pct) arrays."""
+        b = np.abs(BLUE_LEVELS[:, None] - np.atleast_1d(blue_ratio)).argmin(axis=0)
+        i = np.abs(INTENSITY_LEVELS[:, None] - np.atleast_1d(intensity_pct)).argmin(axis=0)
+        return b * len(INTENSITY_LEVELS) + i
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [GH-ENV] %(message)s')
+    env = GreenhouseVecEnv(num_envs=4096)
+    obs, _ = env.reset(seed=490)
+
+    steps = 200
+    start = time.perf_counter()
+    total = np.zeros(env.num_envs)
+    for _ in range(steps):
+        actions = env.rng.integers(0, env.n_actions, env.num_envs)
+        obs, reward, terminated, truncated, info = env.step(actions)
+        total += reward
+    elapsed = time.perf_counter() - start
+
+    env_steps = steps * env.num_envs
+    logger.info(f"{env_steps:,} env steps in {elapsed:.2f}s "
+                f"({env_steps / elapsed / 1000:.0f} env steps/ms, {env.num_envs} envs)")
+    logger.info(f"Random policy mean return per {env.episode_steps}-step episode: "
+                f"{total.mean() * env.episode_steps / steps:.2f}")
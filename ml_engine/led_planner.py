@@ -0,0 +1,321 @@
+"""
+G.O.S. 24-Hour LED Schedule Planner
+===================================
+Energy-aware day-ahead plan of blue/red/intensity per sector.
+
+Inputs:
+- Forecast ambient conditions per hour of day: hourly_met_stats over the
+  last N days (net radiation -> PAR, CO2) and hourly_sector_stats (sector
+  temperature / humidity); hours without history fall back to the
+  farm_sim diurnal curves.
+- A time-of-use electricity price table (24 hourly prices, $/kWh).
+
+Model (built on PhotosynthesisOptimizer.evaluate): for every sector, hour
+and intensity level the blue ratio with the best carbon value minus
+energy cost is picked from a blue grid, in one vectorized call. What is
+left is a choice of intensity per hour.
+
+Dynamic programming over the horizon, all sectors at once:
+    state   accumulated daily light integral (DLI, mol/m², capped at target)
+    action  intensity level (0-100 %), LEDs only inside the lighting window
+    reward  carbon_value * assimilated CO2 - price[h] * LED energy
+    final   -shortfall_penalty * max(0, target DLI - DLI)
+
+The horizon starts at the next lighting-window start, so the DLI state
+begins at 0 with the light day. The plan is written to led_schedule_plan
+(one row per sector and hour), never to led_schedule_history, which only
+records setpoints that were actually applied; previously planned rows of
+those sectors from the plan start on are replaced.
+
+Usage:
+    python led_planner.py                  # plan the next light day from DATABASE_URL
+    python led_planner.py --prices tou.json --dli 18
+    python led_planner.py --demo           # synthetic forecast, no database
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from canopy_sim import diurnal_ambient
+from greenhouse_env import LED_MAX_PAR
+from spectral_opt import BLUE_BOUNDS, CHANNEL_EFFICACY, PhotosynthesisOptimizer
+
+logger = logging.getLogger("LEDPlanner")
+
+# Time-of-use tariff ($/kWh): off-peak night, shoulder day, evening peak
+DEFAULT_TOU_PRICES = [0.08] * 7 + [0.14] * 9 + [0.28] * 5 + [0.14] + [0.08] * 2
+# Net radiation (W/m²) -> PAR (µmol/m²/s); met_station peak 500 W/m² ~ farm_sim peak 800 PAR
+NET_RAD_TO_PAR = 1.6
+PHOTONS_PER_HOUR = 3600e-6    # µmol/m²/s over one hour -> mol/m²
+
+
+def load_prices(path=None) -> np.ndarray:
+    """24 hourly prices from a JSON list or {"hour": price} file (defaults otherwise)."""
+    if not path:
+        return np.array(DEFAULT_TOU_PRICES, dtype=float)
+    with open(path) as f:
+        table = json.load(f)
+    if isinstance(table, dict):
+        prices = np.array(DEFAULT_TOU_PRICES, dtype=float)
+        for hour, price in table.items():
+            prices[int(hour) % 24] = float(price)
+        return prices
+    if len(table) != 24:
+        raise ValueError(f"Price table needs 24 hourly prices, got {len(table)}")
+    return np.array(table, dtype=float)
+
+
+# =========================================
+# FORECAST
+# =========================================
+
+def synthetic_forecast(sectors) -> dict:
+    """Hour-of-day forecast from the farm_sim diurnal curves, arrays of shape (S, 24)."""
+    temp, hum, par = diurnal_ambient(np.arange(24))
+    shape = (len(sectors), 24)
+    return {
+        'par': np.broadcast_to(par, shape).copy(),
+        'temp': np.broadcast_to(temp, shape).copy(),
+        'hum': np.broadcast_to(hum, shape).copy(),
+        'co2': np.full(shape, 400.0)
+    }
+
+
+def forecast_from_db(db_url, sectors=None, days=14):
+    """
+    Hour-of-day ambient forecast from the last `days` of hourly aggregates.
+    Returns (sectors, forecast) with forecast arrays of shape (S, 24).
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(db_url)
+    with conn.cursor() as cur:
+        if sectors is None:
+            cur.execute("SELECT DISTINCT sector FROM nodes WHERE sector IS NOT NULL ORDER BY sector")
+            sectors = [row[0] for row in cur.fetchall()] or ['ALL']
+        cur.execute("""
+            SELECT EXTRACT(HOUR FROM bucket)::int, AVG(avg_net_radiation), AVG(avg_co2)
+            FROM hourly_met_stats
+            WHERE bucket > NOW() - make_interval(days => %s)
+            GROUP BY 1
+        """, (days,))
+        met = cur.fetchall()
+        cur.execute("""
+            SELECT sector, EXTRACT(HOUR FROM bucket)::int, AVG(avg_temp), AVG(avg_humidity)
+            FROM hourly_sector_stats
+            WHERE bucket > NOW() - make_interval(days => %s)
+            GROUP BY 1, 2
+        """, (days,))
+        climate = cur.fetchall()
+    conn.close()
+
+    forecast = synthetic_forecast(sectors)
+    for hour, net_radiation, co2 in met:
+        if net_radiation is not None:
+            forecast['par'][:, hour] = max(0.0, net_radiation) * NET_RAD_TO_PAR
+        if co2 is not None:
+            forecast['co2'][:, hour] = co2
+    index = {s: i for i, s in enumerate(sectors)}
+    for sector, hour, temp, hum in climate:
+        if sector in index and temp is not None and hum is not None:
+            forecast['temp'][index[sector], hour] = temp
+            forecast['hum'][index[sector], hour] = hum
+    logger.info(f"Forecast: {len(met)} met hours, {len(climate)} sector-hours over {days} days")
+    return sectors, forecast
+
+
+# =========================================
+# PLANNER
+# =========================================
+
+class LEDSchedulePlanner:
+    """Day-ahead DP over accumulated DLI for all sectors at once."""
+
+    def __init__(self, optimizer=None, prices=None, dli_target=17.0, carbon_value=0.15,
+                 shortfall_penalty=0.5, lighting_window=(4, 22), intensity_levels=11,
+                 blue_levels=14, dli_step=0.1):
+        self.optimizer = optimizer or PhotosynthesisOptimizer()
+        self.prices = load_prices() if prices is None else np.asarray(prices, dtype=float)
+        # mol/m²/day photons (ambient + LED); scalar or per sector
+        self.dli_target = dli_target
+        # $ per mol of assimilated CO2 and per mol/m² of missed DLI
+        self.carbon_value = carbon_value
+        self.shortfall_penalty = shortfall_penalty
+        self.lighting_window = lighting_window
+        self.intensity = np.linspace(0, 100, intensity_levels)
+        self.blue = np.linspace(*BLUE_BOUNDS, blue_levels)
+        self.dli_step = dli_step
+
+    def _hour_tables(self, hours, forecast):
+        """
+        Best blue ratio, stage reward and DLI increment for every
+        (sector, hour, intensity) from one batched model evaluation.
+        """
+        f = {k: v[:, hours][:, :, None, None] for k, v in forecast.items()}
+        res = self.optimizer.evaluate(self.blue[None, None, None, :], self.intensity[None, None, :, None],
+                                      f['par'], f['temp'], f['hum'], f['co2'])
+        price = self.prices[hours][None, :, None, None]
+        reward = (self.carbon_value * res['assimilation'] * PHOTONS_PER_HOUR
+                  - price * res['led_power_w'] / 1000.0)
+        best = reward.argmax(axis=3)
+        reward = np.take_along_axis(reward, best[..., None], axis=3)[..., 0]
+        energy = np.take_along_axis(np.broadcast_to(res['led_power_w'], reward.shape + (len(self.blue),)),
+                                    best[..., None], axis=3)[..., 0] / 1000.0
+
+        # LEDs off outside the lighting window
+        start, end = self.lighting_window
+        allowed = ((hours >= start) & (hours < end))[None, :, None] | (self.intensity == 0)[None, None, :]
+        reward = np.where(allowed, reward, -np.inf)
+
+        dli_inc = (f['par'][..., 0] + self.intensity[None, None, :] / 100.0 * LED_MAX_PAR) * PHOTONS_PER_HOUR
+        return self.blue[best], reward, energy, dli_inc
+
+    def plan(self, forecast, start_hour=0, horizon=24) -> dict:
+        """
+        Plans `horizon` hourly steps starting at hour-of-day `start_hour`.
+
+        Args:
+            forecast: dict of (S, 24) hour-of-day arrays: par, temp, hum, co2
+
+        Returns:
+            Dict of (S, horizon) arrays: hour, blue_ratio, intensity, dli,
+            energy_kwh, cost, plus per-sector totals.
+        """
+        hours = (start_hour + np.arange(horizon)) % 24
+        n = forecast['par'].shape[0]
+        blue, reward, energy, dli_inc = self._hour_tables(hours, forecast)
+
+        target = np.broadcast_to(np.asarray(self.dli_target, dtype=float), (n,))
+        n_states = int(np.ceil(target.max() / self.dli_step)) + 1
+        levels = np.arange(n_states) * self.dli_step
+        inc_bins = np.rint(dli_inc / self.dli_step).astype(np.int64)
+        cap = np.rint(target / self.dli_step).astype(np.int64)
+        rows = np.arange(n)[:, None, None]
+
+        # Backward pass: value of each DLI state, sectors x states
+        value = -self.shortfall_penalty * np.maximum(0.0, target[:, None] - levels[None, :])
+        policy = np.empty((horizon, n, n_states), dtype=np.int64)
+        for t in range(horizon - 1, -1, -1):
+            nxt = np.minimum(np.arange(n_states)[None, :, None] + inc_bins[:, t, None, :], cap[:, None, None])
+            q = reward[:, t, None, :] + value[rows, nxt]
+            policy[t] = q.argmax(axis=2)
+            value = q.max(axis=2)
+
+        # Forward pass with the exact (unbinned) DLI
+        dli = np.zeros(n)
+        action = np.empty((n, horizon), dtype=np.int64)
+        dli_path = np.empty((n, horizon))
+        for t in range(horizon):
+            state = np.minimum(np.rint(dli / self.dli_step).astype(np.int64), cap)
+            action[:, t] = policy[t, np.arange(n), state]
+            dli = dli + dli_inc[np.arange(n), t, action[:, t]]
+            dli_path[:, t] = dli
+
+        pick = lambda table: np.take_along_axis(table, action[..., None], axis=2)[..., 0]
+        energy_kwh = pick(energy)
+        cost = energy_kwh * self.prices[hours][None, :]
+        return {
+            'hour': hours,
+            'blue_ratio': pick(blue),
+            'intensity': self.intensity[action],
+            'dli': dli_path,
+            'energy_kwh': energy_kwh,
+            'cost': cost,
+            'total_dli': dli,
+            'total_cost': cost.sum(axis=1),
+            'total_energy_kwh': energy_kwh.sum(axis=1)
+        }
+
+    def next_window_start(self, now=None) -> datetime:
+        """Start of the next lighting window (today's if it has not begun yet)."""
+        now = now or datetime.now()
+        start = now.replace(hour=self.lighting_window[0], minute=0, second=0, microsecond=0)
+        return start if start > now else start + timedelta(days=1)
+
+    def write_plan(self, db_url, sectors, plan, start):
+        """Replaces planned rows of the sectors in led_schedule_plan from `start` on."""
+        import psycopg2
+
+        rows = []
+        for i, sector in enumerate(sectors):
+            for t in range(len(plan['hour'])):
+                blue = round(float(plan['blue_ratio'][i, t]), 3)
+                rows.append((start + timedelta(hours=t), blue, round(1.0 - blue, 3),
+                             int(plan['intensity'][i, t]), sector))
+
+        conn = psycopg2.connect(db_url)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM led_schedule_plan WHERE time >= %s AND sector_id = ANY(%s)",
+                        (start, list(sectors)))
+            cur.executemany("""
+                INSERT INTO led_schedule_plan
+                (time, blue_ratio, red_ratio, intensity_pct, sector_id)
+                VALUES (%s, %s, %s, %s, %s)
+            """, rows)
+        conn.commit()
+        conn.close()
+        logger.info(f"Wrote {len(rows)} planned rows from {start.isoformat()}")
+
+
+def uniform_baseline(planner, forecast, start_hour=0, horizon=24):
+    """Cost of reaching the same DLI with equal LED intensity in every window hour."""
+    hours = (start_hour + np.arange(horizon)) % 24
+    start, end = planner.lighting_window
+    lit = (hours >= start) & (hours < end)
+    plan = planner.plan(forecast, start_hour, horizon)
+    missing = np.maximum(0.0, plan['total_dli'] - (forecast['par'][:, hours] * PHOTONS_PER_HOUR).sum(axis=1))
+    led_par = missing / (lit.sum() * PHOTONS_PER_HOUR)
+    blue = np.full(len(missing), 0.2)
+    power = led_par * (blue / CHANNEL_EFFICACY['blue'] + (1 - blue) / CHANNEL_EFFICACY['red']) / 1000.0
+    return (power[:, None] * lit[None, :] * planner.prices[hours][None, :]).sum(axis=1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [LED-PLAN] %(message)s')
+    parser = argparse.ArgumentParser(description="24-hour energy-aware LED schedule planner")
+    parser.add_argument("--prices", default=os.getenv("LED_TOU_PRICES"), help="JSON price table")
+    parser.add_argument("--dli", type=float, default=17.0, help="Target daily light integral (mol/m²)")
+    parser.add_argument("--days", type=int, default=14, help="Forecast history (days)")
+    parser.add_argument("--demo", action="store_true", help="Synthetic forecast, no database")
+    args = parser.parse_args()
+
+    planner = LEDSchedulePlanner(prices=load_prices(args.prices), dli_target=args.dli)
+    # DLI accumulates from 0 at the window start, so plan a whole light day from there
+    start = planner.next_window_start()
+
+    if args.demo:
+        sectors = [f"SECTOR-{chr(65 + i)}" for i in range(8)]
+        forecast = synthetic_forecast(sectors)
+        rng = np.random.default_rng(490)
+        # Per-sector shading and micro-climate
+        forecast['par'] *= rng.uniform(0.4, 1.0, (len(sectors), 1))
+        forecast['temp'] += rng.normal(0, 1.0, (len(sectors), 1))
+        planner.plan(forecast, start.hour)
+        t0 = time.perf_counter()
+        plan = planner.plan(forecast, start.hour)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        baseline = uniform_baseline(planner, forecast, start.hour)
+        for i, sector in enumerate(sectors):
+            lit = plan['hour'][plan['intensity'][i] > 0]
+            logger.info(f"{sector}: DLI {plan['total_dli'][i]:.1f} mol/m², "
+                        f"{plan['total_energy_kwh'][i]:.2f} kWh/m², ${plan['total_cost'][i]:.3f}/m² "
+                        f"(uniform ${baseline[i]:.3f}) | LED hours {sorted(lit.tolist())}")
+        logger.info(f"Planned {len(sectors)} sectors x 24 h in {elapsed_ms:.1f} ms")
+        exit(0)
+
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        logger.error("DATABASE_URL not set!")
+        exit(1)
+    sectors, forecast = forecast_from_db(db_url, days=args.days)
+    t0 = time.perf_counter()
+    plan = planner.plan(forecast, start.hour)
+    logger.info(f"Planned {len(sectors)} sectors in {(time.perf_counter() - t0) * 1000:.1f} ms | "
+                f"total ${plan['total_cost'].sum():.2f}, mean DLI {plan['total_dli'].mean():.1f} mol/m²")
+    planner.write_plan(db_url, sectors, plan, start)
@@ -1,43 +1,554 @@
+"""
+G.O.S. Action Model Acquisition (MACQ)
+======================================
+Learns what research interventions do to the greenhouse from
+research_events and the sector telemetry around them.
+Ref: 'MACQ: A Unified Library for Action Model Acquisition' (Callanan & Muise 2022)
+
+Traces: every research event (FERTILIZER, PEST, EQUIPMENT_FAIL, ...)
+becomes (pre, action, post), where pre/post are the sector means of
+minute_sector_stats over a window before the event and a window after it
+(after a settling lag). The same windows 24 h earlier form a control
+trace, so diurnal drift is not learned as an effect.
+
+Statistics (incremental, O(1) per trace - nothing is re-scanned):
+- numeric effects: Welford mean/variance of post - pre per action type
+  and fluent, for event and control windows; an effect is reported when
+  the Welch t of (event - control) exceeds effect_t
+- predicate effects: per action type and predicate (heat-stress,
+  vpd-stress, ...), counts of false->true (add) and true->false (delete)
+  transitions; kept when they happen in >= effect_support of the traces
+  where they could, and clearly more often than in the control windows
+- preconditions: predicates that held before >= precondition_support of
+  the traces
+
+Storage: traces are appended to a TraceStore (trace_store.py, memory-
+mapped columns). Statistics are checkpointed to a small JSON state; when
+it is missing or behind the store they are relearned from the store in
+vectorized batches (ingest_store), without deserializing traces.
+
+Export: STRIPS actions over the types of ml_engine/domain.pddl
+(location, technician); export_domain() merges them and the learned
+predicates into a copy of the domain.
+
+Usage:
+    python macq_learner.py --demo      # recover known effects from synthetic traces
+    python macq_learner.py             # one incremental update from DATABASE_URL
+    python macq_learner.py --watch     # keep updating, write learned_domain.pddl
+    python macq_learner.py --rebuild   # relearn all statistics from the trace store
+"""
+
+import argparse
 import json
 import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from trace_store import DEFAULT_STORE, TraceStore
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [MACQ] %(message)s')
 logger = logging.getLogger("MACQ_Learner")
 
+DEFAULT_STATE = "/app/data/macq_state.json"
+DEFAULT_DOMAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domain.pddl")
+DEFAULT_OUTPUT = "/app/data/learned_domain.pddl"
+
+FLUENTS = ('temp_c', 'humidity_pct', 'par_umol', 'vpd_kpa')
+# Boolean abstraction of a sector state (thresholds as in the stress
+# counters of minute_sector_stats)
+PREDICATES = {
+    'heat-stress': lambda s: s['temp_c'] > 30,
+    'cold-stress': lambda s: s['temp_c'] < 15,
+    'vpd-stress': lambda s: s['vpd_kpa'] > 1.5,
+    'humid': lambda s: s['humidity_pct'] > 85,
+    'dark': lambda s: s['par_umol'] < 50
+}
+# Carried out by a technician (others are exogenous events)
+TECHNICIAN_EVENTS = ('FERTILIZER', 'YIELD')
+
+
+class _Welford:
+    """Running mean/variance (Welford 1962)."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def update(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    def update_batch(self, values):
+        """Merges a batch of values (Chan et al. 1979), NaNs skipped."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        n_b, mean_b = len(values), float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.n + n_b
+        d = mean_b - self.mean
+        self.mean += d * n_b / n
+        self.m2 += m2_b + d * d * self.n * n_b / n
+        self.n = n
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.inf
+
+
+def vpd_kpa(temp_c, humidity_pct):
+    return 0.6108 * math.exp(17.27 * temp_c / (temp_c + 237.3)) * (1 - humidity_pct / 100.0)
+
+
 class MACQLearner:
     """Action Model Acquisition (MACQ) engine.
     Ref: 'MACQ: A Unified Library for Action Model Acquisition' (Callanan & Muise 2022)
     Automatically learns the effects of actions (e.g. fertilizer) on the plant environment.
     """
-    
-    def __init__(self):
-        self.traces = [] # List of (State, Action, ResultState)
-
-    def ingest_trace(self, prev_state, action, post_state):
-        """Simulates learning from a 'Trace' in the Phytotron."""
-        trace_id = len(self.traces)
-        self.traces.append({
-            "id": trace_id,
-            "pre": prev_state,
-            "action": action,
-            "post": post_state
-        })
-        logger.info(f"TRACE_INGESTED: Learned potential mapping for ACTION={action['type']}")
-        
-        # In a real system, we would perform model acquisition logic here
-        # (e.g. Observed: Action='Fertilizer' -> Pre: EC=1.0 -> Post: EC=1.8)
-        # Learn Effect: (increase EC by 0.8)
-        
+
+    def __init__(self, min_traces=5, effect_t=2.5, effect_support=0.8, precondition_support=0.95,
+                 window_min=30, lag_min=15, keep_traces=1000, store=None):
+        self.min_traces = min_traces
+        self.effect_t = effect_t
+        self.effect_support = effect_support
+        self.precondition_support = precondition_support
+        self.window_min = window_min
+        self.lag_min = lag_min
+
+        # Persistent TraceStore; without one only recent traces are kept
+        # (inspection only, statistics live in self.models)
+        self.store = store
+        self.traces = deque(maxlen=keep_traces) if store is None else None
+        self.trace_count = 0
+        # action type -> sufficient statistics
+        self.models = {}
+        # Time of the newest event ingested from the database
+        self.watermark = None
+
+    # =========================================
+    # INCREMENTAL STATISTICS
+    # =========================================
+
+    def _model(self, action_type):
+        if action_type not in self.models:
+            self.models[action_type] = {
+                'n': 0,
+                'delta': {f: _Welford() for f in FLUENTS},
+                'control': {f: _Welford() for f in FLUENTS},
+                # predicate -> [held before, false before, added, deleted]
+                'predicates': {p: [0, 0, 0, 0] for p in PREDICATES},
+                'control_predicates': {p: [0, 0, 0, 0] for p in PREDICATES}
+            }
+        return self.models[action_type]
+
+    @staticmethod
+    def _complete(state):
+        state = dict(state)
+        if state.get('vpd_kpa') is None and state.get('temp_c') is not None \
+                and state.get('humidity_pct') is not None:
+            state['vpd_kpa'] = vpd_kpa(state['temp_c'], state['humidity_pct'])
+        return state
+
+    @staticmethod
+    def _count_transitions(counts, pre, post):
+        """Predicate transition counts; scalar states or {fluent: array} batches."""
+        if any(pre.get(f) is None or post.get(f) is None for f in FLUENTS):
+            return
+        if np.ndim(pre[FLUENTS[0]]) == 0:
+            for name, holds in PREDICATES.items():
+                before, after = holds(pre), holds(post)
+                c = counts[name]
+                c[0 if before else 1] += 1
+                c[2] += after and not before
+                c[3] += before and not after
+            return
+        valid = np.ones(np.shape(pre[FLUENTS[0]]), dtype=bool)
+        for f in FLUENTS:
+            valid &= ~(np.isnan(np.asarray(pre[f], dtype=float)) | np.isnan(np.asarray(post[f], dtype=float)))
+        for name, holds in PREDICATES.items():
+            before, after = holds(pre) & valid, holds(post) & valid
+            c = counts[name]
+            c[0] += int(np.sum(before))
+            c[1] += int(np.sum(valid & ~before))
+            c[2] += int(np.sum(after & ~before))
+            c[3] += int(np.sum(before & ~after))
+
+    def ingest_trace(self, prev_state, action, post_state, control=None):
+        """
+        Updates the action model of action['type'] with one trace.
+
+        Args:
+            prev_state / post_state: Sector state before / after the action
+                ({fluent: value}, see FLUENTS)
+            action: {'type': event type, ...}
+            control: Optional (pre, post) states of a control window
+        """
+        pre, post = self._complete(prev_state), self._complete(post_state)
+        model = self._model(action['type'])
+        model['n'] += 1
+        for f in FLUENTS:
+            if pre.get(f) is not None and post.get(f) is not None:
+                model['delta'][f].update(post[f] - pre[f])
+        if control is not None:
+            c_pre, c_post = self._complete(control[0]), self._complete(control[1])
+            for f in FLUENTS:
+                if c_pre.get(f) is not None and c_post.get(f) is not None:
+                    model['control'][f].update(c_post[f] - c_pre[f])
+            self._count_transitions(model['control_predicates'], c_pre, c_post)
+        self._count_transitions(model['predicates'], pre, post)
+
+        self.trace_count += 1
+        if self.traces is not None:
+            self.traces.append({"id": self.trace_count, "pre": pre, "action": action, "post": post})
+
+    def ingest_batch(self, action_type, states):
+        """
+        Updates the action model of action_type with N traces at once.
+
+        Args:
+            states: {block: {fluent: (N,) array}} with blocks pre, post and
+                optionally control_pre / control_post (NaN = missing),
+                e.g. TraceStore.states(rows)
+        """
+        model = self._model(action_type)
+        pre, post = states['pre'], states['post']
+        n = len(pre[FLUENTS[0]])
+        model['n'] += n
+        for f in FLUENTS:
+            model['delta'][f].update_batch(np.asarray(post[f], dtype=np.float64) - pre[f])
+        if 'control_pre' in states:
+            c_pre, c_post = states['control_pre'], states['control_post']
+            for f in FLUENTS:
+                model['control'][f].update_batch(np.asarray(c_post[f], dtype=np.float64) - c_pre[f])
+            self._count_transitions(model['control_predicates'], c_pre, c_post)
+        self._count_transitions(model['predicates'], pre, post)
+        self.trace_count += n
+
+    def ingest_store(self, store, start=None, end=None):
+        """Learns from stored traces (start <= time < end), one batch per action type."""
+        count = 0
+        for action_type in store.action_codes:
+            rows = store.query(start, end, action_type=action_type)
+            if len(rows):
+                self.ingest_batch(action_type, store.states(rows))
+                count += len(rows)
+        return count
+
+    def rebuild(self):
+        """Recomputes every action model from the attached store."""
+        self.models = {}
+        self.trace_count = 0
+        count = self.ingest_store(self.store)
+        last = self.store.last_time
+        self.watermark = datetime.fromtimestamp(last, tz=timezone.utc) if last is not None else None
+        return count
+
+    def numeric_effects(self, action_type) -> dict:
+        """Significant mean change per fluent vs. control: {fluent: (effect, se, n)}."""
+        model = self.models[action_type]
+        effects = {}
+        for f in FLUENTS:
+            event, control = model['delta'][f], model['control'][f]
+            if event.n < self.min_traces:
+                continue
+            var = event.var / event.n
+            baseline = 0.0
+            if control.n >= 2:
+                baseline = control.mean
+                var += control.var / control.n
+            se = math.sqrt(var)
+            effect = event.mean - baseline
+            if se > 0 and abs(effect) / se >= self.effect_t:
+                effects[f] = (effect, se, event.n)
+        return effects
+
+    def action_model(self, action_type) -> dict:
+        """Learned STRIPS model: {'pre', 'add', 'del'} predicate lists."""
+        model = self.models[action_type]
+        pre, add, delete = [], [], []
+        for name, (held, not_held, added, deleted) in model['predicates'].items():
+            observed = held + not_held
+            if observed < self.min_traces:
+                continue
+            if held / observed >= self.precondition_support:
+                pre.append(name)
+            # Transitions that happen just as often without the action are drift
+            c_held, c_not_held, c_added, c_deleted = model['control_predicates'][name]
+            add_rate = added / not_held if not_held >= self.min_traces else 0.0
+            del_rate = deleted / held if held >= self.min_traces else 0.0
+            if add_rate >= self.effect_support and add_rate - c_added / max(c_not_held, 1) >= 0.5:
+                add.append(name)
+            if del_rate >= self.effect_support and del_rate - c_deleted / max(c_held, 1) >= 0.5:
+                delete.append(name)
+        return {'pre': pre, 'add': add, 'del': delete}
+
+    # =========================================
+    # DATABASE TRACES
+    # =========================================
+
+    def traces_from_db(self, db_url, now=None):
+        """Event traces newer than the watermark whose post window is complete."""
+        import psycopg2
+
+        window = timedelta(minutes=self.window_min)
+        lag = timedelta(minutes=self.lag_min)
+        since = self.watermark or datetime(1970, 1, 1)
+        state = """
+            SELECT AVG(s.avg_temp), AVG(s.avg_humidity), AVG(s.avg_par), AVG(s.avg_vpd)
+            FROM minute_sector_stats s
+            WHERE (e.sector_id IS NULL OR s.sector = e.sector_id)
+              AND s.bucket >= e.time + %s AND s.bucket < e.time + %s
+        """
+        conn = psycopg2.connect(db_url)
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT e.time, e.event_type, e.severity, COALESCE(e.sector_id, 'ALL'),
+                       pre.*, post.*, cpre.*, cpost.*
+                FROM research_events e
+                CROSS JOIN LATERAL ({state}) pre
+                CROSS JOIN LATERAL ({state}) post
+                CROSS JOIN LATERAL ({state}) cpre
+                CROSS JOIN LATERAL ({state}) cpost
+                WHERE e.time > %s AND e.time <= COALESCE(%s, NOW()) - %s
+                ORDER BY e.time
+            """, (
+                -window, timedelta(0),
+                lag, lag + window,
+                -window - timedelta(days=1), -timedelta(days=1),
+                lag - timedelta(days=1), lag + window - timedelta(days=1),
+                since, now, lag + window
+            ))
+            rows = cur.fetchall()
+        conn.close()
+
+        for row in rows:
+            ts, event_type, severity, sector = row[:4]
+            states = [dict(zip(FLUENTS, row[4 + 4 * k:8 + 4 * k])) for k in range(4)]
+            action = {'type': event_type, 'severity': severity, 'sector': sector, 'time': ts}
+            yield states[0], action, states[1], (states[2], states[3])
+
+    def update_from_db(self, db_url, now=None) -> int:
+        """Ingests the traces of events since the last update; returns their count."""
+        count = 0
+        batch = []
+        for pre, action, post, control in self.traces_from_db(db_url, now):
+            self.watermark = action['time']
+            if any(v is None for v in pre.values()) or any(v is None for v in post.values()):
+                continue
+            if any(v is None for v in control[0].values()) or any(v is None for v in control[1].values()):
+                control = None
+            self.ingest_trace(pre, action, post, control)
+            batch.append((action, self._complete(pre), self._complete(post),
+                          control and (self._complete(control[0]), self._complete(control[1]))))
+            count += 1
+        if self.store is not None and batch:
+            blocks = {'pre': [], 'post': [], 'control_pre': [], 'control_post': []}
+            for _, pre, post, control in batch:
+                for block, state in zip(blocks, (pre, post) + (control or ({}, {}))):
+                    blocks[block].append(state)
+            self.store.append_batch(
+                [a['time'].timestamp() for a, *_ in batch],
+                [a['type'] for a, *_ in batch],
+                [a['sector'] for a, *_ in batch],
+                {block: {f: [state.get(f) for state in states] for f in FLUENTS} for block, states in blocks.items()},
+                [a['severity'] or 0 for a, *_ in batch])
+        return count
+
+    # =========================================
+    # PERSISTENCE
+    # =========================================
+
+    def to_dict(self) -> dict:
+        return {
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'trace_count': self.trace_count,
+            'models': {a: {
+                'n': m['n'],
+                'delta': {f: [w.n, w.mean, w.m2] for f, w in m['delta'].items()},
+                'control': {f: [w.n, w.mean, w.m2] for f, w in m['control'].items()},
+                'predicates': m['predicates'],
+                'control_predicates': m['control_predicates']
+            } for a, m in self.models.items()}
+        }
+
+    def load_state(self, path):
+        with open(path) as f:
+            state = json.load(f)
+        self.watermark = datetime.fromisoformat(state['watermark']) if state['watermark'] else None
+        self.trace_count = state['trace_count']
+        for action_type, m in state['models'].items():
+            model = self._model(action_type)
+            model['n'] = m['n']
+            model['delta'] = {f: _Welford(*v) for f, v in m['delta'].items()}
+            model['control'] = {f: _Welford(*v) for f, v in m['control'].items()}
+            model['predicates'].update(m['predicates'])
+            model['control_predicates'].update(m['control_predicates'])
+
+    def save_state(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+    # =========================================
+    # PDDL EXPORT
+    # =========================================
+
+    @staticmethod
+    def action_name(action_type) -> str:
+        return action_type.lower().replace('_', '-')
+
     def export_pddl_prob(self):
-        """Exports the learned behavior as a PDDL domain/problem snippet."""
-        return ";; Learned PDDL from MACQ Trace Library\n(:action apply-nutrients ...)"
+        """Exports the learned behavior as PDDL actions (domain.pddl types)."""
+        blocks = [f";; Learned PDDL from MACQ Trace Library ({self.trace_count} traces)"]
+        for action_type in sorted(self.models):
+            model = self.models[action_type]
+            if model['n'] < self.min_traces:
+                blocks.append(f";; {action_type}: {model['n']} traces, not enough evidence yet")
+                continue
+            learned = self.action_model(action_type)
+            lines = [f";; {action_type}: n={model['n']}"]
+            for f, (effect, se, n) in self.numeric_effects(action_type).items():
+                lines.append(f";;   {f} {effect:+.3f} +/- {se:.3f} vs. control (n={n})")
+
+            technician = action_type in TECHNICIAN_EVENTS
+            params = "?t - technician ?loc - location" if technician else "?loc - location"
+            pre = (["(at ?t ?loc)"] if technician else []) + [f"({p} ?loc)" for p in learned['pre']]
+            eff = [f"({p} ?loc)" for p in learned['add']] + [f"(not ({p} ?loc))" for p in learned['del']]
+            lines += [f"(:action {self.action_name(action_type)}", f"  :parameters ({params})"]
+            if pre:
+                lines.append(f"  :precondition (and {' '.join(pre)})")
+            lines += [f"  :effect (and {' '.join(eff)})".replace("(and )", "(and)"), ")"]
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def export_domain(self, domain_path=DEFAULT_DOMAIN) -> str:
+        """domain.pddl with the learned predicates and actions merged in."""
+        with open(domain_path) as f:
+            domain = f.read()
+        start = domain.index("(:predicates")
+        depth, end = 0, start
+        for end in range(start, len(domain)):
+            depth += {'(': 1, ')': -1}.get(domain[end], 0)
+            if depth == 0:
+                break
+        declared = "".join(f"\n    ({p} ?l - location)" for p in PREDICATES if f"({p} " not in domain)
+        domain = domain[:end].rstrip() + declared + "\n  " + domain[end:]
+
+        actions = "\n".join("  " + line if line else "" for line in self.export_pddl_prob().splitlines())
+        close = domain.rindex(")")
+        return domain[:close].rstrip() + "\n\n" + actions + "\n)\n"
+
+
+# =========================================
+# SYNTHETIC DEMO
+# =========================================
+
+def synthetic_traces(n, seed=45):
+    """Traces with known effects on top of a shared diurnal drift."""
+    rng = np.random.default_rng(seed)
+    truth = {
+        'EQUIPMENT_FAIL': {'temp_c': 4.0, 'humidity_pct': -6.0},
+        'FERTILIZER': {'humidity_pct': 3.0},
+        'PEST': {},
+        'YIELD': {}
+    }
+    types = list(truth)
+    for _ in range(n):
+        action_type = types[rng.integers(len(types))]
+        drift = {'temp_c': rng.normal(1.0, 0.5), 'humidity_pct': rng.normal(-2.0, 1.0),
+                 'par_umol': rng.normal(40, 30)}
+
+        def window(shift, effect):
+            pre = {'temp_c': rng.normal(26, 3), 'humidity_pct': rng.normal(72, 8),
+                   'par_umol': max(0.0, rng.normal(300, 150))}
+            post = {f: pre[f] + drift[f] * shift + effect.get(f, 0.0) + rng.normal(0, 0.3 if f != 'par_umol' else 10)
+                    for f in pre}
+            post['humidity_pct'] = float(np.clip(post['humidity_pct'], 0, 100))
+            return pre, post
+
+        pre, post = window(1.0, truth[action_type])
+        yield pre, {'type': action_type}, post, window(1.0, {}), truth
+
 
 if __name__ == "__main__":
-    learner = MACQLearner()
-    
-    # Simulate a research intervention
-    pre = {"ph": 6.8, "ec": 1.2}
-    act = {"type": "FERTILIZER_FLUSH", "agent": "Technician_01"}
-    post = {"ph": 6.5, "ec": 2.1} # Learned drops pH, raises EC
-    
-    learner.ingest_trace(pre, act, post)
-    print("MACQ Engine: Derived effect EC_INCREASE from 1.2 -> 2.1.")
+    parser = argparse.ArgumentParser(description="Action model acquisition from research events")
+    parser.add_argument("--demo", action="store_true", help="Recover known effects from synthetic traces")
+    parser.add_argument("--watch", action="store_true", help="Keep ingesting new events")
+    parser.add_argument("--interval", type=int, default=900, help="Watch interval (s)")
+    parser.add_argument("--state", default=DEFAULT_STATE)
+    parser.add_argument("--domain", default=DEFAULT_DOMAIN)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--store", default=DEFAULT_STORE, help="TraceStore directory ('' = keep no traces)")
+    parser.add_argument("--rebuild", action="store_true", help="Relearn all statistics from the store")
+    args = parser.parse_args()
+
+    learner = MACQLearner(store=TraceStore(args.store, FLUENTS) if args.store and not args.demo else None)
+
+    if args.demo:
+        start = time.perf_counter()
+        truth = {}
+        for pre, act, post, control, truth in synthetic_traces(400):
+            learner.ingest_trace(pre, act, post, control)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Ingested {learner.trace_count} traces in {elapsed * 1000:.1f} ms "
+                    f"({elapsed / learner.trace_count * 1e6:.1f} µs/trace)")
+        for action_type, effects in truth.items():
+            learned = {f: round(e, 2) for f, (e, se, n) in learner.numeric_effects(action_type).items()}
+            logger.info(f"{action_type}: true {effects} | learned {learned}")
+
+        # Same traces through a TraceStore: batched relearning must agree
+        directory = tempfile.mkdtemp(prefix="macq_store_")
+        try:
+            store = TraceStore(directory, FLUENTS)
+            for i, (pre, act, post, control, _) in enumerate(synthetic_traces(400)):
+                complete = [MACQLearner._complete(x) for x in (pre, post) + control]
+                store.append(1.7e9 + 3600 * i, act['type'], 'A', complete[0], complete[1], complete[2:])
+            relearned = MACQLearner(store=TraceStore(directory))
+            start = time.perf_counter()
+            relearned.rebuild()
+            logger.info(f"Relearned {relearned.trace_count} traces from the store in "
+                        f"{(time.perf_counter() - start) * 1000:.1f} ms, "
+                        f"same model: {relearned.export_pddl_prob() == learner.export_pddl_prob()}")
+        finally:
+            shutil.rmtree(directory)
+        print(learner.export_domain(args.domain))
+        raise SystemExit(0)
+
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        logger.error("DATABASE_URL not set!")
+        exit(1)
+
+    if os.path.exists(args.state) and not args.rebuild:
+        learner.load_state(args.state)
+        logger.info(f"Resumed {learner.trace_count} traces (watermark {learner.watermark})")
+    store = learner.store
+    if store is not None and len(store) and (args.rebuild or learner.watermark is None
+                                            or store.last_time > learner.watermark.timestamp()):
+        # Statistics behind the store (lost or stale state file)
+        logger.info(f"Relearned {learner.rebuild()} traces from {args.store}")
+
+    while True:
+        try:
+            count = learner.update_from_db(db_url)
+            learner.save_state(args.state)
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w') as f:
+                f.write(learner.export_domain(args.domain))
+            logger.info(f"Ingested {count} new traces ({learner.trace_count} total) -> {args.output}")
+        except Exception as e:
+            logger.error(f"Update failed: {e}")
+        if not args.watch:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,194 @@
+"""
+G.O.S. Out-of-Core Phenotyping Runner
+=====================================
+Season-long phenotyping without loading the whole telemetry frame.
+
+A dataset is a directory of partition files (one CSV per day or per node).
+Partitions are phenotyped independently in a process pool with the
+vectorized PhenotypingEngine kernels and written back one by one, so
+memory is bounded by the largest partition and throughput scales with
+the number of cores.
+
+Each finished partition is written atomically and recorded in a manifest,
+so an interrupted run resumes where it stopped.
+
+Usage:
+    # Split the curated dataset into per-day partitions
+    python phenotype_batch.py partition /app/data/curated_research_dataset.csv /app/data/partitions
+    # Phenotype all partitions on every core
+    python phenotype_batch.py run /app/data/partitions /app/data/phenotypes --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from phenotyping import PhenotypingEngine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [PHENO-BATCH] %(message)s')
+logger = logging.getLogger("PhenotypeRunner")
+
+MANIFEST_NAME = "_manifest.json"
+
+
+def partition_csv(source, output_dir, by='day', chunksize=500000, time_col='timestamp'):
+    """
+    Streams a large telemetry CSV into per-day or per-node partition files.
+    Returns the list of partition paths.
+    """
+    if by not in ('day', 'node'):
+        raise ValueError(f"Unknown partition key '{by}' (use 'day' or 'node')")
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Leftovers of an interrupted split would otherwise be appended to
+    for name in os.listdir(output_dir):
+        if name.endswith('.partial'):
+            os.remove(os.path.join(output_dir, name))
+    written = set()
+
+    for chunk in pd.read_csv(source, chunksize=chunksize, parse_dates=[time_col], low_memory=False):
+        if by == 'day':
+            keys = chunk[time_col].dt.strftime('%Y-%m-%d')
+        else:
+            keys = chunk['node_id'].astype(str)
+
+        for key, part in chunk.groupby(keys, sort=False):
+            path = os.path.join(output_dir, f"{key}.csv.partial")
+            part.to_csv(path, mode='a', header=path not in written, index=False)
+            written.add(path)
+
+    # Publish partitions only once the source has been fully consumed
+    partitions = []
+    for path in sorted(written):
+        final = path[:-len('.partial')]
+        os.replace(path, final)
+        partitions.append(final)
+
+    logger.info(f"Partitioned {source} into {len(partitions)} {by} partitions")
+    return partitions
+
+
+def _phenotype_partition(source, destination):
+    """Worker: phenotype one partition and write it atomically."""
+    start = time.perf_counter()
+    df = pd.read_csv(source, low_memory=False)
+    df = PhenotypingEngine().process_telemetry_batch(df)
+
+    tmp = destination + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, destination)
+
+    return os.path.basename(source), len(df), time.perf_counter() - start
+
+
+class PhenotypeRunner:
+    """Phenotypes a partitioned dataset in parallel with resume support."""
+
+    def __init__(self, input_dir, output_dir, workers=None):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_manifest(self, manifest: dict):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def partitions(self) -> list:
+        return sorted(name for name in os.listdir(self.input_dir) if name.endswith('.csv'))
+
+    def pending_partitions(self, manifest: dict) -> list:
+        """Partitions with no completed output (new, changed or interrupted)."""
+        pending = []
+        for name in self.partitions():
+            source = os.path.join(self.input_dir, name)
+            done = manifest.get(name)
+            output_exists = os.path.exists(os.path.join(self.output_dir, name))
+            if done and output_exists and done['source_mtime'] == os.path.getmtime(source):
+                continue
+            pending.append(name)
+        return pending
+
+    def run(self) -> dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        pending = self.pending_partitions(manifest)
+        skipped = len(self.partitions()) - len(pending)
+
+        logger.info(f"{len(pending)} partitions to process ({skipped} already done) "
+                    f"on {self.workers} workers")
+
+        start = time.perf_counter()
+        total_rows = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(_phenotype_partition,
+                            os.path.join(self.input_dir, name),
+                            os.path.join(self.output_dir, name)): name
+                for name in pending
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    _, rows, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Partition {name} failed: {e}")
+                    continue
+                total_rows += rows
+                manifest[name] = {
+                    'rows': rows,
+                    'seconds': round(seconds, 3),
+                    'source_mtime': os.path.getmtime(os.path.join(self.input_dir, name))
+                }
+                # Persist after every partition so an interruption loses at most one
+                self._save_manifest(manifest)
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'partitions': len(pending),
+            'rows': total_rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(total_rows / elapsed, 1) if elapsed > 0 else None,
+            'workers': self.workers
+        }
+        logger.info(f"Phenotyped {total_rows} rows in {elapsed:.2f}s "
+                    f"({stats['rows_per_s']} rows/s, {self.workers} workers)")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core parallel phenotyping")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_part = sub.add_parser("partition", help="Split a telemetry CSV into partitions")
+    p_part.add_argument("source")
+    p_part.add_argument("output_dir")
+    p_part.add_argument("--by", choices=["day", "node"], default="day")
+
+    p_run = sub.add_parser("run", help="Phenotype a partitioned dataset")
+    p_run.add_argument("input_dir")
+    p_run.add_argument("output_dir")
+    p_run.add_argument("--workers", type=int, default=None, help="Default: all cores")
+
+    args = parser.parse_args()
+    if args.command == "partition":
+        partition_csv(args.source, args.output_dir, by=args.by)
+    else:
+        PhenotypeRunner(args.input_dir, args.output_dir, workers=args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
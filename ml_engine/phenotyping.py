@@ -224,7 +224,8 @@ class PhenotypingEngine:
     # =========================================
     
     def detect_stress(self, temp_c: float, humidity_pct: float,
-                       par_umol: float, battery_mv: int = 3300) -> dict:
+                       par_umol: float, battery_mv: int = 3300,
+                       when: datetime = None) -> dict:
         """
         Multi-factor stress detection for greenhouse strawberry.
         
@@ -234,14 +235,18 @@ class PhenotypingEngine:
         - VPD stress (drought-like)
         - Light stress
         - Sensor health
+        
+        `when` is the sample timestamp used for the daytime low-light rule
+        (defaults to now for live readings).
         """
         vpd = self.calculate_vpd(temp_c, humidity_pct)
+        hour = (when or datetime.now()).hour
         
         stresses = {
             'heat_stress': temp_c > 30,
             'cold_stress': temp_c < 15,
             'vpd_stress': vpd > self.VPD_STRESS_THRESHOLD,
-            'low_light_stress': par_umol < 100 and 6 <= datetime.now().hour <= 18,
+            'low_light_stress': par_umol < 100 and 6 <= hour <= 18,
             'high_light_stress': par_umol > 1500,
             'humidity_stress': humidity_pct > 90 or humidity_pct < 40,
             'sensor_low_battery': battery_mv < 3000,  # TPS62740 practical operating floor
@@ -276,6 +281,121 @@ class PhenotypingEngine:
         else:
             return "CRITICAL"
     
+    # =========================================
+    # VECTORIZED KERNELS (whole-column NumPy)
+    # =========================================
+    # Array counterparts of the scalar methods above. Same equations and
+    # rounding, so results match the scalar versions within rounding.
+    
+    def vpd_array(self, temp_c, humidity_pct) -> np.ndarray:
+        """Vectorized calculate_vpd (kPa, rounded to 3 decimals)."""
+        temp_c = np.asarray(temp_c, dtype=float)
+        humidity_pct = np.asarray(humidity_pct, dtype=float)
+        svp = 0.6108 * np.exp((17.27 * temp_c) / (temp_c + 237.3))
+        return np.round(svp * (1 - humidity_pct / 100.0), 3)
+    
+    def classify_vpd_array(self, vpd) -> np.ndarray:
+        """Vectorized classify_vpd_stress."""
+        vpd = np.asarray(vpd, dtype=float)
+        return np.select(
+            [vpd < 0.4, vpd < 0.8, vpd < 1.2, vpd < 1.5],
+            ["LOW_TRANSPIRATION", "OPTIMAL", "MILD_STRESS", "MODERATE_STRESS"],
+            default="SEVERE_STRESS"
+        ).astype(object)
+    
+    def transpiration_array(self, temp_c, humidity_pct, par_umol) -> np.ndarray:
+        """Vectorized estimate_transpiration (g/m²/hour, rounded to 2 decimals)."""
+        temp_c = np.asarray(temp_c, dtype=float)
+        par_umol = np.asarray(par_umol, dtype=float)
+        vpd = self.vpd_array(temp_c, humidity_pct)
+        
+        rn = par_umol * 0.22
+        gamma = 0.066
+        delta = 4098 * 0.6108 * np.exp((17.27 * temp_c) / (temp_c + 237.3)) / \
+                ((temp_c + 237.3) ** 2)
+        
+        stomatal_factor = np.minimum(1.0, par_umol / 500)
+        stress_factor = np.where(vpd > 0.8, np.maximum(0.2, 1 - (vpd - 0.8) / 2), 1.0)
+        
+        et = (delta * rn * 0.0036 + gamma * vpd * stomatal_factor * stress_factor) / \
+             (delta + gamma)
+        
+        return np.round(np.maximum(0, et * 1000 * self.LEAF_AREA_INDEX), 2)
+    
+    def ndvi_proxy_array(self, blue_intensity, red_intensity, par_umol) -> np.ndarray:
+        """Vectorized calculate_ndvi_proxy (-1 to 1, rounded to 3 decimals)."""
+        par_umol = np.asarray(par_umol, dtype=float)
+        expected_par = (np.asarray(blue_intensity, dtype=float) * 200 +
+                        np.asarray(red_intensity, dtype=float) * 600)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            absorption_ratio = 1 - par_umol / np.maximum(expected_par, par_umol)
+        ndvi_proxy = np.clip(2 * absorption_ratio - 1, -1, 1)
+        
+        # Night / very low light and dark LEDs carry no vigor signal
+        ndvi_proxy = np.where((par_umol < 50) | (expected_par == 0), 0.0, ndvi_proxy)
+        return np.round(ndvi_proxy, 3)
+    
+    def wue_array(self, transpiration_g, assimilation_umol) -> np.ndarray:
+        """Vectorized calculate_wue (µmol CO2 / mol H2O, rounded to 2 decimals)."""
+        transpiration_g = np.asarray(transpiration_g, dtype=float)
+        e_mol = transpiration_g / 18.015 / 3600
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wue = np.asarray(assimilation_umol, dtype=float) / (e_mol * 1000)
+        return np.round(np.where(transpiration_g > 0, wue, 0.0), 2)
+    
+    def stress_array(self, temp_c, humidity_pct, par_umol, timestamps=None) -> dict:
+        """
+        Vectorized detect_stress.
+        
+        The daytime low-light rule uses each sample's own timestamp; without
+        timestamps it falls back to the current hour like detect_stress.
+        
+        Returns a dict of boolean arrays plus 'vpd_value', 'stress_score'
+        and 'stress_level'.
+        """
+        temp_c = np.asarray(temp_c, dtype=float)
+        humidity_pct = np.asarray(humidity_pct, dtype=float)
+        par_umol = np.asarray(par_umol, dtype=float)
+        vpd = self.vpd_array(temp_c, humidity_pct)
+        
+        if timestamps is None:
+            hour = np.full(temp_c.shape, datetime.now().hour)
+        else:
+            hour = pd.DatetimeIndex(pd.to_datetime(timestamps)).hour.to_numpy()
+        
+        stresses = {
+            'heat_stress': temp_c > 30,
+            'cold_stress': temp_c < 15,
+            'vpd_stress': vpd > self.VPD_STRESS_THRESHOLD,
+            'low_light_stress': (par_umol < 100) & (hour >= 6) & (hour <= 18),
+            'high_light_stress': par_umol > 1500,
+            'humidity_stress': (humidity_pct > 90) | (humidity_pct < 40),
+            'vpd_value': vpd
+        }
+        
+        score = (stresses['heat_stress'] * 20 +
+                 stresses['cold_stress'] * 15 +
+                 stresses['vpd_stress'] * 25 +
+                 stresses['low_light_stress'] * 10 +
+                 stresses['high_light_stress'] * 15 +
+                 stresses['humidity_stress'] * 15)
+        
+        stresses['stress_score'] = np.minimum(100, score)
+        stresses['stress_level'] = self.classify_stress_array(score)
+        
+        return stresses
+    
+    def classify_stress_array(self, score) -> np.ndarray:
+        """Vectorized _classify_stress_score."""
+        score = np.asarray(score)
+        return np.select(
+            [score < 10, score < 25, score < 50, score < 75],
+            ["OPTIMAL", "MILD", "MODERATE", "SEVERE"],
+            default="CRITICAL"
+        ).astype(object)
+    
     # =========================================
     # PHENOTYPE BATCH PROCESSING
     # =========================================
@@ -285,33 +405,51 @@ class PhenotypingEngine:
         Process a batch of telemetry data and add phenotyping columns.
         
         Expected columns: temp_c, humidity_pct, par_umol
+        Optional: timestamp (or time), blue_ratio + red_ratio, assimilation_umol
         
-        Adds: vpd, vpd_stress, transpiration, ndvi_proxy, stress_score
+        Adds: vpd_kpa, vpd_stress, transpiration_g_m2_h, stress_score,
+        stress_level, and ndvi_proxy / wue when the optional inputs exist.
         """
         logger.info(f"Processing {len(df)} records for phenotyping...")
         
+        temp_c = df['temp_c'].to_numpy(dtype=float)
+        humidity_pct = df['humidity_pct'].to_numpy(dtype=float)
+        if 'par_umol' in df.columns:
+            par_umol = df['par_umol'].to_numpy(dtype=float)
+        else:
+            par_umol = np.full(len(df), 500.0)
+        
+        timestamps = None
+        for col in ('timestamp', 'time'):
+            if col in df.columns:
+                timestamps = df[col]
+                break
+        
         # VPD calculations
-        df['vpd_kpa'] = df.apply(
-            lambda r: self.calculate_vpd(r['temp_c'], r['humidity_pct']), 
-            axis=1
-        )
-        df['vpd_stress'] = df['vpd_kpa'].apply(self.classify_vpd_stress)
+        df['vpd_kpa'] = self.vpd_array(temp_c, humidity_pct)
+        df['vpd_stress'] = self.classify_vpd_array(df['vpd_kpa'].to_numpy())
         
         # Transpiration estimation
-        df['transpiration_g_m2_h'] = df.apply(
-            lambda r: self.estimate_transpiration(
-                r['temp_c'], r['humidity_pct'], r.get('par_umol', 500)
-            ),
-            axis=1
-        )
-        
-        # Stress detection
-        df['stress_score'] = df.apply(
-            lambda r: self.detect_stress(
-                r['temp_c'], r['humidity_pct'], r.get('par_umol', 500)
-            )['stress_score'],
-            axis=1
-        )
+        df['transpiration_g_m2_h'] = self.transpiration_array(temp_c, humidity_pct, par_umol)
+        
+        # Stress detection (low-light rule judged at each sample's timestamp)
+        stress = self.stress_array(temp_c, humidity_pct, par_umol, timestamps)
+        df['stress_score'] = stress['stress_score']
+        df['stress_level'] = stress['stress_level']
+        
+        # Vegetation index needs the LED setting (joined by the sync engine)
+        if 'blue_ratio' in df.columns and 'red_ratio' in df.columns:
+            df['ndvi_proxy'] = self.ndvi_proxy_array(
+                df['blue_ratio'].to_numpy(dtype=float),
+                df['red_ratio'].to_numpy(dtype=float),
+                par_umol
+            )
+        
+        if 'assimilation_umol' in df.columns:
+            df['wue'] = self.wue_array(
+                df['transpiration_g_m2_h'].to_numpy(),
+                df['assimilation_umol'].to_numpy(dtype=float)
+            )
         
         logger.info("Phenotyping complete. Added: vpd_kpa, transpiration, stress_score")
         
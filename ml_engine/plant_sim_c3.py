@@ -1,7 +1,7 @@
 import numpy as np
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s [BIO-ENGINE] %(message)s')
+# basicConfig only when run directly: agent_rl, canopy_sim and the other models import this module first
 logger = logging.getLogger("BiologyCore")
 
 class StrawberryPhysiologySim:
@@ -15,9 +15,49 @@ class StrawberryPhysiologySim:
         self.Jmax25 = 140.0 # Umol m-2 s-1 (Max electron transport rate)
         self.Rd25 = 0.8     # Dark respiration
         self.boundary_layer_cond = 0.5 # mol m-2 s-1
+        
+        # FvCB kinetics at 25°C (Bernacchi et al. 2001)
+        self.Kc25 = 404.9      # umol mol-1 (Rubisco Km for CO2)
+        self.Ko25 = 278.4      # mmol mol-1 (Rubisco Km for O2)
+        self.GammaStar25 = 42.75  # umol mol-1 (CO2 compensation point)
+        self.O2 = 210.0        # mmol mol-1 (ambient oxygen)
+        self.Ci_Ca = 0.7       # Intercellular / ambient CO2 ratio (C3)
+        
+        # Activation energies (J mol-1) for the Arrhenius temperature response
+        self.Ea_Kc = 79430.0
+        self.Ea_Ko = 36380.0
+        self.Ea_GammaStar = 37830.0
+        self.Ea_Vcmax = 65330.0
+        self.Ea_Jmax = 43540.0
+        self.Ea_Rd = 46390.0
+        # High-temperature deactivation (peaked Arrhenius)
+        self.Hd = 200000.0     # J mol-1
+        self.dS = 650.0        # J mol-1 K-1
+        
+        # Electron transport light response
+        self.alpha_J = 0.3     # mol e- per mol absorbed photons
+        self.theta_J = 0.7     # Curvature of the J light response
+        
+        # Canopy (sunlit/shaded big-leaf)
+        self.LEAF_AREA_INDEX = 3.5  # m2 m-2, matches PhenotypingEngine
+        self.leaf_absorptance = 0.85
+        self.kb = 0.5 / np.sin(np.radians(60.0))  # Beam extinction (overhead LEDs + sun)
+        self.kd = 0.7          # Diffuse extinction
+        self.diffuse_fraction = 0.3
 
-    def calculate_transpiration(self, par, temp, hum, blue_ratio):
-        """Penman-Monteith styled transpiration calculation."""
+    def transpiration_array(self, par, temp, hum, blue_ratio, gb=None) -> dict:
+        """
+        Vectorized transpiration model. Inputs broadcast against each other
+        (scalars, columns or open-mesh grids); returns unrounded arrays.
+        
+        With gb (boundary-layer conductance, e.g. a calibrated per-node
+        boundary_layer_cond), stomatal and boundary-layer conductance act in
+        series; gs in the result stays the stomatal conductance.
+        """
+        par = np.asarray(par, dtype=float)
+        temp = np.asarray(temp, dtype=float)
+        hum = np.asarray(hum, dtype=float)
+        blue_ratio = np.asarray(blue_ratio, dtype=float)
         
         # 1. Stomatal Conductance (gs) model 
         # Blue light at 450nm stimulates stomates via phototropin receptors
@@ -25,28 +65,140 @@ class StrawberryPhysiologySim:
         
         # VPD (Vapor Pressure Deficit) calculation
         esat = 0.611 * np.exp(17.27 * temp / (temp + 237.3))
-        eact = esat * (hum / 100.0)
-        vpd = esat - eact
+        vpd = esat * (1 - hum / 100.0)
         
         # gs = g0 + f(blue) * (1 / (1 + vpd/D0))
         gs = 0.05 + (0.2 * (par / (par + 500)) * blue_factor) / (1 + vpd / 1.5)
         
         # 2. Transpiration (E) proportional to gs and VPD
-        transpiration_rate = gs * vpd * 1000.0 # Simulated g/m2/h
+        g_total = gs if gb is None else gs * gb / (gs + gb)
+        transpiration_rate = g_total * vpd * 1000.0 # Simulated g/m2/h
+        
+        return {
+            "transpiration_rate": transpiration_rate,
+            "gs": gs,
+            "vpd": vpd
+        }
+
+    # === FvCB TEMPERATURE RESPONSE ===
+    
+    def _arrhenius(self, value25, ea, tleaf_k):
+        """Arrhenius scaling from 25°C to leaf temperature (K)."""
+        R = 8.314
+        return value25 * np.exp(ea * (tleaf_k - 298.15) / (298.15 * R * tleaf_k))
+    
+    def _peaked_arrhenius(self, value25, ea, tleaf_k):
+        """Arrhenius scaling with high-temperature deactivation."""
+        R = 8.314
+        num = 1 + np.exp((298.15 * self.dS - self.Hd) / (298.15 * R))
+        den = 1 + np.exp((tleaf_k * self.dS - self.Hd) / (tleaf_k * R))
+        return self._arrhenius(value25, ea, tleaf_k) * num / den
+    
+    def temperature_scaled_params(self, tleaf, vcmax25=None, jmax25=None) -> dict:
+        """
+        Vcmax, Jmax, Rd and Rubisco kinetics at leaf temperature (°C).
+        vcmax25/jmax25 override the defaults (scalars or per-sample arrays).
+        """
+        tk = np.asarray(tleaf, dtype=float) + 273.15
+        vcmax25 = self.Vcmax25 if vcmax25 is None else vcmax25
+        jmax25 = self.Jmax25 if jmax25 is None else jmax25
+        return {
+            "Vcmax": self._peaked_arrhenius(vcmax25, self.Ea_Vcmax, tk),
+            "Jmax": self._peaked_arrhenius(jmax25, self.Ea_Jmax, tk),
+            "Rd": self._arrhenius(self.Rd25, self.Ea_Rd, tk),
+            "Kc": self._arrhenius(self.Kc25, self.Ea_Kc, tk),
+            "Ko": self._arrhenius(self.Ko25, self.Ea_Ko, tk),
+            "GammaStar": self._arrhenius(self.GammaStar25, self.Ea_GammaStar, tk)
+        }
+    
+    # === FvCB LEAF MODEL ===
+    
+    def fvcb_array(self, par_abs, tleaf, ci, vcmax25=None, jmax25=None) -> dict:
+        """
+        Farquhar-von Caemmerer-Berry leaf assimilation (vectorized).
+        
+        Args:
+            par_abs: Absorbed PAR (umol m-2 s-1)
+            tleaf: Leaf temperature (°C)
+            ci: Intercellular CO2 (umol mol-1)
+            vcmax25, jmax25: Optional overrides of Vcmax25/Jmax25
+        
+        Returns:
+            Dict of arrays: An (net), Wc (Rubisco-limited), Wj (RuBP-limited), Rd
+        """
+        k = self.temperature_scaled_params(tleaf, vcmax25, jmax25)
+        ci = np.asarray(ci, dtype=float)
+        par_abs = np.maximum(np.asarray(par_abs, dtype=float), 0.0)
+        
+        # Electron transport: non-rectangular hyperbola in absorbed light
+        ai = self.alpha_J * par_abs
+        b = ai + k["Jmax"]
+        J = (b - np.sqrt(np.maximum(b * b - 4 * self.theta_J * ai * k["Jmax"], 0.0))) / (2 * self.theta_J)
+        
+        gamma_gap = ci - k["GammaStar"]
+        Wc = k["Vcmax"] * gamma_gap / (ci + k["Kc"] * (1 + self.O2 / k["Ko"]))
+        Wj = J * gamma_gap / (4 * ci + 8 * k["GammaStar"])
         
         return {
-            "transpiration_rate": round(transpiration_rate, 4),
-            "gs": round(gs, 4),
-            "vpd": round(vpd, 4)
+            "An": np.minimum(Wc, Wj) - k["Rd"],
+            "Wc": Wc,
+            "Wj": Wj,
+            "Rd": k["Rd"]
+        }
+    
+    def photosynthesis_array(self, par, tleaf, co2=400, vcmax25=None, jmax25=None):
+        """Vectorized leaf net assimilation An (umol m-2 s-1); inputs broadcast."""
+        par = np.asarray(par, dtype=float)
+        ci = self.Ci_Ca * np.asarray(co2, dtype=float)
+        return self.fvcb_array(self.leaf_absorptance * par, tleaf, ci, vcmax25, jmax25)["An"]
+    
+    # === SUNLIT / SHADED CANOPY ===
+    
+    def canopy_photosynthesis_array(self, par, tleaf, co2=400, lai=None,
+                                    vcmax25=None, jmax25=None, ci=None) -> np.ndarray:
+        """
+        Canopy net assimilation per ground area (umol m-2 s-1) from a
+        two big-leaf (sunlit/shaded) integration over the leaf area index.
+        ci overrides the fixed Ci_Ca * co2 (e.g. from a stomatal coupling).
+        """
+        lai = np.asarray(self.LEAF_AREA_INDEX if lai is None else lai, dtype=float)
+        par = np.maximum(np.asarray(par, dtype=float), 0.0)
+        ci = self.Ci_Ca * np.asarray(co2, dtype=float) if ci is None else np.asarray(ci, dtype=float)
+        
+        i_beam = par * (1 - self.diffuse_fraction)
+        i_diff = par * self.diffuse_fraction
+        
+        # Leaf area fractions
+        lai_sun = (1 - np.exp(-self.kb * lai)) / self.kb
+        lai_sha = lai - lai_sun
+        
+        # Mean absorbed PAR per unit leaf area (no leaves, no assimilation)
+        per_leaf = np.divide(1 - np.exp(-self.kd * lai), lai, out=np.zeros(np.shape(lai)), where=lai > 0)
+        i_sha = self.leaf_absorptance * i_diff * per_leaf
+        i_sun = i_sha + self.leaf_absorptance * self.kb * i_beam
+        
+        a_sun = self.fvcb_array(i_sun, tleaf, ci, vcmax25, jmax25)["An"]
+        a_sha = self.fvcb_array(i_sha, tleaf, ci, vcmax25, jmax25)["An"]
+        return a_sun * lai_sun + a_sha * lai_sha
+    
+    def calculate_transpiration(self, par, temp, hum, blue_ratio):
+        """Penman-Monteith styled transpiration calculation."""
+        res = self.transpiration_array(par, temp, hum, blue_ratio)
+        return {
+            "transpiration_rate": round(float(res["transpiration_rate"]), 4),
+            "gs": round(float(res["gs"]), 4),
+            "vpd": round(float(res["vpd"]), 4)
         }
 
     def calculate_photosynthesis(self, par, tleaf, co2=400):
-        """FvCB Model for Carbon Assimilation (An)."""
-        # (Simplified implementation of the Farquhar model)
-        An = (self.Vcmax25 * (co2 / (co2 + 100))) - self.Rd25
-        return round(max(0.1, An), 2)
+        """
+        FvCB leaf assimilation (An, umol m-2 s-1), floored at 0.1.
+        photosynthesis_array keeps the negative (respiring) values.
+        """
+        return round(max(0.1, float(self.photosynthesis_array(par, tleaf, co2))), 2)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [BIO-ENGINE] %(message)s')
     sim = StrawberryPhysiologySim()
     logger.info("Initializing GALAXY-Scale Biology Engine...")
     
@@ -0,0 +1,140 @@
+"""
+G.O.S. Physiology Scenario Sweep
+================================
+Screens PAR x temperature x RH x blue ratio x CO2 grids through the
+vectorized StrawberryPhysiologySim.
+
+The grid is split along its first axis into blocks that are evaluated in
+a process pool. Each worker broadcasts its block as an open mesh (no
+materialized meshgrid) and writes straight into float32 memory-mapped
+.npy files, so results never travel back through the pool.
+
+Output directory layout:
+    axes.npz                  grid axis values (par, temp, hum, blue_ratio, co2)
+    transpiration_rate.npy    g/m²/h, shape = grid shape
+    gs.npy                    mol/m²/s
+    vpd.npy                   kPa
+    assimilation.npy          µmol/m²/s
+
+Usage:
+    python scenario_sweep.py /app/data/sweep --workers 8
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from plant_sim_c3 import StrawberryPhysiologySim
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [SWEEP] %(message)s')
+logger = logging.getLogger("ScenarioSweep")
+
+AXES = ('par', 'temp', 'hum', 'blue_ratio', 'co2')
+OUTPUTS = ('transpiration_rate', 'gs', 'vpd', 'assimilation')
+
+DEFAULT_GRID = {
+    'par': np.linspace(0, 1500, 31),
+    'temp': np.linspace(10, 40, 31),
+    'hum': np.linspace(20, 95, 16),
+    'blue_ratio': np.linspace(0, 1, 11),
+    'co2': np.linspace(300, 1200, 10),
+}
+
+
+def evaluate_block(axes: dict, sim=None) -> dict:
+    """Evaluates every output for the full outer product of the given axes."""
+    sim = sim or StrawberryPhysiologySim()
+    ndim = len(AXES)
+    # Open mesh: each axis varies along its own dimension only
+    mesh = {
+        name: np.asarray(axes[name], dtype=float).reshape(
+            [-1 if i == k else 1 for i in range(ndim)])
+        for k, name in enumerate(AXES)
+    }
+    shape = tuple(len(axes[name]) for name in AXES)
+
+    water = sim.transpiration_array(mesh['par'], mesh['temp'], mesh['hum'], mesh['blue_ratio'])
+    carbon = sim.photosynthesis_array(mesh['par'], mesh['temp'], mesh['co2'])
+
+    out = {name: np.broadcast_to(water[name], shape) for name in ('transpiration_rate', 'gs', 'vpd')}
+    out['assimilation'] = np.broadcast_to(carbon, shape)
+    return out
+
+
+def _sweep_worker(output_dir, axes, start, stop):
+    """Worker: evaluate par[start:stop] and write into the shared memmaps."""
+    block_axes = dict(axes)
+    block_axes['par'] = axes['par'][start:stop]
+    results = evaluate_block(block_axes)
+
+    for name in OUTPUTS:
+        target = np.load(os.path.join(output_dir, f"{name}.npy"), mmap_mode='r+')
+        target[start:stop] = results[name]
+        target.flush()
+        del target
+    return stop - start
+
+
+def run_sweep(output_dir, grid=None, workers=None, block_size=None) -> dict:
+    """Runs a full grid sweep into output_dir; returns timing stats."""
+    grid = {name: np.asarray((grid or DEFAULT_GRID)[name], dtype=float) for name in AXES}
+    shape = tuple(len(grid[name]) for name in AXES)
+    points = int(np.prod(shape))
+    workers = workers or os.cpu_count() or 1
+    # Default: a few blocks per worker for load balancing
+    block_size = block_size or max(1, -(-shape[0] // (workers * 4)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.savez(os.path.join(output_dir, "axes.npz"), **grid)
+    for name in OUTPUTS:
+        np.lib.format.open_memmap(os.path.join(output_dir, f"{name}.npy"),
+                                  mode='w+', dtype=np.float32, shape=shape).flush()
+
+    logger.info(f"Sweeping {points:,} scenarios {shape} on {workers} workers")
+    start = time.perf_counter()
+    blocks = [(i, min(i + block_size, shape[0])) for i in range(0, shape[0], block_size)]
+
+    if workers == 1:
+        for lo, hi in blocks:
+            _sweep_worker(output_dir, grid, lo, hi)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_sweep_worker, *zip(*[(output_dir, grid, lo, hi) for lo, hi in blocks])))
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'points': points,
+        'shape': shape,
+        'seconds': round(elapsed, 3),
+        'points_per_s': round(points / elapsed) if elapsed > 0 else None,
+        'workers': workers
+    }
+    logger.info(f"Done in {elapsed:.2f}s ({stats['points_per_s']:,} scenarios/s)")
+    return stats
+
+
+def load_sweep(output_dir) -> dict:
+    """Opens a finished sweep: axes plus read-only memmapped outputs."""
+    with np.load(os.path.join(output_dir, "axes.npz")) as axes:
+        result = {name: axes[name] for name in AXES}
+    for name in OUTPUTS:
+        result[name] = np.load(os.path.join(output_dir, f"{name}.npy"), mmap_mode='r')
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Physiology scenario grid sweep")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=None, help="Default: all cores")
+    args = parser.parse_args()
+
+    run_sweep(args.output_dir, workers=args.workers)
+    sweep = load_sweep(args.output_dir)
+
+    best = np.unravel_index(np.argmax(sweep['transpiration_rate']), sweep['transpiration_rate'].shape)
+    logger.info("Max transpiration at " + ", ".join(
+        f"{name}={sweep[name][i]:.2f}" for name, i in zip(AXES, best)))
@@ -1,40 +1,261 @@
+"""
+G.O.S. Spectral Optimizer
+=========================
+Batched blue/red/intensity optimization of the LED supplement.
+
+For every sector the optimizer maximizes modeled canopy assimilation per
+watt of facility power over the (blue ratio, intensity) plane; the red
+channel is the remainder (red = 1 - blue).
+
+Model per candidate spectrum:
+- Photon flux: ambient PAR + intensity * LED_MAX_PAR, with blue photons
+  weighted by their lower relative quantum yield (McCree).
+- Blue share of daylight + LED light:
+  * opens stomata: gs from StrawberryPhysiologySim.transpiration_array,
+    coupled to intercellular CO2 by a few fixed-point iterations of
+    ci = ca - 1.6 * An / gs
+  * sets photosynthetic capacity: leaves grown under (nearly) pure red
+    lose Vcmax/Jmax (Hogewoning et al. 2010), saturating above ~20% blue
+- Assimilation: sunlit/shaded FvCB canopy model.
+- Power: LED electrical power (per-channel efficacy) + a constant base
+  load, so that "assimilation per watt" has an interior optimum.
+
+Search: all sectors x candidates are evaluated as one array. A cold start
+scans a coarse grid and refines it with a shrinking 3x3 compass stencil;
+a warm start (previous solution of the sector) only runs the stencil.
+"""
+
+import logging
+import time
+
 import numpy as np
 
+from greenhouse_env import LED_MAX_PAR
+from plant_sim_c3 import StrawberryPhysiologySim
+
+# basicConfig only when run directly: led_planner imports this module first
+logger = logging.getLogger("SpectralOptimizer")
+
+# Relative quantum yield of photosynthesis (McCree 1972, red = 1)
+QUANTUM_YIELD = {"blue": 0.75, "red": 1.0, "ambient": 0.9}
+AMBIENT_BLUE_FRACTION = 0.2     # Blue share of daylight PAR
+# Capacity = 1 - BLUE_DEFICIT * exp(-blue_share / BLUE_SCALE)
+BLUE_DEFICIT = 0.5
+BLUE_SCALE = 0.1
+# Photon efficacy per LED channel (µmol/J)
+CHANNEL_EFFICACY = {"blue": 2.4, "red": 2.9}
+BLUE_BOUNDS = (0.05, 0.70)
+INTENSITY_BOUNDS = (0.0, 100.0)
+
+# 3x3 compass stencil (blue step, intensity step multipliers)
+_STENCIL = np.array([(db, di) for db in (-1, 0, 1) for di in (-1, 0, 1)], dtype=float)
+
+
 class PhotosynthesisOptimizer:
     """Spectral Optimizer based on Dr. Pahlevani's patent 62/572,526.
     Optimizes photosynthesis using smart LED grow lights and geometric control.
     """
-    
-    def __init__(self):
+
+    def __init__(self, sim=None, base_load_w=30.0, grid=(14, 21), refine_iters=6,
+                 warm_iters=6, ci_iters=3):
         # Absorption peaks (Simplified)
         self.peaks = {"chlorophyll_a": 430, "chlorophyll_b": 453, "red_peak": 662}
+        self.sim = sim or StrawberryPhysiologySim()
+        # Non-LED facility power (climate control, fans) in W/m²
+        self.base_load_w = base_load_w
+        self.refine_iters = refine_iters
+        self.warm_iters = warm_iters
+        self.ci_iters = ci_iters
 
-    def optimize_spectral_quality(self, target_yield, current_state):
-        """Uses a geometric controller approach to find optimal blue:red balance."""
-        
-        # State: {par, temp, hum, co2}
-        par = current_state.get('par', 400)
-        co2 = current_state.get('co2', 400)
-        
-        # Differential Geometric Logic: Small shifts in frequency/spectral ratio 
-        # to find the tangent of the photosynthesis saturation curve.
-        
-        if co2 > 600:
-            # High CO2 allows higher PAR absorption
-            blue_ratio = 0.35
-            red_ratio = 0.65
-        else:
-            blue_ratio = 0.20
-            red_ratio = 0.80
-            
+        blue = np.linspace(*BLUE_BOUNDS, grid[0])
+        intensity = np.linspace(*INTENSITY_BOUNDS, grid[1])
+        self.grid = np.array([(b, i) for b in blue for i in intensity])
+        # Initial stencil step = coarse grid spacing
+        self.step0 = np.array([blue[1] - blue[0], intensity[1] - intensity[0]])
+
+        # sector -> (blue_ratio, intensity) of the last solution (warm start)
+        self.solutions = {}
+
+    # =========================================
+    # MODEL
+    # =========================================
+
+    def evaluate(self, blue, intensity, par, temp, hum, co2) -> dict:
+        """
+        Canopy assimilation, LED power and efficiency of candidate spectra.
+        All inputs broadcast (e.g. sectors as (S, 1), candidates as (S, C)).
+        """
+        blue = np.asarray(blue, dtype=float)
+        led_par = np.asarray(intensity, dtype=float) / 100.0 * LED_MAX_PAR
+        par = np.asarray(par, dtype=float)
+        co2 = np.asarray(co2, dtype=float)
+
+        # Photon flux weighted by relative quantum yield (broadband-equivalent)
+        led_yield = blue * QUANTUM_YIELD["blue"] + (1 - blue) * QUANTUM_YIELD["red"]
+        par_eff = par + led_par * led_yield / QUANTUM_YIELD["ambient"]
+        par_total = par + led_par
+
+        # Blue share of the combined light: stomatal opening raises
+        # intercellular CO2, too little blue lowers photosynthetic capacity
+        blue_share = (AMBIENT_BLUE_FRACTION * par + blue * led_par) / np.maximum(par_total, 1e-9)
+        capacity = 1.0 - BLUE_DEFICIT * np.exp(-blue_share / BLUE_SCALE)
+        vcmax25 = self.sim.Vcmax25 * capacity
+        jmax25 = self.sim.Jmax25 * capacity
+
+        gs = self.sim.transpiration_array(par_total, temp, hum, blue_share)["gs"]
+        lai = self.sim.LEAF_AREA_INDEX
+        ci = self.sim.Ci_Ca * co2
+        for _ in range(self.ci_iters):
+            an = self.sim.canopy_photosynthesis_array(par_eff, temp, co2, None, vcmax25, jmax25, ci)
+            ci = np.clip(co2 - 1.6 * (an / lai) / gs, self.sim.GammaStar25, co2)
+        an = self.sim.canopy_photosynthesis_array(par_eff, temp, co2, None, vcmax25, jmax25, ci)
+
+        power = led_par * (blue / CHANNEL_EFFICACY["blue"] + (1 - blue) / CHANNEL_EFFICACY["red"])
         return {
-            "blue_channel": blue_ratio,
-            "red_channel": red_ratio,
-            "control_type": "Geometric_Tangent_Follower"
+            "assimilation": an,
+            "led_power_w": power,
+            "efficiency": an / (power + self.base_load_w),
+            "gs": gs
         }
 
+    def _score(self, candidates, conditions, target):
+        """Efficiency for candidates meeting the target, else -(1000 + shortfall)."""
+        res = self.evaluate(candidates[..., 0], candidates[..., 1], *conditions)
+        shortfall = target - res["assimilation"]
+        return np.where(shortfall <= 0, res["efficiency"], -1000.0 - shortfall)
+
+    # =========================================
+    # SEARCH
+    # =========================================
+
+    def optimize_batch(self, par, temp, hum, co2, target=None, x0=None) -> dict:
+        """
+        Optimal (blue_ratio, intensity) for S sectors at once.
+
+        Args:
+            par, temp, hum, co2: Per-sector conditions, arrays of shape (S,)
+            target: Optional per-sector canopy assimilation floor (µmol m-2 s-1)
+            x0: Optional (S, 2) warm start; rows containing NaN start cold
+
+        Returns:
+            Dict of (S,) arrays: blue_ratio, intensity, assimilation,
+            led_power_w, efficiency, gs
+        """
+        conditions = [np.asarray(v, dtype=float)[:, None] for v in (par, temp, hum, co2)]
+        n = len(conditions[0])
+        target = np.full((n, 1), -np.inf) if target is None else \
+            np.broadcast_to(np.asarray(target, dtype=float), (n,))[:, None]
+        lo = np.array([BLUE_BOUNDS[0], INTENSITY_BOUNDS[0]])
+        hi = np.array([BLUE_BOUNDS[1], INTENSITY_BOUNDS[1]])
+
+        best = np.full((n, 2), np.nan) if x0 is None else np.array(x0, dtype=float).reshape(n, 2)
+        warm = ~np.isnan(best).any(axis=1)
+        iters = np.where(warm, self.warm_iters, self.refine_iters)
+
+        # Cold sectors: coarse grid scan
+        cold = np.flatnonzero(~warm)
+        if len(cold):
+            scores = self._score(np.broadcast_to(self.grid, (len(cold),) + self.grid.shape),
+                                 [c[cold] for c in conditions], target[cold])
+            best[cold] = self.grid[scores.argmax(axis=1)]
+        best = np.clip(best, lo, hi)
+
+        # Compass refinement: move to the best stencil point, halve the step when staying
+        step = np.tile(self.step0, (n, 1))
+        for it in range(int(iters.max())):
+            active = it < iters
+            points = np.clip(best[:, None, :] + _STENCIL * step[:, None, :], lo, hi)
+            scores = self._score(points, conditions, target)
+            choice = scores.argmax(axis=1)
+            moved = active & (choice != 4)
+            best[moved] = points[moved, choice[moved]]
+            step[active & ~moved] *= 0.5
+
+        final = self.evaluate(best[:, 0], best[:, 1], *(c[:, 0] for c in conditions))
+        return {"blue_ratio": best[:, 0], "intensity": best[:, 1], **final}
+
+    def optimize_sectors(self, states: dict, target_yield="MAX") -> dict:
+        """
+        Re-optimizes every sector in one batch, warm-starting from each
+        sector's previous solution.
+
+        Args:
+            states: {sector: {par, temp, hum, co2}}
+            target_yield: "MAX" (pure efficiency), a canopy assimilation
+                floor (µmol m-2 s-1), or {sector: floor}
+        """
+        sectors = list(states)
+        if not sectors:
+            return {}
+        get = lambda key, default: [states[s].get(key, default) for s in sectors]
+        if isinstance(target_yield, dict):
+            target = [target_yield.get(s, -np.inf) for s in sectors]
+        elif isinstance(target_yield, (int, float)):
+            target = float(target_yield)
+        else:
+            target = None
+
+        x0 = np.array([self.solutions.get(s, (np.nan, np.nan)) for s in sectors])
+        res = self.optimize_batch(get('par', 400), get('temp', 22.0), get('hum', 65.0),
+                                  get('co2', 400), target=target, x0=x0)
+
+        recs = {}
+        for i, sector in enumerate(sectors):
+            blue = float(res["blue_ratio"][i])
+            intensity = float(res["intensity"][i])
+            self.solutions[sector] = (blue, intensity)
+            recs[sector] = {
+                "blue_channel": round(blue, 3),
+                "red_channel": round(1.0 - blue, 3),
+                "intensity": round(intensity, 1),
+                "assimilation": round(float(res["assimilation"][i]), 2),
+                "led_power_w": round(float(res["led_power_w"][i]), 1),
+                "assimilation_per_watt": round(float(res["efficiency"][i]), 4),
+                "control_type": "Vectorized_Compass_Search"
+            }
+        return recs
+
+    def optimize_spectral_quality(self, target_yield, current_state):
+        """Optimal blue:red balance and intensity for a single state {par, temp, hum, co2}."""
+        rec = self.optimize_sectors({"_single": current_state}, target_yield)["_single"]
+        self.solutions.pop("_single", None)
+        return rec
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [SPECTRAL-OPT] %(message)s')
     opt = PhotosynthesisOptimizer()
     state = {"par": 800, "co2": 850} # High-supplement CO2 environment
     rec = opt.optimize_spectral_quality(target_yield="MAX", current_state=state)
     print(f"Pahlevani Optimizer: Recommending High-CO2 Spectral Map -> {rec}")
+
+    # Accuracy: compass search vs. a dense brute-force grid
+    rng = np.random.default_rng(490)
+    n = 64
+    cond = [rng.uniform(0, 900, n), rng.uniform(16, 30, n), rng.uniform(45, 85, n), rng.uniform(400, 1000, n)]
+    res = opt.optimize_batch(*cond)
+    blue, intensity = np.meshgrid(np.linspace(*BLUE_BOUNDS, 131), np.linspace(*INTENSITY_BOUNDS, 201))
+    dense = opt.evaluate(blue.ravel()[None, :], intensity.ravel()[None, :],
+                         *(c[:, None] for c in cond))["efficiency"].max(axis=1)
+    gap = (dense - res["efficiency"]) / np.abs(dense)
+    logger.info(f"Compass vs dense grid ({n} states): worst relative gap {gap.max():.2e}")
+
+    # Latency: all sectors re-optimized every simulated minute
+    for sectors in (8, 256):
+        states = {f"SECTOR-{s:02d}": {"par": p, "temp": t, "hum": h, "co2": c}
+                  for s, (p, t, h, c) in enumerate(zip(*(rng.choice(v, sectors) for v in cond)))}
+        opt.solutions.clear()
+        start = time.perf_counter()
+        opt.optimize_sectors(states)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for minute in range(60):
+            for s in states.values():
+                s["par"] = max(0.0, s["par"] + rng.normal(0, 15))
+                s["temp"] += rng.normal(0, 0.05)
+            start = time.perf_counter()
+            opt.optimize_sectors(states)
+            timings.append((time.perf_counter() - start) * 1000)
+        logger.info(f"{sectors} sectors: cold start {cold_ms:.1f} ms | warm re-optimization "
+                    f"p50 {np.percentile(timings, 50):.1f} ms, max {max(timings):.1f} ms")
@@ -0,0 +1,160 @@
+"""
+G.O.S. FvCB Reference Tests
+===========================
+Checks the vectorized Farquhar-von Caemmerer-Berry model in
+StrawberryPhysiologySim against published values rather than a second
+copy of the same equations.
+
+- Temperature responses: Bernacchi et al. (2001), Plant Cell Environ.
+  24:253-259, Table 1, in their own form exp(c - dHa / (R T)).
+- A/Ci curve: the closed forms of Farquhar, von Caemmerer & Berry (1980):
+  An = -Rd at Gamma*, initial slope Vcmax / (Gamma* + Kc (1 + O/Ko)),
+  RuBP-limited plateau J/4 - Rd.
+- Light response: quantum yield of C3 leaves at 21 % O2 (Ehleringer &
+  Björkman 1977, ~0.05 mol CO2 per mol absorbed photons).
+
+Usage:
+    python -m pytest test_fvcb.py
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from plant_sim_c3 import StrawberryPhysiologySim
+
+R_KJ = 8.314e-3
+
+# Bernacchi et al. 2001, Table 1: (scaling constant c, dHa kJ/mol)
+BERNACCHI_2001 = {
+    'Kc': (38.05, 79.43),          # umol mol-1
+    'Ko': (20.30, 36.38),          # mmol mol-1
+    'GammaStar': (19.02, 37.83),   # umol mol-1
+    'Vcmax': (26.35, 65.33),       # relative to 25°C
+    'Rd': (18.72, 46.39)           # relative to 25°C
+}
+# Bernacchi et al. 2001, 25°C values
+KC25, KO25, GAMMA_STAR25 = 404.9, 278.4, 42.75
+
+
+def bernacchi(name, tleaf):
+    c, dha = BERNACCHI_2001[name]
+    return math.exp(c - dha / (R_KJ * (tleaf + 273.15)))
+
+
+@pytest.fixture
+def sim():
+    return StrawberryPhysiologySim()
+
+
+# =========================================
+# TEMPERATURE RESPONSE (Bernacchi 2001)
+# =========================================
+
+@pytest.mark.parametrize("tleaf", [10.0, 15.0, 20.0, 25.0, 30.0, 35.0, 40.0])
+@pytest.mark.parametrize("name", ['Kc', 'Ko', 'GammaStar'])
+def test_rubisco_kinetics_match_bernacchi(sim, name, tleaf):
+    model = float(sim.temperature_scaled_params(tleaf)[name])
+    assert model == pytest.approx(bernacchi(name, tleaf), rel=0.01)
+
+
+@pytest.mark.parametrize("tleaf", [10.0, 20.0, 30.0, 40.0])
+def test_rd_matches_bernacchi(sim, tleaf):
+    model = float(sim.temperature_scaled_params(tleaf)['Rd']) / sim.Rd25
+    assert model == pytest.approx(bernacchi('Rd', tleaf), rel=0.01)
+
+
+def test_values_at_25c_match_bernacchi(sim):
+    at25 = sim.temperature_scaled_params(25.0)
+    assert float(at25['Kc']) == pytest.approx(KC25, rel=1e-6)
+    assert float(at25['Ko']) == pytest.approx(KO25, rel=1e-6)
+    assert float(at25['GammaStar']) == pytest.approx(GAMMA_STAR25, rel=1e-6)
+    assert float(at25['Vcmax']) == pytest.approx(sim.Vcmax25, rel=1e-9)
+
+
+def test_vcmax_activation_energy_matches_bernacchi(sim):
+    # Below ~20°C deactivation is negligible: the Arrhenius slope must be
+    # Bernacchi's dHa; above it the peaked form bends away (optimum below)
+    t1, t2 = 10.0, 15.0
+    v = sim.temperature_scaled_params(np.array([t1, t2]))['Vcmax']
+    slope = math.log(v[1] / v[0]) / (1 / (t1 + 273.15) - 1 / (t2 + 273.15)) * R_KJ
+    assert slope == pytest.approx(BERNACCHI_2001['Vcmax'][1], rel=0.02)
+
+
+def test_vcmax_optimum_in_c3_range(sim):
+    # Thermal optimum of Vcmax for temperate C3 crops: ~28-38°C
+    t_grid = np.linspace(0, 50, 5001)
+    t_peak = t_grid[np.argmax(sim.temperature_scaled_params(t_grid)['Vcmax'])]
+    assert 28.0 <= t_peak <= 38.0
+
+
+# =========================================
+# A/Ci CURVE (Farquhar et al. 1980)
+# =========================================
+
+def test_an_at_gamma_star_is_dark_respiration(sim):
+    an = float(sim.fvcb_array(2000.0, 25.0, GAMMA_STAR25)['An'])
+    assert an == pytest.approx(-sim.Rd25, abs=1e-9)
+
+
+def test_aci_initial_slope_is_carboxylation_efficiency(sim):
+    ci = GAMMA_STAR25 + np.array([0.0, 1.0])
+    an = sim.fvcb_array(2000.0, 25.0, ci)['An']
+    expected = sim.Vcmax25 / (GAMMA_STAR25 + KC25 * (1 + sim.O2 / KO25))
+    assert an[1] - an[0] == pytest.approx(expected, rel=0.01)
+
+
+def test_aci_limitations_and_plateau(sim):
+    ci = np.linspace(50, 1500, 300)
+    aci = sim.fvcb_array(2000.0, 25.0, ci)
+    assert aci['Wc'][0] < aci['Wj'][0]
+    assert aci['Wj'][-1] < aci['Wc'][-1]
+    assert np.all(np.diff(aci['An']) > 0)
+    # Saturating light and CO2: J -> Jmax, Wj -> J/4
+    plateau = float(sim.fvcb_array(1e7, 25.0, 1e7)['An'])
+    assert plateau == pytest.approx(sim.Jmax25 / 4 - sim.Rd25, rel=0.01)
+
+
+# =========================================
+# LIGHT RESPONSE
+# =========================================
+
+def test_quantum_yield_in_c3_range(sim):
+    an = sim.fvcb_array(np.array([0.0, 1.0]), 25.0, sim.Ci_Ca * 400.0)['An']
+    assert 0.04 <= an[1] - an[0] <= 0.06
+
+
+def test_light_response(sim):
+    light = sim.photosynthesis_array(np.linspace(0, 2500, 501), 25.0, 400.0)
+    assert light[0] == pytest.approx(-sim.Rd25, abs=1e-9)
+    assert np.all(np.diff(light) >= -1e-12)
+    assert light[-1] - light[-50] < 0.01 * light[-1]
+    # Light-saturated An of C3 crop leaves at ambient CO2
+    assert 10.0 <= light[-1] <= 25.0
+
+
+def test_calculate_photosynthesis_floor(sim):
+    assert sim.calculate_photosynthesis(0.0, 25.0) == 0.1
+    assert sim.calculate_photosynthesis(800.0, 25.0) > 0.1
+
+
+# =========================================
+# CANOPY
+# =========================================
+
+def test_canopy_dark_respiration(sim):
+    dark = float(sim.canopy_photosynthesis_array(0.0, 25.0, 400.0))
+    assert dark == pytest.approx(-sim.Rd25 * sim.LEAF_AREA_INDEX, abs=1e-9)
+
+
+def test_canopy_monotonic_in_light(sim):
+    canopy = sim.canopy_photosynthesis_array(np.linspace(0, 2000, 201), 25.0, 400.0)
+    assert np.all(np.diff(canopy) >= -1e-12)
+
+
+def test_canopy_without_leaves(sim):
+    with np.errstate(all='raise'):
+        canopy = sim.canopy_photosynthesis_array(800.0, 25.0, 400.0, lai=np.array([0.0, 3.5]))
+    assert canopy[0] == 0.0
+    assert canopy[1] > 0.0
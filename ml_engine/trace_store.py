@@ -0,0 +1,329 @@
+"""
+G.O.S. Columnar Trace Store
+===========================
+Append-only, memory-mapped store of (pre, action, post) traces for
+MACQLearner.
+
+Layout (one directory):
+    times.f8       event time, epoch seconds (float64, appended in time order)
+    actions.i2     action type code (int16)
+    sectors.i2     sector code (int16)
+    severity.i1    event severity (int8, 0 = unknown)
+    states.f4      fixed-width state block per trace (float32, NaN = missing):
+                   [pre | post | control pre | control post] x fields
+    index/<code>.i8  row ids per action type (int64, ascending)
+    meta.json      row count, fields and the action/sector vocabularies
+
+Rows are written to the column files first and become visible when
+meta.json (written atomically) is updated, so a crash mid-append loses
+at most the unflushed tail: on open, column and index files are
+truncated back to the committed counts, and index files of action types
+that never committed are removed.
+
+Queries never deserialize traces: time ranges are binary searches on
+times.f8, action-type queries read the row id list of that type, and the
+result is a set of row ids into memory-mapped columns.
+
+Usage:
+    python trace_store.py                 # self-check + benchmark (1M traces, temp dir)
+    python trace_store.py --traces 5000000
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+# basicConfig only when run directly: macq_learner imports this module first
+logger = logging.getLogger("TraceStore")
+
+DEFAULT_STORE = "/app/data/macq_traces"
+BLOCKS = ('pre', 'post', 'control_pre', 'control_post')
+COLUMNS = {'times': 'f8', 'actions': 'i2', 'sectors': 'i2', 'severity': 'i1'}
+
+
+class TraceStore:
+    """Append-only columnar trace store backed by memory-mapped files."""
+
+    def __init__(self, path=DEFAULT_STORE, fields=None):
+        self.path = path
+        os.makedirs(os.path.join(path, "index"), exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if fields is not None and list(fields) != meta['fields']:
+                raise ValueError(f"Store {path} holds fields {meta['fields']}, not {list(fields)}")
+        elif fields is None:
+            raise ValueError(f"New store {path} needs its state fields")
+        else:
+            meta = {'count': 0, 'fields': list(fields), 'actions': [], 'sectors': []}
+        self.meta = meta
+        self.fields = meta['fields']
+        self.width = len(BLOCKS) * len(self.fields)
+        self.action_codes = {a: i for i, a in enumerate(meta['actions'])}
+        self.sector_codes = {s: i for i, s in enumerate(meta['sectors'])}
+        self._truncate()
+        self._maps = {}
+        self._maps_count = -1
+
+    def __len__(self):
+        return self.meta['count']
+
+    # =========================================
+    # FILES
+    # =========================================
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _row_bytes(self):
+        sizes = {name: np.dtype(dtype).itemsize for name, dtype in COLUMNS.items()}
+        sizes['states'] = 4 * self.width
+        return sizes
+
+    def _truncate(self):
+        """Drops rows written after the last committed meta.json."""
+        count = self.meta['count']
+        files = {f"{name}.{dtype}": size for (name, dtype), size
+                 in zip(list(COLUMNS.items()) + [('states', 'f4')], self._row_bytes().values())}
+        for filename, size in files.items():
+            path = self._file(filename)
+            if os.path.exists(path) and os.path.getsize(path) != count * size:
+                os.truncate(path, count * size)
+        counts = self.meta.get('index_counts', [])
+        for filename in os.listdir(self._file("index")):
+            code, ext = os.path.splitext(filename)
+            if ext != ".i8" or not code.isdigit():
+                continue
+            path = self._file(f"index/{filename}")
+            # Index of a type whose append never committed: its code will be reused
+            if int(code) >= len(self.meta['actions']):
+                os.remove(path)
+            elif int(code) < len(counts) and os.path.getsize(path) != counts[int(code)] * 8:
+                os.truncate(path, counts[int(code)] * 8)
+
+    def _commit(self):
+        self.meta['actions'] = list(self.action_codes)
+        self.meta['sectors'] = list(self.sector_codes)
+        self.meta['index_counts'] = [len(self._index(code)) for code in range(len(self.action_codes))]
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, self._file("meta.json"))
+
+    def _map(self, name, dtype, shape):
+        path = self._file(name)
+        if not shape[0] or not os.path.exists(path):
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def _columns(self):
+        """Read-only memory maps of the committed rows (reopened after appends)."""
+        count = self.meta['count']
+        if self._maps_count != count:
+            self._maps = {name: self._map(f"{name}.{dtype}", dtype, (count,)) for name, dtype in COLUMNS.items()}
+            self._maps['states'] = self._map("states.f4", 'f4', (count, len(BLOCKS), len(self.fields)))
+            self._maps_count = count
+        return self._maps
+
+    def _index(self, code):
+        path = self._file(f"index/{code}.i8")
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return np.zeros(0, dtype=np.int64)
+        return np.memmap(path, dtype=np.int64, mode='r')
+
+    def _code(self, vocabulary, value):
+        if value not in vocabulary:
+            if len(vocabulary) >= np.iinfo(np.int16).max:
+                raise ValueError(f"Too many distinct values (> {np.iinfo(np.int16).max})")
+            vocabulary[value] = len(vocabulary)
+        return vocabulary[value]
+
+    # =========================================
+    # APPEND
+    # =========================================
+
+    def _state_block(self, states, n):
+        block = np.full((n, len(BLOCKS), len(self.fields)), np.nan, dtype=np.float32)
+        for b, name in enumerate(BLOCKS):
+            values = states.get(name)
+            if values is None:
+                continue
+            for f, field in enumerate(self.fields):
+                if field in values and values[field] is not None:
+                    block[:, b, f] = np.asarray(values[field], dtype=np.float64)
+        return block
+
+    def append_batch(self, times, action_types, sectors, states, severity=None):
+        """
+        Appends N traces and commits them.
+
+        Args:
+            times: (N,) epoch seconds, not older than the newest stored trace
+            action_types / sectors: (N,) labels
+            states: {block: {field: (N,) values}} for blocks pre, post,
+                control_pre, control_post (missing blocks/fields are NaN)
+            severity: Optional (N,) ints
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        n = len(times)
+        if not n:
+            return
+        columns = self._columns()
+        last = columns['times'][-1] if len(columns['times']) else -np.inf
+        if times[0] < last or np.any(np.diff(times) < 0):
+            raise ValueError("Traces must be appended in time order")
+
+        committed_types = len(self.meta['actions'])
+        actions = np.array([self._code(self.action_codes, a) for a in np.atleast_1d(action_types)], dtype=np.int16)
+        sector_ids = np.array([self._code(self.sector_codes, s) for s in np.atleast_1d(sectors)], dtype=np.int16)
+        severity = np.zeros(n, dtype=np.int8) if severity is None else np.asarray(severity, dtype=np.int8)
+        data = {'times': times, 'actions': actions, 'sectors': sector_ids, 'severity': severity}
+
+        for name, dtype in COLUMNS.items():
+            with open(self._file(f"{name}.{dtype}"), 'ab') as f:
+                f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+        with open(self._file("states.f4"), 'ab') as f:
+            f.write(self._state_block(states, n).tobytes())
+
+        start = self.meta['count']
+        for code in np.unique(actions):
+            rows = start + np.flatnonzero(actions == code)
+            # A new type starts a fresh index, whatever a failed append left behind
+            with open(self._file(f"index/{code}.i8"), 'wb' if code >= committed_types else 'ab') as f:
+                f.write(rows.astype(np.int64).tobytes())
+        self.meta['count'] = start + n
+        self._commit()
+
+    def append(self, t, action_type, sector, pre, post, control=None, severity=None):
+        """Appends one trace (see append_batch)."""
+        states = {'pre': {k: [v] for k, v in pre.items()}, 'post': {k: [v] for k, v in post.items()}}
+        if control is not None:
+            states['control_pre'] = {k: [v] for k, v in control[0].items()}
+            states['control_post'] = {k: [v] for k, v in control[1].items()}
+        self.append_batch([t], [action_type], [sector], states, None if severity is None else [severity])
+
+    # =========================================
+    # QUERY
+    # =========================================
+
+    @property
+    def last_time(self):
+        times = self._columns()['times']
+        return float(times[-1]) if len(times) else None
+
+    def query(self, start=None, end=None, action_type=None, sector=None) -> np.ndarray:
+        """Row ids of traces with start <= time < end (and type / sector)."""
+        columns = self._columns()
+        if action_type is not None:
+            if action_type not in self.action_codes:
+                return np.zeros(0, dtype=np.int64)
+            rows = self._index(self.action_codes[action_type])
+            times = columns['times'][rows]
+        else:
+            rows = None
+            times = columns['times']
+        lo = 0 if start is None else np.searchsorted(times, start, side='left')
+        hi = len(times) if end is None else np.searchsorted(times, end, side='left')
+        rows = np.arange(lo, hi, dtype=np.int64) if rows is None else np.asarray(rows[lo:hi])
+        if sector is not None:
+            code = self.sector_codes.get(sector)
+            if code is None:
+                return np.zeros(0, dtype=np.int64)
+            rows = rows[columns['sectors'][rows] == code]
+        return rows
+
+    def states(self, rows) -> dict:
+        """{block: {field: (len(rows),) float32}} for the given row ids."""
+        block = self._columns()['states'][rows]
+        return {name: {field: block[:, b, f] for f, field in enumerate(self.fields)}
+                for b, name in enumerate(BLOCKS)}
+
+    def column(self, name, rows=None) -> np.ndarray:
+        values = self._columns()[name]
+        return values if rows is None else values[rows]
+
+
+# =========================================
+# SELF-CHECK / BENCHMARK
+# =========================================
+
+def synthetic_batch(rng, n, t0, fields, actions=('PEST', 'FERTILIZER', 'EQUIPMENT_FAIL', 'YIELD')):
+    times = t0 + np.cumsum(rng.exponential(60.0, n))
+    labels = np.array(actions)[rng.integers(0, len(actions), n)]
+    sectors = np.array(['A', 'B', 'C', 'D'])[rng.integers(0, 4, n)]
+    states = {b: {f: rng.normal(25, 5, n) for f in fields} for b in BLOCKS}
+    return times, labels, sectors, states
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [TRACE-STORE] %(message)s')
+    parser = argparse.ArgumentParser(description="Columnar trace store self-check and benchmark")
+    parser.add_argument("--traces", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    fields = ('temp_c', 'humidity_pct', 'par_umol', 'vpd_kpa')
+    rng = np.random.default_rng(46)
+    directory = tempfile.mkdtemp(prefix="trace_store_")
+    try:
+        store = TraceStore(directory, fields)
+        start = time.perf_counter()
+        t0, kept = 1.7e9, []
+        for k in range(0, args.traces, args.batch):
+            times, labels, sectors, states = synthetic_batch(rng, min(args.batch, args.traces - k), t0, fields)
+            store.append_batch(times, labels, sectors, states)
+            t0 = times[-1]
+            if k == 0:
+                kept = (times, labels, states)
+        append_s = time.perf_counter() - start
+        logger.info(f"Appended {len(store):,} traces in {append_s:.2f} s ({len(store) / append_s:,.0f} traces/s, "
+                    f"{sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(directory) for f in fs) / 1e6:.0f} MB)")
+
+        # Simulated crash: half-written tail past the committed count, and
+        # the index file of a new action type whose append never committed
+        with open(os.path.join(directory, "times.f8"), 'ab') as f:
+            f.write(b'\0' * 12)
+        with open(os.path.join(directory, "index", f"{len(store.action_codes)}.i8"), 'wb') as f:
+            f.write(np.array([1], dtype=np.int64).tobytes())
+        start = time.perf_counter()
+        store = TraceStore(directory)
+        logger.info(f"Reopened {len(store):,} traces in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        times, labels, states = kept
+        errors = 0
+        rows = store.query(end=times[-1] + 1e-3)
+        errors += int(len(rows) != len(times))
+        errors += int(not np.allclose(store.states(rows)['post']['par_umol'], states['post']['par_umol'], rtol=1e-6))
+        fert = store.query(end=times[-1] + 1e-3, action_type='FERTILIZER')
+        errors += int(not np.array_equal(fert, np.flatnonzero(labels == 'FERTILIZER')))
+        store.append(store.last_time, 'OTHER', 'A', {'temp_c': 20.0}, {'temp_c': 21.0})
+        errors += int(not np.array_equal(store.query(action_type='OTHER'), [len(store) - 1]))
+
+        span = store.last_time - 1.7e9
+        lo, hi = 1.7e9 + 0.4 * span, 1.7e9 + 0.5 * span
+        start = time.perf_counter()
+        for _ in range(100):
+            rows = store.query(lo, hi)
+        range_ms = (time.perf_counter() - start) * 10
+        start = time.perf_counter()
+        for _ in range(100):
+            rows = store.query(lo, hi, action_type='PEST')
+            block = store.states(rows)
+        type_ms = (time.perf_counter() - start) * 10
+        expected = np.flatnonzero((store.column('times') >= lo) & (store.column('times') < hi)
+                                  & (store.column('actions') == store.action_codes['PEST']))
+        errors += int(not np.array_equal(rows, expected))
+        logger.info(f"Range query (10% of store): {range_ms:.3f} ms | "
+                    f"type+range query with states ({len(rows):,} rows): {type_ms:.2f} ms")
+        logger.info(f"Self-check errors: {errors}")
+    finally:
+        shutil.rmtree(directory)
+    if errors:
+        raise SystemExit(1)